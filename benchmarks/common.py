@@ -0,0 +1,119 @@
+############################################################################
+##    This file is part of OMTPlan.
+##
+##    OMTPlan is free software: you can redistribute it and/or modify
+##    it under the terms of the GNU General Public License as published by
+##    the Free Software Foundation, either version 3 of the License, or
+##    (at your option) any later version.
+##
+##    OMTPlan is distributed in the hope that it will be useful,
+##    but WITHOUT ANY WARRANTY; without even the implied warranty of
+##    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##    GNU General Public License for more details.
+##
+##    You should have received a copy of the GNU General Public License
+##    along with OMTPlan.  If not, see <https://www.gnu.org/licenses/>.
+############################################################################
+
+"""
+Helpers shared by the benchmark scripts.
+"""
+
+import io
+import os
+import sys
+import time
+import contextlib
+import multiprocessing
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+
+from planner import cache as groundcache
+
+SUITES_DIR = os.path.join(BASE_DIR, 'pddl_examples', 'benchmarks_IJCAI20')
+
+def suiteDir(suite):
+    """!
+    Returns the folder of an IJCAI20 suite, e.g. 'depots' or 'linear/fo-counters',
+    or of an IPC suite, e.g. 'IPCs/classicalPlanning/gripper'.
+
+    @param suite: name of the suite, optionally prefixed by its category.
+    @return path
+    """
+    if suite.startswith('IPCs/'):
+        return os.path.join(BASE_DIR, 'pddl_examples', suite)
+    if '/' in suite:
+        return os.path.join(SUITES_DIR, suite)
+    return os.path.join(SUITES_DIR, 'simple', suite)
+
+def instances(suite, limit):
+    """!
+    Returns the first instances of a suite, smallest first.
+
+    @param suite: name of the suite.
+    @param limit: maximum number of instances.
+    @return list of (domain, problem) paths.
+    """
+    domain = os.path.join(suiteDir(suite), 'domain.pddl')
+    instances_dir = os.path.join(suiteDir(suite), 'instances')
+    names = sorted([name for name in os.listdir(instances_dir) if name.endswith('.pddl')], key=lambda name: (len(name), name))
+    return [(domain, os.path.join(instances_dir, name)) for name in names[:limit]]
+
+def parse(domain, problem):
+    # Parsed lazily, on grounding cache misses
+    return groundcache.TaskFiles(domain, problem)
+
+def groundingCache():
+    return groundcache.GroundingCache(os.path.join(BASE_DIR, 'grounding_cache'))
+
+def timed(function):
+    """!
+    Calls a function and measures its running time.
+
+    @param function: function without arguments.
+    @return result of the function.
+    @return elapsed time (seconds).
+    """
+    start = time.time()
+    result = function()
+    return result, time.time() - start
+
+def quietly(function):
+    """!
+    Calls a function discarding what it prints.
+
+    @param function: function without arguments.
+    @return result of the function.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        return function()
+
+def _child(queue, function):
+    start = time.time()
+    result = quietly(function)
+    queue.put((result, time.time() - start))
+
+def timedWithTimeout(function, timeout):
+    """!
+    Runs a function in a separate process, killing it after a timeout.
+    Output of the function is discarded.
+
+    @param function: function without arguments, its result must be picklable.
+    @param timeout: timeout (seconds).
+    @return result of the function (None on timeout or failure).
+    @return elapsed time (None on timeout or failure).
+    """
+    context = multiprocessing.get_context('fork')
+    queue = context.Queue()
+    process = context.Process(target=_child, args=(queue, function))
+    process.start()
+    process.join(timeout)
+    if process.is_alive():
+        process.kill()
+        process.join()
+        return None, None
+    if queue.empty():
+        return None, None
+    return queue.get()
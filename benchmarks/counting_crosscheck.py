@@ -0,0 +1,130 @@
+############################################################################
+##    This file is part of OMTPlan.
+##
+##    OMTPlan is free software: you can redistribute it and/or modify
+##    it under the terms of the GNU General Public License as published by
+##    the Free Software Foundation, either version 3 of the License, or
+##    (at your option) any later version.
+##
+##    OMTPlan is distributed in the hope that it will be useful,
+##    but WITHOUT ANY WARRANTY; without even the implied warranty of
+##    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##    GNU General Public License for more details.
+##
+##    You should have received a copy of the GNU General Public License
+##    along with OMTPlan.  If not, see <https://www.gnu.org/licenses/>.
+############################################################################
+
+"""
+Cross-checks the component-caching counter of planner.counting (and the
+bit-blasting of toCNF it relies on) against blocking-clause enumeration
+(countModels) and brute force on random small CNFs, projected on random
+subsets of their variables. Formulas include unit and empty clauses, and
+some clauses are given as implications or exclusive ors, so that toCNF
+has to translate them.
+
+Usage:
+
+    python3 benchmarks/counting_crosscheck.py [-formulas 500] [-variables 8] [-clauses 12] [-seed 0]
+"""
+
+import random
+import argparse
+import itertools
+
+import common
+
+from z3 import *
+
+from planner import counting
+
+def randomFormula(generator, variables, clauses):
+    """!
+    Builds a random formula over a few variables, in CNF over integer
+    literals and as Z3 assertions.
+
+    @param generator: random number generator.
+    @param variables: number of variables.
+    @param clauses: maximum number of clauses.
+    @return clauses (lists of literals), Z3 assertions.
+    """
+    atoms = [Bool('x{}'.format(var)) for var in range(1, variables + 1)]
+
+    def term(lit):
+        return atoms[lit - 1] if lit > 0 else Not(atoms[-lit - 1])
+
+    cnf = []
+    assertions = []
+    for _ in range(generator.randint(0, clauses)):
+        # Mostly short clauses, with units and (rarely) empty ones
+        size = generator.choice([0] + [1] * 4 + [2] * 8 + [3] * 8)
+        chosen = generator.sample(range(1, variables + 1), size)
+        clause = [var if generator.random() < 0.5 else -var for var in chosen]
+        cnf.append(clause)
+        if size == 2 and generator.random() < 0.3:
+            assertions.append(Implies(Not(term(clause[0])), term(clause[1])))
+        else:
+            assertions.append(Or([term(lit) for lit in clause]))
+
+    # Exclusive ors are added to both representations
+    if generator.random() < 0.3:
+        first, second = generator.sample(range(1, variables + 1), 2)
+        cnf.extend([[first, second], [-first, -second]])
+        assertions.append(Xor(atoms[first - 1], atoms[second - 1]))
+
+    return cnf, assertions, atoms
+
+def bruteForce(cnf, variables, projected):
+    """!
+    Counts the assignments to the projected variables that extend to a
+    model of the clauses, by trying every assignment.
+
+    @param cnf: clauses (lists of literals).
+    @param variables: number of variables.
+    @param projected: projected variables.
+    @return number of assignments.
+    """
+    projections = set()
+    for values in itertools.product([False, True], repeat=variables):
+        if all([any([values[abs(lit) - 1] == (lit > 0) for lit in clause]) for clause in cnf]):
+            projections.add(tuple([values[var - 1] for var in projected]))
+    return len(projections)
+
+def main():
+    parser = argparse.ArgumentParser(description='Cross-checks the component-caching model counter.')
+    parser.add_argument('-formulas', type=int, default=500, help='Number of random formulas.')
+    parser.add_argument('-variables', type=int, default=8, help='Number of variables of each formula.')
+    parser.add_argument('-clauses', type=int, default=12, help='Maximum number of clauses of each formula.')
+    parser.add_argument('-seed', type=int, default=0, help='Seed of the random formulas.')
+    args = parser.parse_args()
+
+    generator = random.Random(args.seed)
+
+    mismatches = 0
+    for number in range(args.formulas):
+        cnf, assertions, atoms = randomFormula(generator, args.variables, args.clauses)
+        projected = sorted(generator.sample(range(1, args.variables + 1), generator.randint(0, args.variables)))
+        terms = [atoms[var - 1] for var in projected]
+
+        expected = bruteForce(cnf, args.variables, projected)
+
+        solver = Solver()
+        solver.add(assertions)
+        enumerated = counting.countModels(solver, terms)
+
+        components = counting.countComponents(assertions, terms)
+
+        # Integer clauses, bypassing the bit-blasting
+        clauses = [tuple(sorted(set(clause))) for clause in cnf if not any([-lit in clause for lit in clause])]
+        direct = counting.ComponentCounter(clauses, projected).count()
+
+        if not expected == enumerated == components == direct:
+            mismatches = mismatches + 1
+            print('Formula {}: brute force {}, enumeration {}, components {}, components on CNF {}'.format(
+                number, expected, enumerated, components, direct))
+            print('  clauses {} projected on {}'.format(cnf, projected))
+
+    print('{} formulas, {} mismatches'.format(args.formulas, mismatches))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+############################################################################
+##    This file is part of OMTPlan.
+##
+##    OMTPlan is free software: you can redistribute it and/or modify
+##    it under the terms of the GNU General Public License as published by
+##    the Free Software Foundation, either version 3 of the License, or
+##    (at your option) any later version.
+##
+##    OMTPlan is distributed in the hope that it will be useful,
+##    but WITHOUT ANY WARRANTY; without even the implied warranty of
+##    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##    GNU General Public License for more details.
+##
+##    You should have received a copy of the GNU General Public License
+##    along with OMTPlan.  If not, see <https://www.gnu.org/licenses/>.
+############################################################################
+
+"""
+Compares the time needed to encode explanatory frame axioms with the
+reverse index of Encoder.encodeFrame against the previous implementation,
+which scanned all actions and effects for every fluent at every step.
+
+Usage:
+
+    python3 benchmarks/frame_encoding.py [-suites depots rover] [-horizon 10] [-instances 5]
+"""
+
+import os
+import argparse
+
+import common
+
+import z3
+
+from planner import encoder
+from planner import modifier
+
+def legacyEncodeFrame(e):
+    """!
+    Frame axioms as encoded before the reverse index was introduced.
+
+    @param e: encoder on which encode has been called.
+    @return frame: list of frame axioms
+    """
+    frame = []
+    sentinel = object()
+    for step in range(e.horizon):
+        for fluent in e.all_problem_fluents:
+            if fluent.type.is_bool_type():
+                fluent_pre  = e.boolean_variables[step].get(str(fluent), sentinel)
+                fluent_post = e.boolean_variables[step+1].get(str(fluent), sentinel)
+                if fluent_pre is not sentinel and fluent_post is not sentinel:
+                    action_add = []
+                    action_del = []
+                    for action in e.ground_problem.actions:
+                        effects_fluents = [effect for effect in action.effects if effect.value.type.is_bool_type()]
+                        for ele in effects_fluents:
+                            if str(ele.fluent) == str(fluent):
+                                if ele.value.is_true():
+                                    action_add.append(e.action_variables[step][action.name])
+                                else:
+                                    action_del.append(e.action_variables[step][action.name])
+                    frame.append(z3.Implies(z3.And(z3.Not(fluent_pre),fluent_post),z3.Or(action_add)))
+                    frame.append(z3.Implies(z3.And(fluent_pre,z3.Not(fluent_post)),z3.Or(action_del)))
+            elif fluent.type.is_int_type() or fluent.type.is_real_type():
+                fluent_pre  = e.numeric_variables[step].get(str(fluent), sentinel)
+                fluent_post = e.numeric_variables[step+1].get(str(fluent), sentinel)
+                if fluent_pre is not sentinel and fluent_post is not sentinel:
+                    action_num = []
+                    for action in e.ground_problem.actions:
+                        effects_fluents = [effect for effect in action.effects if effect.value.type.is_int_type() or effect.value.type.is_real_type()]
+                        for ele in effects_fluents:
+                            if str(ele.fluent) == str(fluent):
+                                action_num.append(e.action_variables[step][action.name])
+                    frame.append(z3.Or(fluent_post == fluent_pre, z3.Or(action_num)))
+    return frame
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks frame axioms encoding.')
+    parser.add_argument('-suites', nargs='+', default=['depots', 'rover'], help='IJCAI20 suites to run.')
+    parser.add_argument('-horizon', type=int, default=10, help='Horizon of the encoding.')
+    parser.add_argument('-instances', type=int, default=5, help='Maximum number of instances per suite.')
+    parser.add_argument('-noprune', action='store_true', help='Disables relaxed reachability pruning.')
+    args = parser.parse_args()
+
+    cache = common.groundingCache()
+
+    print('{:<10} {:<12} {:>8} {:>8} {:>10} {:>10} {:>8} {:>9}'.format(
+        'suite', 'instance', 'actions', 'axioms', 'before(s)', 'after(s)', 'speedup', 'identical'))
+
+    for suite in args.suites:
+        for domain, problem in common.instances(suite, args.instances):
+            task = common.parse(domain, problem)
+            e = encoder.EncoderSMT(task, modifier.LinearModifier(), cache=cache, prune=not args.noprune)
+            e.encode(args.horizon)
+
+            # encode() filled the per-fluent memo, both sides start cold
+            e.frame_actions = dict()
+
+            before, t_before = common.timed(lambda: legacyEncodeFrame(e))
+            after, t_after = common.timed(e.encodeFrame)
+            identical = len(before) == len(after) and all([b.eq(a) for b, a in zip(before, after)])
+
+            print('{:<10} {:<12} {:>8} {:>8} {:>10.3f} {:>10.3f} {:>7.1f}x {:>9}'.format(
+                suite, os.path.basename(problem), len(e.ground_problem.actions), len(after),
+                t_before, t_after, t_before / max(t_after, 1e-9), str(identical)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+############################################################################
+##    This file is part of OMTPlan.
+##
+##    OMTPlan is free software: you can redistribute it and/or modify
+##    it under the terms of the GNU General Public License as published by
+##    the Free Software Foundation, either version 3 of the License, or
+##    (at your option) any later version.
+##
+##    OMTPlan is distributed in the hope that it will be useful,
+##    but WITHOUT ANY WARRANTY; without even the implied warranty of
+##    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##    GNU General Public License for more details.
+##
+##    You should have received a copy of the GNU General Public License
+##    along with OMTPlan.  If not, see <https://www.gnu.org/licenses/>.
+############################################################################
+
+"""
+Compares the horizon search strategies of SearchSMT: the linear ramp-up
+against doubling the horizon until a plan is found and then bisecting down
+to the optimal horizon, each with a fresh solver per horizon or a single
+incremental solver. Reports time, optimal horizon and horizons checked.
+
+Usage:
+
+    python3 benchmarks/horizon_search.py [-suites linear/fo-counters sailing] [-instances 3] [-timeout 300]
+"""
+
+import os
+import argparse
+
+import common
+
+from planner import encoder
+from planner import modifier
+from planner import search
+
+STRATEGIES = ['linear', 'incremental', 'exponential', 'exponential-inc']
+
+def solve(domain, problem, strategy, cache, bound):
+    """!
+    Finds a plan with the given search strategy.
+
+    @return horizon at which a plan was found (None if not found).
+    @return number of horizons checked.
+    """
+    task = common.parse(domain, problem)
+    e = encoder.EncoderSMT(task, modifier.LinearModifier(), cache=cache)
+    s = search.SearchSMT(e, bound)
+    if strategy == 'linear':
+        s.do_linear_search()
+        checked = s.horizon if s.found else bound - 1
+    elif strategy == 'incremental':
+        s.do_incremental_search()
+        checked = s.horizon if s.found else bound - 1
+    else:
+        s.do_exponential_search(strategy == 'exponential-inc')
+        checked = len(s.verdicts)
+    return (s.horizon if s.found else None), checked
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks horizon search strategies of SMT encodings.')
+    parser.add_argument('-suites', nargs='+', default=['linear/fo-counters', 'sailing'], help='IJCAI20 suites to run (prefix linear/ for the linear category).')
+    parser.add_argument('-instances', type=int, default=3, help='Maximum number of instances per suite.')
+    parser.add_argument('-strategies', nargs='+', default=STRATEGIES, help='Search strategies to compare.')
+    parser.add_argument('-timeout', type=int, default=300, help='Timeout (seconds) per instance and strategy.')
+    parser.add_argument('-b', type=int, default=100, help='Upper bound on the horizon.')
+    args = parser.parse_args()
+
+    cache = common.groundingCache()
+
+    print('{:<20} {:<16} {:<16} {:>9} {:>8} {:>8}'.format('suite', 'instance', 'strategy', 'solve(s)', 'horizon', 'checks'))
+
+    for suite in args.suites:
+        for domain, problem in common.instances(suite, args.instances):
+            # Ground once outside the timed runs
+            common.quietly(lambda: encoder.EncoderSMT(common.parse(domain, problem), modifier.LinearModifier(), cache=cache))
+
+            for strategy in args.strategies:
+                result, elapsed = common.timedWithTimeout(lambda: solve(domain, problem, strategy, cache, args.b), args.timeout)
+                if result is None:
+                    print('{:<20} {:<16} {:<16} {:>9} {:>8} {:>8}'.format(suite, os.path.basename(problem), strategy, '-', '-', '-'))
+                else:
+                    horizon, checked = result
+                    print('{:<20} {:<16} {:<16} {:>9.2f} {:>8} {:>8}'.format(
+                        suite, os.path.basename(problem), strategy, elapsed, horizon if horizon else '-', checked))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+############################################################################
+##    This file is part of OMTPlan.
+##
+##    OMTPlan is free software: you can redistribute it and/or modify
+##    it under the terms of the GNU General Public License as published by
+##    the Free Software Foundation, either version 3 of the License, or
+##    (at your option) any later version.
+##
+##    OMTPlan is distributed in the hope that it will be useful,
+##    but WITHOUT ANY WARRANTY; without even the implied warranty of
+##    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##    GNU General Public License for more details.
+##
+##    You should have received a copy of the GNU General Public License
+##    along with OMTPlan.  If not, see <https://www.gnu.org/licenses/>.
+############################################################################
+
+"""
+Runs the SMT linear search with each at-most-one encoding of the
+sequential semantics on IJCAI20 suites and picks the best encoding per
+domain: the one solving most instances, then the fastest in total.
+
+Usage:
+
+    python3 benchmarks/linear_amo.py [-suites counters depots ...] [-instances 3] [-timeout 300]
+"""
+
+import os
+import argparse
+
+import common
+
+from planner import amo
+from planner import encoder
+from planner import modifier
+from planner import search
+
+SUITES = ['counters', 'depots', 'rover', 'sailing', 'farmland', 'gardening', 'zenotravel-small',
+          'linear/fo-counters', 'linear/fo-sailing', 'linear/rover-linear']
+
+def solve(domain, problem, encoding, cache, bound):
+    """!
+    Finds a plan with the given encoding.
+
+    @return horizon at which a plan was found (None if not found).
+    """
+    task = common.parse(domain, problem)
+    e = encoder.EncoderSMT(task, modifier.LinearModifier(encoding), cache=cache)
+    s = search.SearchSMT(e, bound)
+    s.do_linear_search()
+    return s.horizon if s.found else None
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks at-most-one encodings of sequential semantics.')
+    parser.add_argument('-suites', nargs='+', default=SUITES, help='IJCAI20 suites to run (prefix linear/ for the linear category).')
+    parser.add_argument('-instances', type=int, default=3, help='Maximum number of instances per suite.')
+    parser.add_argument('-encodings', nargs='+', default=list(amo.ENCODINGS.keys()), help='At-most-one encodings to compare.')
+    parser.add_argument('-timeout', type=int, default=300, help='Timeout (seconds) per instance and encoding.')
+    parser.add_argument('-b', type=int, default=100, help='Upper bound on the horizon.')
+    args = parser.parse_args()
+
+    cache = common.groundingCache()
+
+    print('{:<20} {:<16} {}'.format('suite', 'instance', ' '.join(['{:>11}'.format(encoding) for encoding in args.encodings])))
+
+    best = dict()
+    for suite in args.suites:
+        solved = {encoding: 0 for encoding in args.encodings}
+        total = {encoding: 0.0 for encoding in args.encodings}
+
+        for domain, problem in common.instances(suite, args.instances):
+            # Ground once outside the timed runs
+            common.quietly(lambda: encoder.EncoderSMT(common.parse(domain, problem), modifier.LinearModifier(), cache=cache))
+
+            row = []
+            for encoding in args.encodings:
+                horizon, elapsed = common.timedWithTimeout(lambda: solve(domain, problem, encoding, cache, args.b), args.timeout)
+                if horizon is None:
+                    total[encoding] += args.timeout
+                    row.append('{:>11}'.format('-'))
+                else:
+                    solved[encoding] += 1
+                    total[encoding] += elapsed
+                    row.append('{:>11.2f}'.format(elapsed))
+            print('{:<20} {:<16} {}'.format(suite, os.path.basename(problem), ' '.join(row)))
+
+        if max(solved.values()) > 0:
+            best[suite] = min(args.encodings, key=lambda encoding: (-solved[encoding], total[encoding]))
+        else:
+            best[suite] = '- (no instance solved)'
+
+    print('\nBest encoding per domain:')
+    for suite, encoding in best.items():
+        print('{:<20} {}'.format(suite, encoding))
+
+if __name__ == '__main__':
+    main()
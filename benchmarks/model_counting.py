@@ -0,0 +1,159 @@
+############################################################################
+##    This file is part of OMTPlan.
+##
+##    OMTPlan is free software: you can redistribute it and/or modify
+##    it under the terms of the GNU General Public License as published by
+##    the Free Software Foundation, either version 3 of the License, or
+##    (at your option) any later version.
+##
+##    OMTPlan is distributed in the hope that it will be useful,
+##    but WITHOUT ANY WARRANTY; without even the implied warranty of
+##    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##    GNU General Public License for more details.
+##
+##    You should have received a copy of the GNU General Public License
+##    along with OMTPlan.  If not, see <https://www.gnu.org/licenses/>.
+############################################################################
+
+"""
+Compares the projected model counter of planner.counting with the
+recursive enumerator previously used by utils.model_counting (which keeps
+all models in memory) on the contrastive experiments of a case study.
+The counters of planner.counting either enumerate models (blocking
+clauses) or count them with the component-caching #SAT engine. Reports
+fact and foil supports, time and peak memory of each counter.
+
+Usage:
+
+    python3 benchmarks/model_counting.py [-experiments pddl_examples/IPCs/caseStudy/experiments/...txt] [-commands 10] [-timeout 300] [-engines enumerate components]
+"""
+
+import os
+import glob
+import shlex
+import resource
+import argparse
+
+import common
+
+from z3 import *
+
+from planner import encoder
+from planner import modifier
+from planner import solvers
+import utils
+
+EXPERIMENTS = os.path.join(common.BASE_DIR, 'pddl_examples', 'IPCs', 'caseStudy', 'experiments')
+
+def parseCommand(line):
+    """!
+    Extracts the options of a contrastive omtplan.py command.
+
+    @param line: command line (starting with time python3 omtplan.py).
+    @return options (None if the line is not a contrastive translation).
+    """
+    words = shlex.split(line)
+    if not 'omtplan.py' in words or not '-contrastive' in words or not '-translate' in words:
+        return None
+    parser = argparse.ArgumentParser()
+    parser.add_argument('problem')
+    parser.add_argument('-domain')
+    parser.add_argument('-translate', type=int)
+    parser.add_argument('-axiom', type=int, default=1)
+    parser.add_argument('-first_action')
+    parser.add_argument('-second_action')
+    parser.add_argument('-step', type=int, default=0)
+    parser.add_argument('-parallel', action='store_true')
+    options, _ = parser.parse_known_args(words[words.index('omtplan.py')+1:])
+    options.domain = os.path.join(common.BASE_DIR, options.domain)
+    options.problem = os.path.join(common.BASE_DIR, options.problem)
+    return options
+
+def legacyCount(formula, variables, contrastive_type):
+    """!
+    Recursive enumerator previously used by utils.model_counting.
+    """
+    def all_smt(s, initial_terms):
+        def block_term(s, m, t):
+            s.add(t != m.eval(t, model_completion=True))
+        def fix_term(s, m, t):
+            s.add(t == m.eval(t, model_completion=True))
+        def all_smt_rec(terms):
+            if sat == s.check():
+                m = s.model()
+                yield m
+                for i in range(len(terms)):
+                    s.push()
+                    block_term(s, m, terms[i])
+                    for j in range(i):
+                        fix_term(s, m, terms[j])
+                    yield from all_smt_rec(terms[i:])
+                    s.pop()
+        yield from all_smt_rec(list(initial_terms))
+
+    solver = Solver()
+    for name, sub_formula in formula.items():
+        if name == 'axiom':
+            solver.add(sub_formula[0] if contrastive_type == 'fact' else sub_formula[1])
+        else:
+            solver.add(sub_formula)
+    return len(list(all_smt(solver, variables)))
+
+ENGINES = ['legacy', 'enumerate', 'components']
+
+def count(options, engine, cache):
+    """!
+    Counts fact and foil supports of a contrastive question.
+
+    @param engine: legacy enumerator, or engine of utils.model_counting.
+    @return fact support, foil support and peak memory (MB).
+    """
+    task = common.parse(options.domain, options.problem)
+    e = encoder.EncoderSMTContrastive(task, modifier.ParallelModifier() if options.parallel else modifier.LinearModifier(),
+                                      options.first_action, options.second_action, options.step, options.axiom, cache=cache)
+    formula = e.encode(options.translate)
+    variables = utils.encoder_action_list(e, options.translate)
+    preset = solvers.selectPreset(e.ground_problem)
+    solver = None if engine in ['legacy', 'components'] else utils.contrastive_base_solver(formula, preset)
+    supports = []
+    for contrastive_type in ['fact', 'foil']:
+        if engine == 'legacy':
+            supports.append(legacyCount(formula, variables, contrastive_type))
+        else:
+            supports.append(utils.model_counting(formula, variables, contrastive_type, preset, engine, solver))
+    return supports[0], supports[1], resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks projected model counting.')
+    parser.add_argument('-experiments', nargs='+', default=sorted(glob.glob(os.path.join(EXPERIMENTS, '*.txt'))), help='Files of contrastive experiment commands.')
+    parser.add_argument('-commands', type=int, default=10, help='Maximum number of commands per file.')
+    parser.add_argument('-timeout', type=int, default=300, help='Timeout (seconds) per command and counter.')
+    parser.add_argument('-engines', nargs='+', choices=ENGINES, default=ENGINES, help='Counters to compare.')
+    args = parser.parse_args()
+
+    cache = common.groundingCache()
+
+    print('{:<6} {:<6} {:>4} {:>10} {:>10} {}'.format('axiom', 'H', '#', 'fact', 'foil',
+        ' '.join(['{:>12} {:>8}'.format(engine + '(s)', 'MB') for engine in args.engines])))
+
+    for experiments in args.experiments:
+        with open(experiments) as f:
+            commands = [options for options in [parseCommand(line) for line in f if line.startswith('time')] if options is not None]
+
+        for number, options in enumerate(commands[:args.commands]):
+            results = []
+            for engine in args.engines:
+                results.append(common.timedWithTimeout(lambda: count(options, engine, cache), args.timeout))
+
+            supports = [result[:2] for result, _ in results if result is not None]
+            print('{:<6} {:<6} {:>4} {:>10} {:>10} {}'.format(
+                options.axiom, options.translate, number,
+                '-' if len(supports) == 0 else supports[0][0], '-' if len(supports) == 0 else supports[0][1],
+                ' '.join(['{:>12} {:>8}'.format('-' if result is None else '{:.2f}'.format(elapsed),
+                                                 '-' if result is None else '{:.0f}'.format(result[2])) for result, elapsed in results])))
+
+            if any([support != supports[0] for support in supports]):
+                print('Supports differ: {}'.format(supports))
+
+if __name__ == '__main__':
+    main()
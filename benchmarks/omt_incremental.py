@@ -0,0 +1,108 @@
+############################################################################
+##    This file is part of OMTPlan.
+##
+##    OMTPlan is free software: you can redistribute it and/or modify
+##    it under the terms of the GNU General Public License as published by
+##    the Free Software Foundation, either version 3 of the License, or
+##    (at your option) any later version.
+##
+##    OMTPlan is distributed in the hope that it will be useful,
+##    but WITHOUT ANY WARRANTY; without even the implied warranty of
+##    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##    GNU General Public License for more details.
+##
+##    You should have received a copy of the GNU General Public License
+##    along with OMTPlan.  If not, see <https://www.gnu.org/licenses/>.
+############################################################################
+
+"""
+Compares the OMT search re-encoding the whole formula at each horizon of
+the schedule with the incremental one, which keeps the prefix in a single
+solver and only rebuilds the relaxed suffix. Reports the time spent in
+encoding and the total search time.
+
+Usage:
+
+    python3 benchmarks/omt_incremental.py [-suites counters depots] [-instances 3] [-timeout 300] [-b 20]
+"""
+
+import os
+import time
+import argparse
+
+import common
+
+from planner import encoder
+from planner import modifier
+from planner import search
+
+def timeEncoding(e, method):
+    """!
+    Wraps an encoding method of an encoder so that its running time
+    is accumulated in e.encoding_time.
+    """
+    function = getattr(e, method)
+    e.encoding_time = 0.0
+
+    def wrapper(horizon):
+        start = time.time()
+        result = function(horizon)
+        e.encoding_time += time.time() - start
+        return result
+
+    setattr(e, method, wrapper)
+
+def solve(domain, problem, incremental, cache, bound):
+    """!
+    Finds an optimal plan with the OMT search.
+
+    @return time spent in encoding.
+    @return cost of the plan found (None if not found).
+    """
+    task = common.parse(domain, problem)
+    e = encoder.EncoderOMT(task, modifier.LinearModifier(), cache=cache)
+    s = search.SearchOMT(e, bound)
+    if incremental:
+        timeEncoding(e, 'incremental_encoding')
+        solution = s.do_incremental_search()
+    else:
+        timeEncoding(e, 'encode')
+        solution = s.do_search()
+    return e.encoding_time, (str(solution.cost) if solution else None)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks incremental OMT search.')
+    parser.add_argument('-suites', nargs='+', default=['counters', 'depots', 'sailing'], help='IJCAI20 suites to run (prefix linear/ for the linear category).')
+    parser.add_argument('-instances', type=int, default=3, help='Maximum number of instances per suite.')
+    parser.add_argument('-timeout', type=int, default=300, help='Timeout (seconds) per instance and search.')
+    parser.add_argument('-b', type=int, default=100, help='Upper bound on the horizon.')
+    args = parser.parse_args()
+
+    cache = common.groundingCache()
+
+    print('{:<12} {:<16} {:>10} {:>10} {:>10} {:>10} {:>8} {:>8}'.format(
+        'suite', 'instance', 'enc(s)', 'enc-inc(s)', 'total(s)', 'total-inc', 'cost', 'cost-inc'))
+
+    for suite in args.suites:
+        for domain, problem in common.instances(suite, args.instances):
+            # Ground once outside the timed runs
+            common.quietly(lambda: encoder.EncoderOMT(common.parse(domain, problem), modifier.LinearModifier(), cache=cache))
+
+            row = []
+            for incremental in [False, True]:
+                result, elapsed = common.timedWithTimeout(lambda: solve(domain, problem, incremental, cache, args.b), args.timeout)
+                row.append((result, elapsed))
+
+            def column(result, elapsed, field):
+                if result is None:
+                    return '-'
+                return '{:.2f}'.format(result[0]) if field == 'enc' else '{:.2f}'.format(elapsed) if field == 'total' else str(result[1])
+
+            print('{:<12} {:<16} {:>10} {:>10} {:>10} {:>10} {:>8} {:>8}'.format(
+                suite, os.path.basename(problem),
+                column(*row[0], 'enc'), column(*row[1], 'enc'),
+                column(*row[0], 'total'), column(*row[1], 'total'),
+                column(*row[0], 'cost'), column(*row[1], 'cost')))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+############################################################################
+##    This file is part of OMTPlan.
+##
+##    OMTPlan is free software: you can redistribute it and/or modify
+##    it under the terms of the GNU General Public License as published by
+##    the Free Software Foundation, either version 3 of the License, or
+##    (at your option) any later version.
+##
+##    OMTPlan is distributed in the hope that it will be useful,
+##    but WITHOUT ANY WARRANTY; without even the implied warranty of
+##    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##    GNU General Public License for more details.
+##
+##    You should have received a copy of the GNU General Public License
+##    along with OMTPlan.  If not, see <https://www.gnu.org/licenses/>.
+############################################################################
+
+"""
+Compares the arithmetic objective of the OMT encoding with the weighted
+MaxSAT one (soft constraints over action variables). Reports the search
+time and the cost found with each backend, and the backend actually used
+(metrics that are not sums of constant action costs fall back to arith).
+
+Usage:
+
+    python3 benchmarks/omt_objective.py [-suites counters sdac/sec-clearance/sec_clear_2_2-linear ...] [-instances 3] [-timeout 300]
+"""
+
+import os
+import argparse
+
+import common
+
+from planner import encoder
+from planner import modifier
+from planner import search
+
+SUITES = ['counters', 'linear/fo-counters',
+          'sdac/sec-clearance/sec_clear_2_2-linear', 'sdac/sec-clearance/sec_clear_2_3-linear',
+          'sdac/sec-clearance/sec_clear_3_2-linear', 'sdac/sec-clearance/sec_clear_3_3-linear']
+
+BACKENDS = ['arith', 'maxsat']
+
+def solve(domain, problem, backend, cache, bound):
+    """!
+    Finds an optimal plan with the OMT search.
+
+    @return cost of the plan found (None if not found).
+    @return objective backend used by the encoder.
+    """
+    task = common.parse(domain, problem)
+    e = encoder.EncoderOMT(task, modifier.LinearModifier(), cache=cache, objective=backend)
+    s = search.SearchOMT(e, bound)
+    solution = s.do_search()
+    return (str(solution.cost) if solution else None), e.objective_backend
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks objective backends of the OMT encoding.')
+    parser.add_argument('-suites', nargs='+', default=SUITES, help='IJCAI20 suites to run (prefixed by their category but for simple ones).')
+    parser.add_argument('-instances', type=int, default=3, help='Maximum number of instances per suite.')
+    parser.add_argument('-timeout', type=int, default=300, help='Timeout (seconds) per instance and backend.')
+    parser.add_argument('-b', type=int, default=100, help='Upper bound on the horizon.')
+    args = parser.parse_args()
+
+    cache = common.groundingCache()
+
+    print('{:<40} {:<16} {:>10} {:>10} {:>8} {:>8} {:>8}'.format(
+        'suite', 'instance', 'arith(s)', 'maxsat(s)', 'cost', 'cost-ms', 'used'))
+
+    for suite in args.suites:
+        for domain, problem in common.instances(suite, args.instances):
+            # Ground once outside the timed runs
+            common.quietly(lambda: encoder.EncoderOMT(common.parse(domain, problem), modifier.LinearModifier(), cache=cache))
+
+            times = []
+            costs = []
+            used = '-'
+            for backend in BACKENDS:
+                result, elapsed = common.timedWithTimeout(lambda: solve(domain, problem, backend, cache, args.b), args.timeout)
+                times.append('-' if result is None else '{:.2f}'.format(elapsed))
+                costs.append('-' if result is None else str(result[0]))
+                if backend == 'maxsat' and result is not None:
+                    used = result[1]
+
+            print('{:<40} {:<16} {:>10} {:>10} {:>8} {:>8} {:>8}'.format(
+                suite, os.path.basename(problem), times[0], times[1], costs[0], costs[1], used))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+############################################################################
+##    This file is part of OMTPlan.
+##
+##    OMTPlan is free software: you can redistribute it and/or modify
+##    it under the terms of the GNU General Public License as published by
+##    the Free Software Foundation, either version 3 of the License, or
+##    (at your option) any later version.
+##
+##    OMTPlan is distributed in the hope that it will be useful,
+##    but WITHOUT ANY WARRANTY; without even the implied warranty of
+##    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##    GNU General Public License for more details.
+##
+##    You should have received a copy of the GNU General Public License
+##    along with OMTPlan.  If not, see <https://www.gnu.org/licenses/>.
+############################################################################
+
+"""
+Compares at-most-one encodings of parallel mutexes: one clause per
+mutex pair against clique-based at-most-one constraints. For each encoding
+it reports the size of the execution semantics at the horizon where a plan
+is found and the time needed by the SMT linear search to find it.
+
+Usage:
+
+    python3 benchmarks/parallel_amo.py [-suites depots rover counters] [-instances 3] [-encodings pairwise pb seqcounter commander]
+"""
+
+import os
+import argparse
+
+import common
+
+import z3
+
+from planner import encoder
+from planner import modifier
+from planner import search
+
+def semanticsSize(constraints):
+    """!
+    Measures execution semantics constraints.
+
+    @param constraints: list of Z3 constraints.
+    @return number of constraints.
+    @return number of literal occurrences.
+    @return number of auxiliary variables.
+    """
+    literals = 0
+    auxiliary = set()
+    for c in constraints:
+        args = c.children() if z3.is_or(c) or z3.is_app_of(c, z3.Z3_OP_PB_LE) else [c]
+        literals += len(args)
+        for arg in args:
+            var = arg.children()[0] if z3.is_not(arg) else arg
+            if var.decl().name().startswith('amo_'):
+                auxiliary.add(var.decl().name())
+    return len(constraints), literals, len(auxiliary)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks at-most-one encodings of parallel mutexes.')
+    parser.add_argument('-suites', nargs='+', default=['depots', 'rover', 'counters'], help='IJCAI20 suites to run.')
+    parser.add_argument('-instances', type=int, default=3, help='Maximum number of instances per suite.')
+    parser.add_argument('-encodings', nargs='+', default=['pairwise', 'pb', 'seqcounter', 'commander'], help='At-most-one encodings to compare.')
+    parser.add_argument('-b', type=int, default=100, help='Upper bound on the horizon.')
+    args = parser.parse_args()
+
+    cache = common.groundingCache()
+
+    print('{:<10} {:<16} {:<11} {:>8} {:>8} {:>10} {:>8} {:>8} {:>9} {:>6}'.format(
+        'suite', 'instance', 'encoding', 'mutexes', 'cliques', 'constrs', 'lits', 'aux', 'solve(s)', 'steps'))
+
+    for suite in args.suites:
+        for domain, problem in common.instances(suite, args.instances):
+            task = common.parse(domain, problem)
+            for encoding in args.encodings:
+                e = common.quietly(lambda: encoder.EncoderSMT(task, modifier.ParallelModifier(encoding), cache=cache))
+                s = search.SearchSMT(e, args.b)
+                solution, elapsed = common.timed(lambda: common.quietly(s.do_linear_search))
+
+                constraints, literals, auxiliary = semanticsSize(e.encode(s.horizon)['sem'])
+                cliques = len(e.mutexes.cliques()) if not encoding == 'pairwise' else '-'
+
+                print('{:<10} {:<16} {:<11} {:>8} {:>8} {:>10} {:>8} {:>8} {:>9.2f} {:>6}'.format(
+                    suite, os.path.basename(problem), encoding, len(e.mutexes), cliques,
+                    constraints, literals, auxiliary, elapsed, s.horizon if s.found else '-'))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+############################################################################
+##    This file is part of OMTPlan.
+##
+##    OMTPlan is free software: you can redistribute it and/or modify
+##    it under the terms of the GNU General Public License as published by
+##    the Free Software Foundation, either version 3 of the License, or
+##    (at your option) any later version.
+##
+##    OMTPlan is distributed in the hope that it will be useful,
+##    but WITHOUT ANY WARRANTY; without even the implied warranty of
+##    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##    GNU General Public License for more details.
+##
+##    You should have received a copy of the GNU General Public License
+##    along with OMTPlan.  If not, see <https://www.gnu.org/licenses/>.
+############################################################################
+
+"""
+Cross-checks the dynamic-programming plan counter of planner.pathcount
+against utils.model_counting on the (linear) contrastive experiments of
+a case study, and compares their running times. Horizons can be capped
+to keep model counting tractable.
+
+Usage:
+
+    python3 benchmarks/plan_counting.py [-experiments pddl_examples/IPCs/caseStudy/experiments/...txt] [-commands 10] [-maxhorizon 8] [-timeout 300]
+"""
+
+import os
+import glob
+import argparse
+
+import common
+
+from model_counting import EXPERIMENTS, parseCommand
+
+from planner import encoder
+from planner import modifier
+from planner import pathcount
+import utils
+
+def count(options, dynamic, cache):
+    """!
+    Counts fact and foil supports of a contrastive question.
+
+    @return fact support, foil support.
+    """
+    task = common.parse(options.domain, options.problem)
+    e = encoder.EncoderSMTContrastive(task, modifier.LinearModifier(), options.first_action, options.second_action,
+                                      options.step, options.axiom, cache=cache)
+    if dynamic:
+        counter = pathcount.PathCounter(e)
+        return counter.count(options.translate, 'fact'), counter.count(options.translate, 'foil')
+    formula = e.encode(options.translate)
+    variables = utils.encoder_action_list(e, options.translate)
+    solver = utils.contrastive_base_solver(formula)
+    return utils.model_counting(formula, variables, 'fact', solver=solver), utils.model_counting(formula, variables, 'foil', solver=solver)
+
+def main():
+    parser = argparse.ArgumentParser(description='Cross-checks dynamic-programming plan counting.')
+    parser.add_argument('-experiments', nargs='+', default=sorted(glob.glob(os.path.join(EXPERIMENTS, '*.txt'))), help='Files of contrastive experiment commands.')
+    parser.add_argument('-commands', type=int, default=10, help='Maximum number of commands per file.')
+    parser.add_argument('-maxhorizon', type=int, default=None, help='Caps the horizon of the commands.')
+    parser.add_argument('-timeout', type=int, default=300, help='Timeout (seconds) per command and counter.')
+    args = parser.parse_args()
+
+    cache = common.groundingCache()
+
+    print('{:<6} {:<6} {:>4} {:>10} {:>10} {:>10} {:>10}'.format(
+        'axiom', 'H', '#', 'fact', 'foil', 'smt(s)', 'dp(s)'))
+
+    for experiments in args.experiments:
+        with open(experiments) as f:
+            commands = [options for options in [parseCommand(line) for line in f if line.startswith('time')]
+                        if options is not None and not options.parallel]
+
+        for number, options in enumerate(commands[:args.commands]):
+            if args.maxhorizon is not None:
+                options.translate = min(options.translate, args.maxhorizon)
+            smt, smt_time = common.timedWithTimeout(lambda: count(options, False, cache), args.timeout)
+            dp, dp_time = common.timedWithTimeout(lambda: count(options, True, cache), args.timeout)
+
+            supports = dp if dp is not None else smt
+            print('{:<6} {:<6} {:>4} {:>10} {:>10} {:>10} {:>10}'.format(
+                options.axiom, options.translate, number,
+                '-' if supports is None else supports[0], '-' if supports is None else supports[1],
+                '-' if smt is None else '{:.2f}'.format(smt_time), '-' if dp is None else '{:.2f}'.format(dp_time)))
+
+            if smt is not None and dp is not None and smt != dp:
+                print('Supports differ: smt {} dp {}'.format(smt, dp))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+############################################################################
+##    This file is part of OMTPlan.
+##
+##    OMTPlan is free software: you can redistribute it and/or modify
+##    it under the terms of the GNU General Public License as published by
+##    the Free Software Foundation, either version 3 of the License, or
+##    (at your option) any later version.
+##
+##    OMTPlan is distributed in the hope that it will be useful,
+##    but WITHOUT ANY WARRANTY; without even the implied warranty of
+##    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##    GNU General Public License for more details.
+##
+##    You should have received a copy of the GNU General Public License
+##    along with OMTPlan.  If not, see <https://www.gnu.org/licenses/>.
+############################################################################
+
+"""
+Runs the SMT linear search (or the OMT search, or projected model
+counting of the plans at a given horizon) with each solver preset on
+propositional IPC suites and numeric IJCAI20 suites, and reports the
+preset picked automatically from the kind of each problem.
+
+Usage:
+
+    python3 benchmarks/solver_presets.py [-suites IPCs/classicalPlanning/gripper counters ...] [-omt | -counting 6] [-instances 3] [-timeout 300]
+"""
+
+import os
+import argparse
+
+import common
+
+from planner import encoder
+from planner import modifier
+from planner import search
+from planner import solvers
+from planner import counting
+import utils
+
+SUITES = ['IPCs/classicalPlanning/gripper', 'IPCs/classicalPlanning/blocks-reduced', 'IPCs/classicalPlanning/depot',
+          'counters', 'depots', 'sailing']
+
+def countPlans(domain, problem, preset, cache, horizon):
+    """!
+    Counts the plans of a given horizon (projected on action variables)
+    with the counting solver of the given preset.
+
+    @return number of plans as a string.
+    """
+    task = common.parse(domain, problem)
+    e = encoder.EncoderSMT(task, modifier.LinearModifier(), cache=cache)
+    formula = e.encode(horizon)
+    solver = solvers.makeIncrementalSolver(preset)
+    for k, v in formula.items():
+        solver.add(v)
+    return str(counting.countModels(solver, utils.encoder_action_list(e, horizon)))
+
+def solve(domain, problem, preset, omt, cache, bound):
+    """!
+    Finds a plan with the given solver preset.
+
+    @return cost of the plan (horizon for SMT) as a string, None if not found.
+    """
+    task = common.parse(domain, problem)
+    if omt:
+        e = encoder.EncoderOMT(task, modifier.LinearModifier(), cache=cache)
+        s = search.SearchOMT(e, bound, preset=preset)
+        solution = s.do_search()
+        return str(solution.cost) if solution else None
+    e = encoder.EncoderSMT(task, modifier.LinearModifier(), cache=cache)
+    s = search.SearchSMT(e, bound, preset=preset)
+    s.do_linear_search()
+    return str(s.horizon) if s.found else None
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks solver presets.')
+    parser.add_argument('-suites', nargs='+', default=SUITES, help='Suites to run (IJCAI20 names, or IPCs/<category>/<domain>).')
+    parser.add_argument('-presets', nargs='+', default=list(solvers.PRESETS.keys()), help='Solver presets to compare.')
+    parser.add_argument('-omt', action='store_true', help='Runs the OMT search instead of the SMT linear search.')
+    parser.add_argument('-counting', type=int, default=None, help='Counts the plans of this horizon instead of searching.')
+    parser.add_argument('-instances', type=int, default=3, help='Maximum number of instances per suite.')
+    parser.add_argument('-timeout', type=int, default=300, help='Timeout (seconds) per instance and preset.')
+    parser.add_argument('-b', type=int, default=100, help='Upper bound on the horizon.')
+    args = parser.parse_args()
+
+    cache = common.groundingCache()
+
+    print('{:<40} {:<20} {:>6} {}'.format('suite', 'instance', 'auto', ' '.join(['{:>10}'.format(preset) for preset in args.presets])))
+
+    for suite in args.suites:
+        for domain, problem in common.instances(suite, args.instances):
+            # Ground once outside the timed runs
+            e = common.quietly(lambda: encoder.EncoderSMT(common.parse(domain, problem), modifier.LinearModifier(), cache=cache))
+            auto = solvers.selectPreset(e.ground_problem)
+
+            row = []
+            for preset in args.presets:
+                if args.counting is not None:
+                    run = lambda: countPlans(domain, problem, preset, cache, args.counting)
+                else:
+                    run = lambda: solve(domain, problem, preset, args.omt, cache, args.b)
+                result, elapsed = common.timedWithTimeout(run, args.timeout)
+                row.append('{:>10}'.format('-' if result is None else '{:.2f}'.format(elapsed)))
+            print('{:<40} {:<20} {:>6} {}'.format(suite, os.path.basename(problem), auto, ' '.join(row)))
+
+if __name__ == '__main__':
+    main()
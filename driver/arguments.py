@@ -26,6 +26,20 @@ DESCRIPTION = """Planner driver script."""
 
 bound = 100
 
+cache_size = 1024
+
+amo_encodings = ['pairwise', 'pb', 'seqcounter', 'commander', 'bimander']
+
+search_strategies = ['linear', 'exponential', 'portfolio']
+
+omt_schedules = ['adaptive', 'fixed']
+
+solver_presets = ['auto', 'default', 'sat', 'arith']
+
+omt_objectives = ['arith', 'maxsat']
+
+model_counters = ['exact', 'components', 'dynamic', 'approx']
+
 def _is_valid_file(arg):
     """
     Checks whether input PDDL files exist and are validate
@@ -66,6 +80,30 @@ def parse_args():
 
     parser.add_argument('-r2e', action='store_true', help='Enables R2E encoding.')
 
+    parser.add_argument('-incremental', action='store_true', help='Extends the SMT/OMT encoding step by step in a single solver instead of re-encoding each horizon (OMT only rebuilds the relaxed suffix).')
+
+    parser.add_argument('-anytime', action='store_true', help='Anytime OMT search: reports each improving plan with its cost and bounds the cost of later horizons by the best plan found.')
+
+    parser.add_argument('-search', choices=search_strategies, default='linear', help='Horizon search strategy: linear ramp-up, doubling the horizon until a plan is found and bisecting down to the optimal horizon (SMT only), or checking several horizons concurrently (SMT and OMT).')
+
+    parser.add_argument('-schedule', choices=omt_schedules, default='adaptive', help='Horizon schedule of the OMT search: starting from the relaxed planning graph lower bound and growing by the fluents touched by the relaxed suffix, or fixed percentages of the upper bound (always used by the portfolio search).')
+
+    parser.add_argument('-workers', type=int, default=os.cpu_count(), help='Number of worker processes of the portfolio search.')
+
+    parser.add_argument('-amo', choices=amo_encodings, default='pb', help='At-most-one encoding of action mutexes. Linear encodings use it over all actions of a step, parallel ones over cliques of mutex actions (pairwise adds a clause per mutex pair).')
+
+    parser.add_argument('-timelimit', type=float, help='Wall-clock time limit (in seconds) of the whole search. When reached, the last horizon proven unsat is reported.')
+
+    parser.add_argument('-checktimelimit', type=float, help='Time limit (in seconds) of each solver check.')
+
+    parser.add_argument('-memlimit', type=int, help='Memory limit (in MB) of the Z3 solvers.')
+
+    parser.add_argument('-preset', choices=solver_presets, default='auto', help='Solver preset: SAT-oriented tactics for propositional problems, arithmetic preprocessing and the SYMBA optimization engine for numeric ones, or the default Z3 solvers. auto picks it from the kind of the problem.')
+
+    parser.add_argument('-objective', choices=omt_objectives, default='arith', help='Objective of the OMT encoding: an arithmetic term, or weighted soft constraints over action variables (unit costs or metrics summing constant action costs, falls back to arith otherwise).')
+
+    parser.add_argument('-lazyloops', action='store_true', help='Adds the loop formulas of the OMT encoding only once violated by a model, re-solving until none is.')
+
     parser.add_argument('-b', type=int, default=bound, help='Upper bound for OMTPlan search.')
 
     parser.add_argument('-testencoding', action='store_true', help='Tests encoding for a given problem.')
@@ -82,10 +120,34 @@ def parse_args():
     
     parser.add_argument('-step', type=int, default=0, help='Step of encoded action for axioms 3 and 4')
     
+    parser.add_argument('-counter', choices=model_counters, default='exact', help='Model counter of the contrastive supports: exact enumeration, exact #SAT with component caching on the bit-blasted formula (propositional problems), exact dynamic programming over reachable states (propositional problems, linear semantics), or hashing-based approximate counting with (epsilon, delta) guarantees.')
+
+    parser.add_argument('-epsilon', type=float, default=0.8, help='Tolerance of approximate counting: counts are within a factor 1+epsilon of the support.')
+
+    parser.add_argument('-delta', type=float, default=0.2, help='Confidence of approximate counting: counts are within tolerance with probability 1-delta.')
+
     parser.add_argument('-foil', action='store_true', help='Starts only foil model counting')
 
     parser.add_argument('-profiling', action='store_true', help='Enables profiling feature')
 
+    parser.add_argument('-noprune', action='store_true', help='Disables relaxed reachability pruning of the ground problem and the folding of actions that cannot be executed at early steps.')
+
+    parser.add_argument('-nocache', action='store_true', help='Bypasses the grounding cache.')
+
+    parser.add_argument('-clearcache', action='store_true', help='Clears the grounding cache before running.')
+
+    parser.add_argument('-cachedir', help='Directory where grounded problems are cached (defaults to grounding_cache in the OMTPlan folder).')
+
+    parser.add_argument('-cachesize', type=int, default=cache_size, help='Size bound (in MB) of the grounding cache.')
+
     args = parser.parse_args()
 
+    # Search strategies that would otherwise be silently ignored
+
+    if args.search == 'portfolio' and (args.incremental or args.anytime):
+        parser.error('-search portfolio cannot be combined with -incremental or -anytime')
+
+    if args.search == 'exponential' and args.omt:
+        parser.error('-search exponential is only available for SMT encodings')
+
     return args
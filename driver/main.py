@@ -28,8 +28,9 @@ from copy import deepcopy
 from planner import encoder
 from planner import modifier
 from planner import search
+from planner import solvers
+from planner import cache as groundcache
 
-from unified_planning.io import PDDLReader
 from unified_planning.shortcuts import *
     
 def main(BASE_DIR):
@@ -43,6 +44,12 @@ def main(BASE_DIR):
     if args.profiling:
         from pyinstrument import Profiler
 
+    # Set up the grounding cache
+    cache_dir = args.cachedir if args.cachedir else os.path.join(BASE_DIR, 'grounding_cache')
+    if args.clearcache:
+        groundcache.GroundingCache(cache_dir).clear()
+    cache = None if args.nocache else groundcache.GroundingCache(cache_dir, args.cachesize * 1024 * 1024)
+
     if args.testencoding or args.testsearch:
         failed_to_encode = []
         solved_problems  = []
@@ -55,16 +62,16 @@ def main(BASE_DIR):
         problems = utils.get_planning_problems(BASE_DIR)
         for problem in problems:
             try:
-                planning_task = PDDLReader().parse_problem(problem['domain'], problem['instance'])
+                planning_task = groundcache.TaskFiles(problem['domain'], problem['instance'])
                 if args.smt:
-                    e = encoder.EncoderSMT(planning_task, modifier.LinearModifier() if args.linear else modifier.ParallelModifier())
+                    e = encoder.EncoderSMT(planning_task, modifier.LinearModifier(args.amo) if args.linear else modifier.ParallelModifier(args.amo), cache=cache, prune=not args.noprune)
                     if args.testencoding:
                         print('SMT: Encoding problem: {}-{}'.format(problem['name'], planning_task.name))
                         formula = e.encode(1)
                         utils.printSMTFormula(formula, '{}-{}'.format(problem['name'], planning_task.name), translate_dump_dir)
                     elif args.testsearch:
                         print('SMT: Solving problem: {}-{}'.format(problem['name'], planning_task.name))
-                        s = search.SearchSMT(e, args.b)
+                        s = search.SearchSMT(e, args.b, timeout=args.timelimit, check_timeout=args.checktimelimit, memory=args.memlimit, preset=args.preset)
                         plan = s.do_linear_search()
                         if len(plan.plan.actions) == 0:
                             raise Exception('SMT: No plan found!')
@@ -80,14 +87,14 @@ def main(BASE_DIR):
                     else:
                         raise Exception('No test specified, use -testencoding or -testsearch')
                 elif args.omt:
-                    e = encoder.EncoderOMT(planning_task, modifier.LinearModifier() if args.linear else modifier.ParallelModifier())
+                    e = encoder.EncoderOMT(planning_task, modifier.LinearModifier(args.amo) if args.linear else modifier.ParallelModifier(args.amo), cache=cache, prune=not args.noprune, objective=args.objective, loops='lazy' if args.lazyloops else 'eager')
                     if args.testencoding:
                         print('OMT: Encoding problem: {}-{}'.format(problem['name'], planning_task.name))
                         formula = e.encode(1)
                         utils.printOMTFormula(formula, '{}-{}'.format(problem['name'], planning_task.name), translate_dump_dir)
                     elif args.testsearch:
                         print('OMT: Solving problem: {}-{}'.format(problem['name'], planning_task.name))
-                        s = search.SearchOMT(e, args.b)
+                        s = search.SearchOMT(e, args.b, adaptive=args.schedule == 'adaptive', timeout=args.timelimit, check_timeout=args.checktimelimit, memory=args.memlimit, preset=args.preset)
                         plan = s.do_search()
                         if len(plan.plan.actions) == 0:
                             raise Exception('OMT: No plan found!')
@@ -119,9 +126,8 @@ def main(BASE_DIR):
         print('Exiting now...')
         sys.exit()
 
-    # Parse PDDL problem
-    reader = PDDLReader()
-    task = reader.parse_problem(args.domain, args.problem)    
+    # PDDL problem, parsed only if its grounding is not cached
+    task = groundcache.TaskFiles(args.domain, args.problem)
 
     if args.smt:
         
@@ -136,12 +142,12 @@ def main(BASE_DIR):
             step = args.step
             if args.profiling:
                 with Profiler(interval=0.1) as profiler:
-                    e = encoder.EncoderSMTContrastive(task, modifier.LinearModifier() if args.linear else modifier.ParallelModifier(), first_action, second_action, step, axiom)
+                    e = encoder.EncoderSMTContrastive(task, modifier.LinearModifier(args.amo) if args.linear else modifier.ParallelModifier(args.amo), first_action, second_action, step, axiom, cache=cache, prune=not args.noprune)
                 profiler.print()
             else:
-                e = encoder.EncoderSMTContrastive(task, modifier.LinearModifier() if args.linear else modifier.ParallelModifier(), first_action, second_action, step, axiom)
+                e = encoder.EncoderSMTContrastive(task, modifier.LinearModifier(args.amo) if args.linear else modifier.ParallelModifier(args.amo), first_action, second_action, step, axiom, cache=cache, prune=not args.noprune)
         else:     
-            e = encoder.EncoderSMT(task, modifier.LinearModifier() if args.linear else modifier.ParallelModifier())
+            e = encoder.EncoderSMT(task, modifier.LinearModifier(args.amo) if args.linear else modifier.ParallelModifier(args.amo), cache=cache, prune=not args.noprune)
 
         # Build SMT-LIB encoding and dump (no solving)
         if args.translate:
@@ -153,43 +159,71 @@ def main(BASE_DIR):
                 formula = e.encode(args.translate)
             # Print SMT planning formula (linear) to file
             if args.contrastive:
+                # The base formula is asserted once, fact and foil
+                # axioms are added (and removed) on top of it, for the
+                # counters checking the formula with a solver
+                preset = solvers.selectPreset(e.ground_problem) if args.preset == 'auto' else args.preset
+                base_solver = utils.contrastive_base_solver(formula, preset) if args.counter in ['exact', 'approx'] else None
                 utils.printSMTContrastiveFormula(formula, task.name, BASE_DIR, args.pprint, "fact")
                 utils.printSMTContrastiveFormula(formula, task.name, BASE_DIR, args.pprint, "foil")
                 action_variable_list = utils.encoder_action_list(e, args.translate)
+                def count_support(contrastive_type):
+                    # Exact counts are their own bounds
+                    if args.counter == 'approx':
+                        return utils.approximate_model_counting(formula, action_variable_list, contrastive_type, preset, args.epsilon, args.delta, base_solver)
+                    if args.counter == 'dynamic':
+                        support = utils.plan_counting(e, args.translate, contrastive_type)
+                        return support, support, support
+                    engine = 'components' if args.counter == 'components' else 'enumerate'
+                    support = utils.model_counting(formula, action_variable_list, contrastive_type, preset, engine, base_solver)
+                    return support, support, support
+
+                def report_plausibility(fact_support, foil_support):
+                    print("Plausibility measure: ", foil_support[0]/fact_support[0])
+                    if args.counter == 'approx':
+                        # Both supports are within their bounds with probability 1-delta each
+                        upper = foil_support[2]/fact_support[1] if fact_support[1] > 0 else float('inf')
+                        print("Plausibility bounds: [{}, {}] with confidence {}".format(foil_support[1]/fact_support[2], upper, 1 - 2*args.delta))
+
                 if not args.foil:
                     if args.profiling:
                         with Profiler(interval=0.1) as profiler:
-                            fact_support = utils.model_counting(formula, action_variable_list, "fact")
+                            fact_support = count_support("fact")
                             
                         profiler.print()
                         with Profiler(interval=0.1) as profiler:
-                            if(fact_support!=0):
-                                foil_support = utils.model_counting(formula, action_variable_list, "foil")
-                                plausibility = foil_support/fact_support
-                                print("Plausibility measure: ", plausibility)
+                            if(fact_support[0]!=0):
+                                foil_support = count_support("foil")
+                                report_plausibility(fact_support, foil_support)
                             else:
                                 print("Something went wrong. Fact support is empty.")   
                         profiler.print()
                     else:
-                        fact_support = utils.model_counting(formula, action_variable_list, "fact")
-                        if(fact_support!=0):
-                            foil_support = utils.model_counting(formula, action_variable_list, "foil")
-                            plausibility = foil_support/fact_support
-                            print("Plausibility measure: ", plausibility)
+                        fact_support = count_support("fact")
+                        if(fact_support[0]!=0):
+                            foil_support = count_support("foil")
+                            report_plausibility(fact_support, foil_support)
                         else:
                             print("Something went wrong. Fact support is empty.")
                 else:
-                    foil_support = utils.model_counting(formula, action_variable_list, "foil")
+                    foil_support = count_support("foil")
             else:               
                 utils.printSMTFormula(formula,task.name, BASE_DIR)
         else:
             # Ramp-up search for optimal planning with unit costs
-            s = search.SearchSMT(e, args.b)
-            plan = s.do_linear_search()
+            s = search.SearchSMT(e, args.b, timeout=args.timelimit, check_timeout=args.checktimelimit, memory=args.memlimit, preset=args.preset)
+            if args.search == 'portfolio':
+                plan = s.do_portfolio_search(args.workers)
+            elif args.search == 'exponential':
+                plan = s.do_exponential_search(args.incremental)
+            elif args.incremental:
+                plan = s.do_incremental_search()
+            else:
+                plan = s.do_linear_search()
 
     elif args.omt:
 
-        e = encoder.EncoderOMT(task, modifier.LinearModifier() if args.linear else modifier.ParallelModifier())
+        e = encoder.EncoderOMT(task, modifier.LinearModifier(args.amo) if args.linear else modifier.ParallelModifier(args.amo), cache=cache, prune=not args.noprune, objective=args.objective, loops='lazy' if args.lazyloops else 'eager')
         
         # Build SMT-LIB encoding and dump (no solving)
         if args.translate:
@@ -200,15 +234,22 @@ def main(BASE_DIR):
             # Print OMT planning formula (linear) to file
             utils.printOMTFormula(formula,task.name, BASE_DIR)            
         else:
-            s = search.SearchOMT(e, args.b)
-            plan = s.do_search()
+            s = search.SearchOMT(e, args.b, adaptive=args.schedule == 'adaptive', timeout=args.timelimit, check_timeout=args.checktimelimit, memory=args.memlimit, preset=args.preset)
+            if args.search == 'portfolio':
+                plan = s.do_portfolio_search(args.workers)
+            elif args.anytime:
+                plan = s.do_anytime_search()
+            elif args.incremental:
+                plan = s.do_incremental_search()
+            else:
+                plan = s.do_search()
     elif args.r2e:
-        e = encoder.R2EEncoding(task)
+        e = encoder.R2EEncoding(task, cache=cache, prune=not args.noprune)
         if args.translate:
             formula = e.encode(args.translate)
             utils.printR2EFormula(formula, task.name, BASE_DIR)
         else:
-            s = search.SearchR2E(e, args.b)
+            s = search.SearchR2E(e, args.b, timeout=args.timelimit, check_timeout=args.checktimelimit, memory=args.memlimit, preset=args.preset)
             plan = s.do_search()
     else:
         print('No solving technique specified, choose between SMT or OMT.')
@@ -216,7 +257,9 @@ def main(BASE_DIR):
         sys.exit()
 
     if not args.translate:
-        if plan.validate():
+        if not plan:
+            print('No plan found')
+        elif plan.validate():
             print('The plan is valid')
             print(plan.plan)
         else:
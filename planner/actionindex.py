@@ -0,0 +1,129 @@
+############################################################################
+##    This file is part of OMTPlan.
+##
+##    OMTPlan is free software: you can redistribute it and/or modify
+##    it under the terms of the GNU General Public License as published by
+##    the Free Software Foundation, either version 3 of the License, or
+##    (at your option) any later version.
+##
+##    OMTPlan is distributed in the hope that it will be useful,
+##    but WITHOUT ANY WARRANTY; without even the implied warranty of
+##    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##    GNU General Public License for more details.
+##
+##    You should have received a copy of the GNU General Public License
+##    along with OMTPlan.  If not, see <https://www.gnu.org/licenses/>.
+############################################################################
+
+from collections import defaultdict
+
+from unified_planning.model.walkers import FreeVarsExtractor
+
+class ActionIndex():
+    """
+    Precomputed preconditions and effects of the actions of a ground problem.
+
+    Fluents are interned to integer IDs (by name, which is how encoders
+    index their Z3 variables) and actions are referred to by their position
+    in the action list of the ground problem. Reverse maps give, for each
+    fluent, the actions reading or writing it, so that encoders do not need
+    to scan all actions for every fluent (and every step).
+    """
+
+    def __init__(self, ground_problem):
+        # fluent name <-> ID
+        self.fluent_ids = dict()
+        self.fluent_names = []
+
+        # action name <-> ID
+        self.action_ids = dict()
+        self.action_names = []
+
+        # Per action: IDs of the fluents in the preconditions (as a whole
+        # and split by precondition), of the fluents set to true, to false,
+        # or modified by numeric effects, and of all the fluents affected
+        self.pre = []
+        self.pre_fluents = []
+        self.add = []
+        self.delete = []
+        self.num = []
+        self.eff = []
+
+        # Per fluent: actions reading, adding, deleting it or modifying its
+        # value. Actions appear once per matching effect, in the order of
+        # the action list.
+        self.readers = defaultdict(list)
+        self.adders = defaultdict(list)
+        self.deleters = defaultdict(list)
+        self.modifiers = defaultdict(list)
+
+        self._build(ground_problem)
+
+    def fluentId(self, name):
+        """!
+        Returns the ID of a fluent, interning it if it is new.
+
+        @param name: name of the fluent.
+        @return fluent ID.
+        """
+        fid = self.fluent_ids.get(name)
+        if fid is None:
+            fid = len(self.fluent_names)
+            self.fluent_ids[name] = fid
+            self.fluent_names.append(name)
+        return fid
+
+    def _build(self, ground_problem):
+        extractor = FreeVarsExtractor()
+
+        for aid, action in enumerate(ground_problem.actions):
+            self.action_ids[action.name] = aid
+            self.action_names.append(action.name)
+
+            pre_fluents = []
+            for pre in action.preconditions:
+                pre_fluents.append([self.fluentId(str(var)) for var in extractor.get(pre)])
+            pre = set([fid for fids in pre_fluents for fid in fids])
+
+            add, delete, num, eff = set(), set(), set(), set()
+            for effect in action.effects:
+                fid = self.fluentId(str(effect.fluent))
+                eff.add(fid)
+                if effect.value.type.is_bool_type():
+                    if effect.value.is_true():
+                        add.add(fid)
+                        self.adders[fid].append(aid)
+                    else:
+                        delete.add(fid)
+                        self.deleters[fid].append(aid)
+                elif effect.value.type.is_int_type() or effect.value.type.is_real_type():
+                    num.add(fid)
+                    self.modifiers[fid].append(aid)
+
+            for fid in pre:
+                self.readers[fid].append(aid)
+
+            self.pre.append(frozenset(pre))
+            self.pre_fluents.append(pre_fluents)
+            self.add.append(frozenset(add))
+            self.delete.append(frozenset(delete))
+            self.num.append(frozenset(num))
+            self.eff.append(frozenset(eff))
+
+    def actionId(self, name):
+        """!
+        Returns the ID of an action.
+
+        @param name: name of the ground action.
+        @return action ID.
+        """
+        return self.action_ids[name]
+
+    def writers(self, fid):
+        """!
+        Returns the actions having an effect on a fluent.
+
+        @param fid: fluent ID.
+        @return list of action IDs.
+        """
+        return self.adders.get(fid, []) + self.deleters.get(fid, []) + self.modifiers.get(fid, [])
@@ -0,0 +1,155 @@
+############################################################################
+##    This file is part of OMTPlan.
+##
+##    OMTPlan is free software: you can redistribute it and/or modify
+##    it under the terms of the GNU General Public License as published by
+##    the Free Software Foundation, either version 3 of the License, or
+##    (at your option) any later version.
+##
+##    OMTPlan is distributed in the hope that it will be useful,
+##    but WITHOUT ANY WARRANTY; without even the implied warranty of
+##    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##    GNU General Public License for more details.
+##
+##    You should have received a copy of the GNU General Public License
+##    along with OMTPlan.  If not, see <https://www.gnu.org/licenses/>.
+############################################################################
+
+from z3 import *
+
+## At-most-one encodings of a set of Z3 literals.
+##
+## Each encoding takes the literals and a prefix used to name auxiliary
+## variables (which must be unique within the formula) and returns a list
+## of Z3 constraints.
+
+# Size of the groups used by the commander encoding
+COMMANDER_GROUP_SIZE = 3
+
+def pairwise(literals, prefix):
+    """!
+    Pairwise encoding: one binary clause per pair of literals.
+
+    @param literals: list of Z3 literals.
+    @param prefix: prefix of auxiliary variables (unused).
+    @return list of Z3 constraints.
+    """
+    c = []
+    for i in range(len(literals)):
+        for j in range(i+1, len(literals)):
+            c.append(z3.Or(z3.Not(literals[i]), z3.Not(literals[j])))
+    return c
+
+def pb(literals, prefix):
+    """!
+    Pseudo-boolean encoding, handled natively by Z3.
+
+    @param literals: list of Z3 literals.
+    @param prefix: prefix of auxiliary variables (unused).
+    @return list of Z3 constraints.
+    """
+    return [z3.PbLe([(lit,1) for lit in literals],1)]
+
+def seqcounter(literals, prefix):
+    """!
+    Sequential counter encoding, see
+    ''Towards an Optimal CNF Encoding of Boolean Cardinality Constraints'', Sinz, CP 2005
+
+    @param literals: list of Z3 literals.
+    @param prefix: prefix of auxiliary variables.
+    @return list of Z3 constraints.
+    """
+    n = len(literals)
+    if n <= 1:
+        return []
+
+    # s_i is true if one of the first i+1 literals is true
+    s = [z3.Bool('{}_s{}'.format(prefix,i)) for i in range(n-1)]
+
+    c = [z3.Or(z3.Not(literals[0]), s[0])]
+    for i in range(1, n-1):
+        c.append(z3.Or(z3.Not(literals[i]), s[i]))
+        c.append(z3.Or(z3.Not(s[i-1]), s[i]))
+        c.append(z3.Or(z3.Not(literals[i]), z3.Not(s[i-1])))
+    c.append(z3.Or(z3.Not(literals[n-1]), z3.Not(s[n-2])))
+    return c
+
+def commander(literals, prefix):
+    """!
+    Commander encoding, see
+    ''Efficient CNF Encoding for Selecting 1 from N Objects'', Klieber and Kwon, CFV 2007
+
+    Literals are split in groups, each with a commander variable that
+    must hold if some literal of the group is true. At most one literal
+    per group is allowed (pairwise), and at most one commander (recursively).
+
+    @param literals: list of Z3 literals.
+    @param prefix: prefix of auxiliary variables.
+    @return list of Z3 constraints.
+    """
+    if len(literals) <= COMMANDER_GROUP_SIZE + 1:
+        return pairwise(literals, prefix)
+
+    c = []
+    commanders = []
+    for g, start in enumerate(range(0, len(literals), COMMANDER_GROUP_SIZE)):
+        group = literals[start:start+COMMANDER_GROUP_SIZE]
+        cmd = z3.Bool('{}_c{}'.format(prefix,g))
+        commanders.append(cmd)
+        c.extend(pairwise(group, prefix))
+        for lit in group:
+            c.append(z3.Or(z3.Not(lit), cmd))
+
+    c.extend(commander(commanders, '{}_c'.format(prefix)))
+    return c
+
+def bimander(literals, prefix):
+    """!
+    Bimander encoding, see
+    ''A New Method to Encode the At-Most-One Constraint into SAT'', Nguyen and Mai, SoICT 2015
+
+    Literals are split in groups of two, handled pairwise, and each group
+    is identified by the binary representation of its index over a set of
+    auxiliary bits: a true literal forces the bits to the index of its group.
+
+    @param literals: list of Z3 literals.
+    @param prefix: prefix of auxiliary variables.
+    @return list of Z3 constraints.
+    """
+    groups = [literals[start:start+2] for start in range(0, len(literals), 2)]
+    if len(groups) <= 1:
+        return pairwise(literals, prefix)
+
+    bits = [z3.Bool('{}_b{}'.format(prefix,i)) for i in range((len(groups)-1).bit_length())]
+
+    c = []
+    for g, group in enumerate(groups):
+        c.extend(pairwise(group, prefix))
+        for i, bit in enumerate(bits):
+            value = bit if (g >> i) & 1 else z3.Not(bit)
+            for lit in group:
+                c.append(z3.Or(z3.Not(lit), value))
+    return c
+
+ENCODINGS = {
+    'pairwise': pairwise,
+    'pb': pb,
+    'seqcounter': seqcounter,
+    'commander': commander,
+    'bimander': bimander,
+}
+
+def atMostOne(literals, prefix, encoding='pb'):
+    """!
+    Encodes that at most one of the literals holds. Literals that are
+    the constant False are dropped.
+
+    @param literals: list of Z3 literals.
+    @param prefix: prefix of auxiliary variables.
+    @param encoding: name of the encoding (see ENCODINGS).
+    @return list of Z3 constraints.
+    """
+    literals = [lit for lit in literals if not z3.is_false(lit)]
+    if len(literals) <= 1:
+        return []
+    return ENCODINGS[encoding](literals, prefix)
@@ -0,0 +1,243 @@
+############################################################################
+##    This file is part of OMTPlan.
+##
+##    OMTPlan is free software: you can redistribute it and/or modify
+##    it under the terms of the GNU General Public License as published by
+##    the Free Software Foundation, either version 3 of the License, or
+##    (at your option) any later version.
+##
+##    OMTPlan is distributed in the hope that it will be useful,
+##    but WITHOUT ANY WARRANTY; without even the implied warranty of
+##    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##    GNU General Public License for more details.
+##
+##    You should have received a copy of the GNU General Public License
+##    along with OMTPlan.  If not, see <https://www.gnu.org/licenses/>.
+############################################################################
+
+import os
+import pickle
+import hashlib
+import tempfile
+
+import unified_planning
+from unified_planning.io import PDDLReader
+from unified_planning.shortcuts import *
+from unified_planning.engines import CompilationKind
+
+# Bump this whenever the layout of cached entries changes,
+# so that stale entries are never loaded.
+CACHE_FORMAT_VERSION = 4
+
+# Default size bound of the cache directory (bytes).
+DEFAULT_MAX_SIZE = 1024 * 1024 * 1024
+
+class GroundingCache():
+    """
+    Persistent on-disk cache of grounded problems.
+
+    Entries are keyed by a hash of the domain and problem files, the
+    grounder and the unified-planning version, so that they can be
+    looked up before parsing the files.
+    When the cache grows beyond its size bound, least recently used
+    entries are evicted first.
+    """
+
+    def __init__(self, cache_dir, max_size=DEFAULT_MAX_SIZE):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+
+    def key(self, task, groundername):
+        """!
+        Computes the cache key of a task.
+
+        @param task: lifted planning task, either a TaskFiles instance
+        (keyed by file content) or a task built in code (keyed by its printout).
+        @param groundername: name of the grounding engine.
+        @return key: hex digest identifying the grounding.
+        """
+        digest = hashlib.sha256()
+        for item in [str(CACHE_FORMAT_VERSION), unified_planning.__version__, groundername]:
+            digest.update(item.encode('utf-8'))
+            digest.update(b'\0')
+        if isinstance(task, TaskFiles):
+            for path in [task.domain, task.problem]:
+                with open(path, 'rb') as fo:
+                    digest.update(fo.read())
+                digest.update(b'\0')
+        else:
+            digest.update(str(task).encode('utf-8'))
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, '{}.pkl'.format(key))
+
+    def load(self, key):
+        """!
+        Loads a cache entry and marks it as recently used.
+
+        @param key: cache key.
+        @return entry: cached entry, None if not in cache.
+        """
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'rb') as fo:
+                entry = pickle.load(fo)
+        except Exception:
+            # Corrupted or incompatible entry, drop it.
+            os.remove(path)
+            return None
+        os.utime(path)
+        return entry
+
+    def store(self, key, entry):
+        """!
+        Stores a cache entry, evicting old entries if needed.
+
+        @param key: cache key.
+        @param entry: entry to store.
+        """
+        # Write to a temporary file first so that concurrent
+        # runs never read a partially written entry.
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as fo:
+                pickle.dump(entry, fo, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._path(key))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._evict()
+
+    def clear(self):
+        """
+        Removes all entries from the cache.
+        """
+        for filename in os.listdir(self.cache_dir):
+            if filename.endswith('.pkl') or filename.endswith('.tmp'):
+                os.remove(os.path.join(self.cache_dir, filename))
+
+    def _evict(self):
+        """
+        Evicts least recently used entries until the cache fits its size bound.
+        """
+        entries = []
+        for filename in os.listdir(self.cache_dir):
+            if filename.endswith('.pkl'):
+                stat = os.stat(os.path.join(self.cache_dir, filename))
+                entries.append((stat.st_mtime, stat.st_size, filename))
+
+        total = sum([size for _, size, _ in entries])
+        for _, size, filename in sorted(entries):
+            if total <= self.max_size:
+                break
+            os.remove(os.path.join(self.cache_dir, filename))
+            total -= size
+
+class TaskFiles():
+    """
+    Lifted task read from PDDL files, parsed only when needed (i.e., not
+    when its grounding is found in the cache).
+    """
+
+    def __init__(self, domain, problem):
+        """!
+        @param domain: path of the domain file.
+        @param problem: path of the problem file.
+        """
+        self.domain = domain
+        self.problem = problem
+        self.task = None
+        self._name = None
+
+    def parse(self):
+        """!
+        @return lifted planning task.
+        """
+        if self.task is None:
+            self.task = PDDLReader().parse_problem(self.domain, self.problem)
+        return self.task
+
+    @property
+    def name(self):
+        if self._name is None:
+            self._name = self.parse().name
+        return self._name
+
+def grounderSelection():
+    """!
+    Identifies the grounder unified-planning picks for a task: the first
+    installed engine of its preference list able to ground the task. The
+    problem kind follows from the files, hence files and preference list
+    determine the grounder without instantiating it.
+
+    @return description of the grounder selection.
+    """
+    return ','.join(unified_planning.environment.get_environment().factory.preference_list)
+
+def groundTask(task, cache=None):
+    """!
+    Grounds a task, reusing a cached grounding when available.
+
+    Entries are dictionaries holding the grounding result, the name
+    of the grounder, the name of the lifted task and a dictionary of
+    derived tables that encoders can fill in (and persist) to avoid
+    recomputing them.
+
+    @param task: lifted planning task, or TaskFiles instance (parsed on cache misses only).
+    @param cache: GroundingCache instance (None disables caching).
+    @return entry: dictionary describing the grounding.
+    """
+    key = cache.key(task, grounderSelection()) if cache is not None else None
+
+    if cache is not None:
+        entry = cache.load(key)
+        if entry is not None:
+            if isinstance(task, TaskFiles):
+                task._name = entry['name']
+            return entry
+
+    problem = task.parse() if isinstance(task, TaskFiles) else task
+    with Compiler(problem_kind=problem.kind, compilation_kind=CompilationKind.GROUNDING) as grounder:
+        groundername = grounder.name
+        result = grounder.compile(problem, compilation_kind=CompilationKind.GROUNDING)
+
+    entry = {'key': key, 'grounder': groundername, 'name': problem.name, 'result': result, 'tables': {}}
+    if cache is not None:
+        cache.store(key, entry)
+    return entry
+
+def cachedTable(entry, cache, name, compute):
+    """!
+    Returns a table derived from a grounding. The table is computed only
+    if it is not already stored in the entry. New tables are persisted
+    by storeTables, so that the entry is written once for all of them.
+
+    @param entry: grounding entry (see groundTask).
+    @param cache: GroundingCache instance (None disables caching).
+    @param name: name of the table.
+    @param compute: function computing the table.
+    @return table
+    """
+    tables = entry['tables']
+    if not name in tables:
+        tables[name] = compute()
+        entry['pending'] = True
+    return tables[name]
+
+def storeTables(entry, cache):
+    """!
+    Persists the tables added to a grounding entry (see cachedTable)
+    since it was loaded or stored. Encoders call it once they have
+    computed their tables.
+
+    @param entry: grounding entry (see groundTask).
+    @param cache: GroundingCache instance (None disables caching).
+    """
+    if entry.pop('pending', False) and cache is not None:
+        cache.store(entry['key'], entry)
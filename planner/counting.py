@@ -0,0 +1,552 @@
+############################################################################
+##    This file is part of OMTPlan.
+##
+##    OMTPlan is free software: you can redistribute it and/or modify
+##    it under the terms of the GNU General Public License as published by
+##    the Free Software Foundation, either version 3 of the License, or
+##    (at your option) any later version.
+##
+##    OMTPlan is distributed in the hope that it will be useful,
+##    but WITHOUT ANY WARRANTY; without even the implied warranty of
+##    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##    GNU General Public License for more details.
+##
+##    You should have received a copy of the GNU General Public License
+##    along with OMTPlan.  If not, see <https://www.gnu.org/licenses/>.
+############################################################################
+
+import math
+import random
+import functools
+from collections import defaultdict
+
+from z3 import *
+
+## Projected model counting: number of assignments to a set of Boolean
+## terms (e.g., action variables) that extend to a model of a formula.
+
+def _blockingClause(model, terms):
+    """!
+    Builds the clause excluding the assignment of a model to the terms.
+
+    @param model: Z3 model.
+    @param terms: list of Z3 Boolean terms.
+    @return Z3 clause.
+    """
+    literals = []
+    for term in terms:
+        if is_true(model.eval(term, model_completion=True)):
+            literals.append(Not(term))
+        else:
+            literals.append(term)
+    return Or(literals)
+
+def iterateCounts(solver, terms):
+    """!
+    Enumerates the assignments to the terms that extend to a model of the
+    assertions of a solver, yielding the number found so far after each
+    of them. Models are not kept: each one is replaced by the clause
+    blocking its assignment to the terms.
+
+    Blocking clauses are added in a backtracking point of the solver,
+    which is removed when the enumeration ends (or the generator is
+    closed), so that the solver can be reused afterwards.
+
+    @param solver: Z3 solver containing the formula.
+    @param terms: list of Z3 Boolean terms the models are projected on.
+    @return generator of counts.
+    """
+    terms = list(terms)
+    count = 0
+
+    solver.push()
+    try:
+        while solver.check() == sat:
+            count = count + 1
+            yield count
+            if len(terms) == 0:
+                # A single (empty) assignment
+                break
+            solver.add(_blockingClause(solver.model(), terms))
+    finally:
+        solver.pop()
+
+def countModels(solver, terms, report=None, every=1000, limit=None):
+    """!
+    Counts the assignments to the terms that extend to a model of the
+    assertions of a solver (see iterateCounts).
+
+    @param solver: Z3 solver containing the formula.
+    @param terms: list of Z3 Boolean terms the models are projected on.
+    @param report: function called with the running count every so many models.
+    @param every: number of models between reports.
+    @param limit: stops counting once this many assignments are found.
+    @return number of assignments (at most limit).
+    """
+    count = 0
+    for count in iterateCounts(solver, terms):
+        if report is not None and count % every == 0:
+            report(count)
+        if limit is not None and count >= limit:
+            break
+    return count
+
+def _randomXor(terms, generator):
+    """!
+    Builds a random XOR constraint over the terms: each term is included
+    with probability 1/2, and the parity is random.
+
+    @param terms: list of Z3 Boolean terms.
+    @param generator: random number generator.
+    @return Z3 constraint.
+    """
+    chosen = [term for term in terms if generator.random() < 0.5]
+    parity = generator.random() < 0.5
+    if len(chosen) == 0:
+        return BoolVal(not parity)
+    return functools.reduce(Xor, chosen) == BoolVal(parity)
+
+def approximateCount(solver, terms, epsilon=0.8, delta=0.2, seed=None, report=None):
+    """!
+    Approximates the number of assignments to the terms that extend to a
+    model of the assertions of a solver, see
+
+    ''Algorithmic Improvements in Approximate Counting for Probabilistic
+    Inference: From Linear to Logarithmic SAT Calls'', Chakraborty et al., IJCAI 2016
+
+    Random XOR constraints split the assignments into cells of about the
+    same size. The number of constraints is increased until a cell holds
+    fewer assignments than a threshold (counted exactly), and the count of
+    the cell times the number of cells is an estimate. The median of the
+    estimates is within a factor 1+epsilon of the count with probability
+    at least 1-delta.
+
+    @param solver: Z3 solver containing the formula.
+    @param terms: list of Z3 Boolean terms the models are projected on.
+    @param epsilon: tolerance.
+    @param delta: confidence.
+    @param seed: seed of the random XOR constraints.
+    @param report: function called with each estimate.
+    @return estimate, lower bound and upper bound of the count.
+    """
+    terms = list(terms)
+    generator = random.Random(seed)
+
+    threshold = 1 + int(math.ceil(9.84 * (1 + epsilon / (1 + epsilon)) * (1 + 1 / epsilon) ** 2))
+
+    # Few assignments are counted exactly
+    count = countModels(solver, terms, limit=threshold)
+    if count < threshold:
+        return count, count, count
+
+    iterations = int(math.ceil(17 * math.log2(3 / delta)))
+
+    estimates = []
+    for iteration in range(iterations):
+        xors = [_randomXor(terms, generator) for term in terms]
+        cells = dict()
+
+        def cellCount(m):
+            if not m in cells:
+                solver.push()
+                solver.add(xors[:m])
+                cells[m] = countModels(solver, terms, limit=threshold)
+                solver.pop()
+            return cells[m]
+
+        # Smallest number of XOR constraints giving a small cell, cells
+        # only shrink as constraints are added
+        low, high = 1, len(terms)
+        while low < high:
+            m = (low + high) // 2
+            if cellCount(m) < threshold:
+                high = m
+            else:
+                low = m + 1
+
+        if cellCount(low) < threshold and cellCount(low) > 0:
+            estimate = cellCount(low) * 2 ** low
+            estimates.append(estimate)
+            if report is not None:
+                report(estimate)
+
+    if len(estimates) == 0:
+        return 0, 0, 0
+
+    estimates.sort()
+    estimate = estimates[len(estimates) // 2]
+    return estimate, estimate / (1 + epsilon), estimate * (1 + epsilon)
+
+# Tactics turning a propositional formula (with pseudo-boolean constraints)
+# into CNF. Variable-eliminating tactics (e.g., solve-eqs) are left out:
+# fresh variables introduced here are defined by the original ones, so
+# the number of projected models is preserved.
+CNF_TACTICS = ['simplify', 'card2bv', 'bit-blast', 'tseitin-cnf']
+
+def toCNF(assertions, terms):
+    """!
+    Bit-blasts a propositional formula into CNF over integer literals
+    (DIMACS-like: variables are positive integers, negative literals are
+    negated variables).
+
+    @param assertions: list of Z3 Boolean formulas (or lists of them, as subformulas of encodings).
+    @param terms: list of Z3 Boolean constants the models are projected on.
+    @return list of clauses (sorted tuples of literals), and list of the projected variables.
+    """
+    goal = Goal()
+    for assertion in assertions:
+        goal.add(assertion)
+    result = Then(*CNF_TACTICS)(goal)
+    if len(result) != 1:
+        raise Exception("Bit-blasting split the formula into {} subgoals".format(len(result)))
+
+    # Projected terms are numbered first, so that those missing from the
+    # CNF (i.e., unconstrained) are still counted
+    variables = dict()
+    for term in terms:
+        variables.setdefault(term.get_id(), len(variables) + 1)
+    projected = list(variables.values())
+
+    def literal(atom):
+        if is_not(atom):
+            return -literal(atom.arg(0))
+        if not is_const(atom) or atom.decl().kind() != Z3_OP_UNINTERPRETED:
+            raise Exception("Formula is not propositional after bit-blasting: {}".format(atom))
+        return variables.setdefault(atom.get_id(), len(variables) + 1)
+
+    clauses = set()
+    for clause in result[0]:
+        if is_false(clause):
+            return [tuple()], projected
+        if is_true(clause):
+            continue
+        atoms = clause.children() if is_or(clause) else [clause]
+        literals = set([literal(atom) for atom in atoms])
+        # Tautologies constrain nothing
+        if any([-lit in literals for lit in literals]):
+            continue
+        clauses.add(tuple(sorted(literals)))
+    return list(clauses), projected
+
+def _components(clauses, variables):
+    """!
+    Splits clauses into connected components (clauses sharing variables).
+
+    @param clauses: dictionary of clause IDs to their unassigned literals.
+    @param variables: unassigned variables occurring in the clauses.
+    @return list of (clause IDs, variables) pairs.
+    """
+    parent = dict([(var, var) for var in variables])
+
+    def find(var):
+        while parent[var] != var:
+            parent[var] = parent[parent[var]]
+            var = parent[var]
+        return var
+
+    for literals in clauses.values():
+        root = find(abs(literals[0]))
+        for lit in literals[1:]:
+            other = find(abs(lit))
+            if other != root:
+                parent[other] = root
+
+    components = dict()
+    for cid, literals in clauses.items():
+        component = components.setdefault(find(abs(literals[0])), ([], set()))
+        component[0].append(cid)
+        component[1].update([abs(lit) for lit in literals])
+    return list(components.values())
+
+class ComponentCounter:
+    """!
+    Exact projected model counter (#SAT) on CNF, in the style of
+
+    ''Combining Component Caching and Clause Learning for Effective Model
+    Counting'', Sang et al., SAT 2004
+
+    The counter branches on projected variables only, splits the clauses
+    left by the assignment into independent components whose counts are
+    multiplied, and caches the count of each component. Assignments are
+    kept on a trail with two watched literals per clause, so that
+    propagation only visits the clauses of the literals falsified.
+
+    Components without projected variables count 1 if satisfiable, 0
+    otherwise. This is checked by an incremental SAT solver (Z3 QF_FD)
+    holding all clauses, each guarded by a selector literal: assuming the
+    selectors of the component and the assignment of its variables
+    checks the component alone, and the solver keeps the clauses it
+    learns across checks.
+
+    Projected variables are branched on in increasing order (for plans:
+    step by step), so that suffixes left by prefixes reaching the same
+    state are the same component, counted once.
+    """
+    def __init__(self, clauses, projected):
+        """!
+        @param clauses: list of clauses (tuples of literals).
+        @param projected: list of projected variables.
+        """
+        self.clauses = [list(clause) for clause in clauses]
+        self.projected = set(projected)
+
+        variables = set([abs(lit) for clause in clauses for lit in clause]) | self.projected
+        size = max(variables) + 1 if len(variables) > 0 else 1
+
+        # Value of each variable: 1 (true), -1 (false), 0 (unassigned)
+        self.value = [0] * size
+        self.trail = []
+
+        # Clauses watching each literal, i.e. visited when it is falsified
+        self.watches = defaultdict(list)
+        for cid, clause in enumerate(self.clauses):
+            # Unit clauses are assigned upfront (see count)
+            if len(clause) > 1:
+                for lit in clause[:2]:
+                    self.watches[lit].append(cid)
+
+        # SAT oracle, built on first use
+        self.oracle = None
+        self.size = size
+
+        self.cache = dict()
+        self.hits = 0
+        self.checks = 0
+
+    def _buildOracle(self):
+        """
+        Builds the SAT oracle, with a selector literal guarding each clause.
+        """
+        self.oracle = SolverFor('QF_FD')
+        self.atoms = [Bool('__cnf_{}'.format(var)) for var in range(self.size)]
+        self.selectors = []
+        for cid, clause in enumerate(self.clauses):
+            selector = Bool('__clause_{}'.format(cid))
+            self.selectors.append(selector)
+            self.oracle.add(Or([Not(selector)] + [self._atom(lit) for lit in clause]))
+
+    def _atom(self, lit):
+        return self.atoms[lit] if lit > 0 else Not(self.atoms[-lit])
+
+    def _valueOf(self, lit):
+        return self.value[lit] if lit > 0 else -self.value[-lit]
+
+    def _assign(self, lit):
+        """!
+        Assigns a literal (without propagating it).
+
+        @return False if the literal is already false.
+        """
+        value = self._valueOf(lit)
+        if value != 0:
+            return value > 0
+        self.value[abs(lit)] = 1 if lit > 0 else -1
+        self.trail.append(lit)
+        return True
+
+    def _propagate(self, start):
+        """!
+        Unit propagation of the literals of the trail from a position on.
+
+        @param start: position in the trail.
+        @return False on conflict.
+        """
+        position = start
+        while position < len(self.trail):
+            false_lit = -self.trail[position]
+            position = position + 1
+            watchers = self.watches[false_lit]
+            kept = []
+            conflict = False
+            for cid in watchers:
+                if conflict:
+                    kept.append(cid)
+                    continue
+                clause = self.clauses[cid]
+                if clause[0] == false_lit:
+                    clause[0], clause[1] = clause[1], clause[0]
+                # The false literal is now clause[1]
+                if self._valueOf(clause[0]) > 0:
+                    kept.append(cid)
+                    continue
+                moved = False
+                for k in range(2, len(clause)):
+                    if self._valueOf(clause[k]) >= 0:
+                        clause[1], clause[k] = clause[k], clause[1]
+                        self.watches[clause[1]].append(cid)
+                        moved = True
+                        break
+                if moved:
+                    continue
+                kept.append(cid)
+                if not self._assign(clause[0]):
+                    conflict = True
+            self.watches[false_lit] = kept
+            if conflict:
+                return False
+        return True
+
+    def _backtrack(self, mark):
+        """!
+        Unassigns the literals of the trail from a position on.
+        """
+        for lit in self.trail[mark:]:
+            self.value[abs(lit)] = 0
+        del self.trail[mark:]
+
+    def _residual(self, clause_ids):
+        """!
+        Computes the clauses left by the current assignment.
+
+        @param clause_ids: IDs of the clauses to consider.
+        @return dictionary of clause IDs to their unassigned literals,
+        and set of the unassigned variables occurring in them.
+        """
+        residual = dict()
+        variables = set()
+        for cid in clause_ids:
+            literals = []
+            satisfied = False
+            for lit in self.clauses[cid]:
+                value = self._valueOf(lit)
+                if value > 0:
+                    satisfied = True
+                    break
+                if value == 0:
+                    literals.append(lit)
+            if not satisfied:
+                residual[cid] = literals
+                variables.update([abs(lit) for lit in literals])
+        return residual, variables
+
+    def _satisfiable(self, clause_ids):
+        """!
+        Checks whether a component is satisfiable.
+
+        @param clause_ids: IDs of the clauses of the component.
+        @return Truth value.
+        """
+        if self.oracle is None:
+            self._buildOracle()
+        self.checks = self.checks + 1
+        assumptions = [self.selectors[cid] for cid in clause_ids]
+        assigned = set()
+        for cid in clause_ids:
+            for lit in self.clauses[cid]:
+                if self._valueOf(lit) != 0 and not abs(lit) in assigned:
+                    assigned.add(abs(lit))
+                    assumptions.append(self._atom(lit if self._valueOf(lit) > 0 else -lit))
+        return self.oracle.check(assumptions) == sat
+
+    def _node(self, clause_ids, free):
+        """!
+        Counts the assignments to the free projected variables extending
+        the current assignment, over the clauses of a component (generator,
+        see _run).
+
+        @param clause_ids: IDs of the clauses of the component.
+        @param free: projected variables of the component.
+        @return number of assignments.
+        """
+        residual, variables = self._residual(clause_ids)
+
+        # Projected variables left out of every clause are unconstrained
+        result = 2 ** len([var for var in free if self.value[var] == 0 and not var in variables])
+
+        for component, component_variables in _components(residual, variables):
+            count = yield self._component(component, component_variables)
+            result = result * count
+            if result == 0:
+                break
+        return result
+
+    def _component(self, clause_ids, variables):
+        """!
+        Counts a connected component (generator, see _run), with caching.
+
+        @param clause_ids: IDs of the clauses of the component.
+        @param variables: unassigned variables of the component.
+        @return number of assignments.
+        """
+        key = (tuple(sorted(clause_ids)), tuple(sorted(variables)))
+        if key in self.cache:
+            self.hits = self.hits + 1
+            return self.cache[key]
+
+        free = [var for var in variables if var in self.projected]
+        if len(free) == 0:
+            result = 1 if self._satisfiable(clause_ids) else 0
+        else:
+            var = min(free)
+            result = 0
+            for lit in [var, -var]:
+                mark = len(self.trail)
+                self._assign(lit)
+                if self._propagate(mark):
+                    count = yield self._node(clause_ids, free)
+                    result = result + count
+                self._backtrack(mark)
+
+        self.cache[key] = result
+        return result
+
+    def _run(self, generator):
+        """!
+        Runs nested counting generators with an explicit stack: a generator
+        yields a sub-generator whose result is sent back to it.
+
+        @param generator: counting generator.
+        @return its result.
+        """
+        stack = [generator]
+        result = None
+        while len(stack) > 0:
+            try:
+                request = stack[-1].send(result)
+            except StopIteration as stop:
+                stack.pop()
+                result = stop.value
+                continue
+            stack.append(request)
+            result = None
+        return result
+
+    def count(self):
+        """!
+        Counts the assignments to the projected variables that extend to
+        a model of the clauses.
+
+        @return number of assignments.
+        """
+        if any([len(clause) == 0 for clause in self.clauses]):
+            return 0
+
+        for clause in self.clauses:
+            if len(clause) == 1 and not self._assign(clause[0]):
+                self._backtrack(0)
+                return 0
+        if not self._propagate(0):
+            self._backtrack(0)
+            return 0
+
+        result = self._run(self._node(range(len(self.clauses)), self.projected))
+        self._backtrack(0)
+        return result
+
+def countComponents(assertions, terms):
+    """!
+    Counts the assignments to the terms that extend to a model of a
+    formula, with the component-caching counter on the bit-blasted
+    formula. Applies to propositional formulas only.
+
+    The formula is given explicitly rather than read back from a solver,
+    since incremental solvers (e.g., QF_FD) do not report the assertions
+    of their backtracking points.
+
+    @param assertions: list of Z3 Boolean formulas (or lists of them).
+    @param terms: list of Z3 Boolean constants the models are projected on.
+    @return number of assignments.
+    """
+    clauses, projected = toCNF(assertions, terms)
+    counter = ComponentCounter(clauses, projected)
+    return counter.count()
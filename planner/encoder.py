@@ -29,14 +29,40 @@ from unified_planning.model.walkers import *
 import utils
 import numpy as np
 from . import loopformula
+from . import cache as groundcache
+from . import reachability
+from . import actionindex
+from . import mutex
 
 class Encoder:
-    def __init__(self, task, modifier):
+    def __init__(self, task, modifier, cache=None, prune=True, keep_actions=()):
         self.task = task
         self.modifier = modifier
+        self.cache = cache
 
         self.ground_problem = self._ground()
 
+        # Tables derived from the ground problem are stored
+        # per variant of the problem (i.e., with or without pruning)
+        self.problem_variant = 'full'
+
+        # First step at which each action can be executed,
+        # actions not listed here can be executed at any step
+        self.earliest_step = dict()
+
+        # Relaxed planning graph of the ground problem, built when pruning
+        self.relaxed_graph = None
+
+        # The initial_values property of UP problems is expensive,
+        # compute it once
+        self.initial_values = self.ground_problem.initial_values
+
+        if prune:
+            self._pruneUnreachable(keep_actions)
+
+        # Preconditions and effects of the ground actions
+        self.action_index = self._cachedTable('action_index', lambda: actionindex.ActionIndex(self.ground_problem))
+
         self.boolean_variables = defaultdict(dict)
         self.numeric_variables = defaultdict(dict)
         self.action_variables  = defaultdict(dict)
@@ -47,139 +73,107 @@ class Encoder:
 
         self.all_problem_fluents = []
 
+        # Horizon encoded so far by incremental encodings
+        self.incremental_horizon = 0
+
+        # Actions modifying each fluent, filled in by encodeFrame
+        self.frame_actions = dict()
+
         if self.modifier.__class__.__name__ == "LinearModifier":
+            # Implicit, nothing worth caching
             self.mutexes = self._computeSerialMutexes()
         else:
-            self.mutexes = self._computeParallelMutexes()
+            self.mutexes = self._cachedTable('parallel_mutexes', self._computeParallelMutexes)
+
+        # Persist the tables computed above in a single write
+        groundcache.storeTables(self.grounding, self.cache)
 
     def getActionsList(self):
         return self.ground_problem.actions
 
     def _ground(self):
-        # Ground the task.
+        # Ground the task (or fetch it from the grounding cache).
+        self.grounding = groundcache.groundTask(self.task, self.cache)
+        return self.grounding['result'].problem
 
-        with Compiler(problem_kind=self.task.kind, compilation_kind=CompilationKind.GROUNDING) as grounder:
-            return grounder.compile(self.task, compilation_kind=CompilationKind.GROUNDING).problem
-    
-    def _computeSerialMutexes(self):
+    def _cachedTable(self, name, compute):
         """!
-        Computes mutually exclusive actions for serial encodings,
-        i.e., all actions are mutually exclusive
+        Returns a table derived from the (possibly pruned) ground problem.
 
-        @return mutex: list of tuples defining action mutexes
+        @param name: name of the table.
+        @param compute: function computing the table.
+        @return table
         """
-        # Stores mutexes
-        mutexes = []
-
-        for a1 in self.ground_problem.actions:
-            for a2 in self.ground_problem.actions:
-                # Skip same action
-                if not a1.name == a2.name:
-                    mutexes.append((a1,a2))
-        return mutexes
+        return groundcache.cachedTable(self.grounding, self.cache, '{}:{}'.format(name, self.problem_variant), compute)
 
-    def _computeParallelMutexes(self):
+    def _pruneUnreachable(self, keep_actions):
         """!
-        Computes mutually exclusive actions as per
-        
-        ''A Compilation of the Full PDDL+ Language into SMT'', Cashmore et al., ICAPS 2017
+        Removes actions that are unreachable in the relaxed planning graph
+        (and fluents no longer mentioned by the problem) before encoding.
 
-        @return mutex: list of tuples defining action mutexes
+        @param keep_actions: names of actions that must be kept anyway.
         """
+        self.relaxed_graph = self._cachedTable('relaxed_graph', lambda: reachability.RelaxedPlanningGraph(self.ground_problem))
+        self.ground_problem, self.initial_values = reachability.pruneUnreachable(self.ground_problem, self.relaxed_graph, keep_actions)
 
-        def get_add_del_effects(action):
-            """!
-            Returns a tuple (add, del) of lists of effects of the action
-            """
-            
-            del_effects = []
-            effects_fluents = [effect for effect in action.effects if effect.value.type.is_bool_type()]
+        keep_actions = sorted([name for name in keep_actions if name is not None])
+        self.problem_variant = '+'.join(['reachable'] + keep_actions)
 
-            add_effects = set([str(eff.fluent) for eff in effects_fluents if eff.value.is_true()])
-            del_effects = set([str(eff.fluent) for eff in effects_fluents if not eff.value.is_true()])
-
-            return (add_effects, del_effects)
-        
-        def get_numeric_effects(action):
-            """!
-            Returns a set of numeric effects of the action
-            """            
-            return set([str(effect.fluent) for effect in action.effects if effect.value.type.is_int_type() or effect.value.type.is_real_type()])
-
-        def get_preconditions(action):
-            """!
-            Returns a set of preconditions of the action
-            """            
-            preconditions = set()
-            for pre in action.preconditions:
-                nameextractor = FreeVarsExtractor()
-                for arg in nameextractor.get(pre):
-                        preconditions.add(str(arg))
-            return preconditions
+        # Actions only become applicable at the layer they appear in the graph
+        for action in self.ground_problem.actions:
+            self.earliest_step[action.name] = self.relaxed_graph.earliestStep(action.name)
 
-        mutexes = set()
-        
-        for action_1 in self.ground_problem.actions:
-            add_a1, del_a1 = get_add_del_effects(action_1)
-            num_1 = get_numeric_effects(action_1)
-            pre_1 = get_preconditions(action_1)
-
-            for action_2 in self.ground_problem.actions:
-                if not action_1.name == action_2.name:
-                  
-                    add_a2, del_a2 = get_add_del_effects(action_2)
-                    num_2 = get_numeric_effects(action_2)
-                    pre_2 = get_preconditions(action_2)
-
-                    ## Condition 1
-                    if len(pre_1.intersection(add_a2)) > 0 or len(pre_1.intersection(del_a2)) > 0:
-                        mutexes.add((action_1, action_2))
-
-                    if len(pre_2.intersection(add_a1)) > 0 or len(pre_2.intersection(del_a1)) > 0:
-                        mutexes.add((action_1, action_2))
-
-                    ## Condition 2
-                    if len(add_a1.intersection(del_a2)) > 0:
-                        mutexes.add((action_1, action_2))
-                    
-                    if len(add_a2.intersection(del_a1)) > 0:
-                        mutexes.add((action_1, action_2))
+    def isExecutable(self, step, action):
+        """!
+        Checks whether an action can be executed at a given step
+        according to the relaxed planning graph. If not, its action
+        variable at that step is the constant False.
 
-                    ## Condition 3
-                    if num_1 & num_2:
-                        mutexes.add((action_1, action_2))
+        @param step: plan step.
+        @param action: name of the ground action.
+        @return Truth value.
+        """
+        return step >= self.earliest_step.get(action, 0)
 
-                    ## Condition 4
-                    if num_1 & pre_2:
-                        mutexes.add((action_1, action_2))
+    def _computeSerialMutexes(self):
+        """!
+        Computes mutually exclusive actions for serial encodings,
+        i.e., all actions are mutually exclusive
 
-                    ## Condition 5
-                    if num_2 & pre_1:
-                        mutexes.add((action_1, action_2))
+        @return mutex: CompleteMutexGraph defining action mutexes
+        """
+        return mutex.CompleteMutexGraph(self.action_index.action_names)
 
-                    
+    def _computeParallelMutexes(self):
+        """!
+        Computes mutually exclusive actions as per
+        
+        ''A Compilation of the Full PDDL+ Language into SMT'', Cashmore et al., ICAPS 2017
 
-        return mutexes
+        @return mutex: MutexGraph defining action mutexes
+        """
+        return mutex.parallelMutexes(self.action_index)
 
-    def createVariables(self):
+    def createVariables(self, start_step=0):
         """!
         Creates state and action variables needed in the encoding.
         Variables are stored in dictionaries as follows:
 
         dict[step][variable_name] = Z3 variable instance
 
+        @param start_step: first step whose variables are created (earlier ones already exist).
         """
         
         # MF: I hate this but the only way to get grounded functions parsing the initial values
 
-        boolean_fluents = [f for f in self.ground_problem.initial_values if f.type.is_bool_type()]
-        for step in range(self.horizon+1):
+        boolean_fluents = [f for f in self.initial_values if f.type.is_bool_type()]
+        for step in range(start_step, self.horizon+1):
             for fluent in boolean_fluents:
                 fluentname = str(fluent)
                 self.boolean_variables[step][fluentname] = z3.Bool('{}_{}'.format(fluentname,step))
                 self.problem_z3_variables[step][fluentname] = z3.Bool('{}_{}'.format(fluentname,step))
         
-        numeric_fluents = [f for f in self.ground_problem.initial_values if f.type.is_int_type() or f.type.is_real_type()]
+        numeric_fluents = [f for f in self.initial_values if f.type.is_int_type() or f.type.is_real_type()]
 
         # The grounder does not replace the constants in the problem, therefore we can do that by listing the 
         # predicates that are not modified by any action.
@@ -195,24 +189,30 @@ class Encoder:
         self.problem_constant_numerics = {}
         for fluent in constant_fluents:
             # A hacky way to ge the value of the constant.
-            self.problem_constant_numerics[str(fluent)] = float(str(self.ground_problem.initial_values[fluent]))
+            self.problem_constant_numerics[str(fluent)] = float(str(self.initial_values[fluent]))
 
         # Now create z3 variables for the numeric fluents.
-        for step in range(self.horizon+1):
+        for step in range(start_step, self.horizon+1):
             for fluent in numeric_fluents:
                 if not fluent in constant_fluents:
                     self.numeric_variables[step][str(fluent)] = z3.Real('{}_{}'.format(str(fluent),step))
                     self.problem_z3_variables[step][str(fluent)] = z3.Real('{}_{}'.format(str(fluent),step))
-        for step in range(self.horizon+1):
+        for step in range(start_step, self.horizon+1):
             for action in self.ground_problem.actions:
-                self.action_variables[step][action.name] = z3.Bool('{}_{}'.format(action.name,step))
+                if self.isExecutable(step, action.name):
+                    self.action_variables[step][action.name] = z3.Bool('{}_{}'.format(action.name,step))
+                else:
+                    self.action_variables[step][action.name] = z3.BoolVal(False)
 
 
-        self.all_problem_fluents.extend(boolean_fluents)
-        self.all_problem_fluents.extend(numeric_fluents)
-        # Now remove constant fluents from all_problem_fluents.
-        for fluent in constant_fluents:
-            self.all_problem_fluents.remove(fluent)
+        # Fluents do not change between horizons, collect them only once
+        # (frame axioms would be duplicated otherwise).
+        if len(self.all_problem_fluents) == 0:
+            self.all_problem_fluents.extend(boolean_fluents)
+            self.all_problem_fluents.extend(numeric_fluents)
+            # Now remove constant fluents from all_problem_fluents.
+            for fluent in constant_fluents:
+                self.all_problem_fluents.remove(fluent)
         
 
 
@@ -224,18 +224,18 @@ class Encoder:
         """
         initial = []
 
-        for fluent in self.ground_problem.initial_values:
+        for fluent in self.initial_values:
             if str(fluent) in list(self.problem_constant_numerics.keys()):
                 continue
             if fluent.type.is_bool_type():
-                if self.ground_problem.initial_values[fluent].is_true():
+                if self.initial_values[fluent].is_true():
                     initial.append(self.boolean_variables[0][str(fluent)])
                 else:
                     initial.append(z3.Not(self.boolean_variables[0][str(fluent)]))
             elif fluent.type.is_int_type() or fluent.type.is_real_type():
                 fluent_name = str(fluent)
                 if fluent.node_type == OperatorKind.FLUENT_EXP:
-                   initial.append(self.numeric_variables[0][fluent_name] == self.ground_problem.initial_values[fluent])
+                   initial.append(self.numeric_variables[0][fluent_name] == self.initial_values[fluent])
                 else:
                     #throw an error
                     raise Exception("Fluent {} is not a fluent expression".format(fluent_name))
@@ -244,19 +244,30 @@ class Encoder:
                 raise Exception("Fluent {} is not a boolean or numeric fluent".format(fluent_name))
         return initial
 
-    def encodeGoalState(self):
+    def encodeGoalState(self, horizon=None):
         """!
         Encodes formula defining goal state
 
+        @param horizon: step at which the goal must hold (defaults to the encoding horizon).
         @return goal: Z3 formula asserting propositional and numeric subgoals
         """
-        return utils.inorderTraverse(self.ground_problem.goals, self.problem_z3_variables, self.horizon, self.problem_constant_numerics)
+        step = self.horizon if horizon is None else horizon
+        return utils.inorderTraverse(self.ground_problem.goals, self.problem_z3_variables, step, self.problem_constant_numerics)
         
-    def encodeActions(self):
+    def encodeActions(self, start_step=0):
+        """!
+        Encodes preconditions and effects of actions.
+
+        @param start_step: first step to encode.
+        @return actions: list of Z3 formulas.
+        """
         actions = []
-        new_actions = []
-        for step in range(self.horizon):
+        for step in range(start_step, self.horizon):
             for action in self.ground_problem.actions:
+                # Nothing to encode if action cannot be executed yet
+                if not self.isExecutable(step, action.name):
+                    continue
+
                 # Append preconditions
                 for pre in action.preconditions:
                     precondition = utils.inorderTraverse(pre, self.problem_z3_variables, step, self.problem_constant_numerics)
@@ -272,11 +283,12 @@ class Encoder:
 
         return actions
 
-    def encodeFrame(self):
+    def encodeFrame(self, start_step=0):
         """!
         Encode explanatory frame axioms: a predicate retains its value unless
         it is modified by the effects of an action.
 
+        @param start_step: first step to encode.
         @return frame: list of frame axioms
         """
 
@@ -288,61 +300,79 @@ class Encoder:
 
         sentinel = object()
 
-        for step in range(self.horizon):
-            # Encode frame axioms for boolean fluents
+        for step in range(start_step, self.horizon):
+            action_variables = self.action_variables[step]
             for fluent in self.all_problem_fluents:
-                if fluent.type.is_bool_type():
-                    fluent_pre  = self.boolean_variables[step].get(str(fluent), sentinel)
-                    fluent_post = self.boolean_variables[step+1].get(str(fluent), sentinel)
+                name, is_bool, adders, deleters, modifiers = self._frameActions(fluent)
+                # Encode frame axioms for boolean fluents
+                if is_bool:
+                    fluent_pre  = self.boolean_variables[step].get(name, sentinel)
+                    fluent_post = self.boolean_variables[step+1].get(name, sentinel)
                     # Encode frame axioms only if atoms have SMT variables associated
                     if fluent_pre is not sentinel and fluent_post is not sentinel:
-                        action_add = []
-                        action_del = []
-
-                        for action in self.ground_problem.actions:
-                            effects_fluents = [effect for effect in action.effects if effect.value.type.is_bool_type()]
-                            
-                            for ele in effects_fluents:
-                                if str(ele.fluent) == str(fluent):
-                                    if ele.value.is_true():
-                                        action_add.append(self.action_variables[step][action.name])
-                                    else:
-                                        action_del.append(self.action_variables[step][action.name])
+                        action_add = [action_variables[action] for action in adders]
+                        action_del = [action_variables[action] for action in deleters]
 
                         frame.append(z3.Implies(z3.And(z3.Not(fluent_pre),fluent_post),z3.Or(action_add)))
                         frame.append(z3.Implies(z3.And(fluent_pre,z3.Not(fluent_post)),z3.Or(action_del)))
 
-                elif fluent.type.is_int_type() or fluent.type.is_real_type():
-                    fluent_pre  = self.numeric_variables[step].get(str(fluent), sentinel)
-                    fluent_post = self.numeric_variables[step+1].get(str(fluent), sentinel)
+                else:
+                    fluent_pre  = self.numeric_variables[step].get(name, sentinel)
+                    fluent_post = self.numeric_variables[step+1].get(name, sentinel)
                     if fluent_pre is not sentinel and fluent_post is not sentinel:
-                        action_num = []
-                        for action in self.ground_problem.actions:
-                            effects_fluents = [effect for effect in action.effects if effect.value.type.is_int_type() or effect.value.type.is_real_type()]
-                            for ele in effects_fluents:
-                                if str(ele.fluent) == str(fluent):
-                                    action_num.append(self.action_variables[step][action.name])
-                            
+                        action_num = [action_variables[action] for action in modifiers]
+
                         #TODO
                         # Can we write frame axioms for num effects in a more
                         # efficient way?
                         frame.append(z3.Or(fluent_post == fluent_pre, z3.Or(action_num)))
-                else:
-                    raise Exception("Unknown fluent type {}".format(fluent.type))
 
         return frame
 
-    def encodeExecutionSemantics(self):
+    def _frameActions(self, fluent):
+        """!
+        Returns the actions that can change the value of a fluent. Results are
+        computed once per fluent and reused for all steps and horizons.
+
+        @param fluent: fluent.
+        @return name: name of the fluent.
+        @return is_bool: True if the fluent is boolean, False if numeric.
+        @return adders: names of the actions setting the fluent to true.
+        @return deleters: names of the actions setting the fluent to false.
+        @return modifiers: names of the actions with numeric effects on the fluent.
+        """
+        entry = self.frame_actions.get(fluent)
+        if entry is None:
+            if fluent.type.is_bool_type():
+                is_bool = True
+            elif fluent.type.is_int_type() or fluent.type.is_real_type():
+                is_bool = False
+            else:
+                raise Exception("Unknown fluent type {}".format(fluent.type))
+
+            index = self.action_index
+            name = str(fluent)
+            fid = index.fluent_ids.get(name)
+            adders = [index.action_names[aid] for aid in index.adders.get(fid, [])]
+            deleters = [index.action_names[aid] for aid in index.deleters.get(fid, [])]
+            modifiers = [index.action_names[aid] for aid in index.modifiers.get(fid, [])]
+
+            entry = (name, is_bool, adders, deleters, modifiers)
+            self.frame_actions[fluent] = entry
+        return entry
+
+    def encodeExecutionSemantics(self, start_step=0):
             """!
             Encodes execution semantics as specified by modifier class.
 
+            @param start_step: first step to encode.
             @return axioms that specify execution semantics.
             """
             
-            try:
-                return self.modifier.do_encode(self.action_variables, self.horizon)
-            except:
-                return self.modifier.do_encode(self.action_variables, self.mutexes, self.horizon)
+            if self.modifier.__class__.__name__ == "LinearModifier":
+                return self.modifier.do_encode(self.action_variables, self.horizon, start_step)
+            else:
+                return self.modifier.do_encode(self.action_variables, self.mutexes, self.horizon, start_step)
 
 class EncoderSMT(Encoder):
     """
@@ -392,10 +422,76 @@ class EncoderSMT(Encoder):
 
         return formula
 
+    def incremental_encoding(self, horizon):
+        """!
+        Extends the SMT encoding built by previous calls to a larger horizon.
+        Only the step layers added since the last call are encoded, so the
+        returned subformulas can be added to the same solver. The goal is
+        returned separately as it only holds at the current horizon.
+
+        Not to be mixed with encode on the same encoder.
+
+        @param horizon: horizon for bounded planning formula.
+        @return formula: dictionary containing the new subformulas and the goal.
+        """
+
+        # Steps up to start_step are already encoded
+        start_step = self.incremental_horizon
+        if horizon < start_step:
+            raise Exception("Incremental encoding cannot shrink the horizon ({} < {})".format(horizon, start_step))
+
+        self.horizon = horizon
+        self.incremental_horizon = horizon
+
+        # set the planner name.
+        self.name = "smt"
+
+        # Create variables of the new steps
+        self.createVariables(start_step)
+
+        formula = defaultdict(list)
+
+        # Encode initial state axioms at the first call
+
+        if start_step == 0:
+            formula['initial'] = self.encodeInitialState()
+
+        # Encode universal axioms, frame axioms and execution
+        # semantics of the new steps
+
+        formula['actions'] = self.encodeActions(start_step)
+
+        formula['frame'] = self.encodeFrame(start_step)
+
+        formula['sem'] = self.encodeExecutionSemantics(start_step)
+
+        # Encode goal state axioms at the current horizon
+
+        formula['goal'] = self.encodeGoalState()
+
+        return formula
+
 class EncoderOMT(Encoder):
     """
     Class that defines method to build SMT encoding.
     """
+    def __init__(self, task, modifier, cache=None, prune=True, objective='arith', loops='eager'):
+        super().__init__(task, modifier, cache, prune)
+
+        # Loop formulas are asserted with the suffix ('eager') or only
+        # once violated by a model ('lazy', see violatedLoopFormulas)
+        self.lazy_loops = loops == 'lazy'
+
+        # Loop formulas of the current horizon, kept aside in lazy mode
+        self.loop_formulas = []
+
+        # Objective backend: arithmetic term to minimize ('arith'), or
+        # weighted soft constraints over action variables ('maxsat')
+        self.objective_backend = objective
+
+        # Integer cost of each action for the maxsat backend
+        self.action_weights = None
+
     def encodeObjective(self):
         """!
         Encodes objective function. If domain is metric it builds a Z3 formula
@@ -417,6 +513,109 @@ class EncoderOMT(Encoder):
         objective = sum(objective) if len(objective) > 0 else objective
         return objective
         
+    def _constantValue(self, node):
+        """!
+        Returns the value of a numeric expression that does not depend on the state.
+
+        @param node: numeric expression.
+        @return value (None if not constant).
+        """
+        if node.is_int_constant() or node.is_real_constant():
+            return float(node.constant_value())
+        if node.is_fluent_exp() and str(node) in self.problem_constant_numerics:
+            return self.problem_constant_numerics[str(node)]
+        return None
+
+    def computeActionWeights(self):
+        """!
+        Computes integer costs of the actions when the objective is a sum of
+        action costs: plan length for problems without metric, or a metric
+        summing fluents (initially 0) that actions only increase by constants.
+
+        @return dictionary mapping action names to weights (None if the objective is not of this form).
+        """
+        metrics = self.ground_problem.quality_metrics
+
+        if len(metrics) == 0:
+            return {action.name: 1 for action in self.ground_problem.actions}
+
+        if len(metrics) > 1 or not metrics[0].is_minimize_expression_on_plan():
+            return None
+
+        # Fluents summed in the metric
+        fluents = set()
+        terms = [metrics[0].expression]
+        while len(terms) > 0:
+            node = terms.pop()
+            if node.is_plus():
+                terms.extend(node.args)
+            elif node.is_fluent_exp():
+                fluents.add(node)
+            else:
+                return None
+
+        for fluent in fluents:
+            if fluent in self.initial_values and not float(self.initial_values[fluent].constant_value()) == 0:
+                return None
+
+        weights = dict()
+        for action in self.ground_problem.actions:
+            weight = 0
+            for effect in action.effects:
+                if not effect.fluent in fluents:
+                    continue
+                if not effect.is_increase() or effect.is_conditional():
+                    return None
+                value = self._constantValue(effect.value)
+                if value is None or value < 0 or not value == int(value):
+                    return None
+                weight = weight + int(value)
+            weights[action.name] = weight
+
+        return weights
+
+    def encodeSoftObjective(self):
+        """!
+        Encodes the objective as weighted soft constraints, i.e., a weighted
+        MaxSAT problem: we pay the weight of an action each time it is executed.
+
+        @return list of (action variable, weight) pairs.
+        """
+        penalties = []
+        for step in range(self.horizon):
+            for name, action in self.action_variables[step].items():
+                # Folded actions are never executed
+                if self.action_weights[name] > 0 and not z3.is_false(action):
+                    penalties.append((action, self.action_weights[name]))
+        return penalties
+
+    def encodeSoftAdditionalCosts(self):
+        """!
+        Encodes costs for relaxed actions that may be executed in the suffix
+        as weighted soft constraints (see encodeAdditionalCosts).
+
+        @return list of (action variable, weight) pairs.
+        """
+        penalties = []
+
+        # As in encodeAdditionalCosts, relaxed actions are free in metric problems
+        if len(self.ground_problem.quality_metrics) == 0:
+            for step in range(self.horizon,self.horizon+2):
+                for a,v in self.auxiliary_actions[step].items():
+                    penalties.append((v, 1))
+
+        return penalties
+
+    def violatedLoopFormulas(self, model):
+        """!
+        Lists the loop formulas of the current horizon violated by a model
+        (to be added lazily, as in counterexample-guided refinement).
+
+        @param model: Z3 model of the formula.
+        @return list of Z3 formulas.
+        """
+        return loopformula.violatedLoopFormulas(self.loop_formulas, model)
+
     def createAuxVariables(self):
         """
         Creates auxiliary variables used in relaxed suffix (see related paper).
@@ -526,19 +725,34 @@ class EncoderOMT(Encoder):
                 
         return relax
 
-    def encodeASAP(self):
+    def encodeASAP(self, start_step=0, end_step=None):
         """!
         Encodes constraints that push execution of actions as early as possible.
 
+        @param start_step: first step whose constraints are encoded.
+        @param end_step: step following the last one whose constraints are encoded (defaults to all steps).
         @return list of Z3 formulas.
         """
+        end_step = self.horizon+1 if end_step is None else end_step
+
         # ASAP constraint are enforced both for concrete and relaxed actions
+        # (the latter from step n, reached by constraints of step n-1)
         all_actions  = self.action_variables.copy()
-        all_actions.update(self.auxiliary_actions)
+        if end_step >= self.horizon:
+            all_actions.update(self.auxiliary_actions)
 
         c = []
 
-        for step in range(self.horizon+1):
+        # With serial mutexes every action is in mutex with all the others,
+        # so conditions 1 and 3 together just say that some action was
+        # executed at the previous step. Share that disjunction across actions
+        # instead of listing all other actions for each of them.
+        serial = isinstance(self.mutexes, mutex.CompleteMutexGraph)
+
+        for step in range(start_step, end_step):
+            if serial:
+                any_action = z3.Or(list(all_actions[step].values()))
+
             for action in self.ground_problem.actions:
                 # Condition 1: action already executed at
                 # previous step
@@ -552,15 +766,18 @@ class EncoderOMT(Encoder):
                     precondition = utils.inorderTraverse(pre, self.problem_z3_variables, step, self.problem_constant_numerics)
                     violated.append(z3.Not(precondition))
             
-                # Condition 3: a mutex was executed a previous step
-                # return all actions that are in mutex with the
-                # current action
-                mutex = [(lambda t:  t[1] if t[0] == action else t[0])(t) for t in self.mutexes if action in t]
-                # fetch action variable
-                mutex_vars = [all_actions[step][a.name] for a in mutex]
-
                 # ASAP constraint
                 act_post = all_actions[step+1][action.name]
+
+                if serial:
+                    c.append(z3.Implies(act_post, z3.Or(any_action, z3.Or(violated))))
+                    continue
+
+                # Condition 3: a mutex was executed a previous step
+                # fetch variables of all actions that are in mutex
+                # with the current action
+                mutex_vars = [all_actions[step][name] for name in self.mutexes.neighbours(action.name)]
+
                 c.append(z3.Implies(act_post, z3.Or(act_pre, z3.Or(violated), z3.Or(mutex_vars))))
 
         return c
@@ -574,13 +791,15 @@ class EncoderOMT(Encoder):
         trac = []
         step = self.horizon+1
 
-        for action in self.ground_problem.actions:
+        index = self.action_index
+
+        for aid, action in enumerate(self.ground_problem.actions):
             # Append preconditions
-            for pre in action.preconditions:
+            for pre, fids in zip(action.preconditions, index.pre_fluents[aid]):
                 touched_vars = []
-                for var in FreeVarsExtractor().get(pre):
-                    if str(var) in self.touched_variables:
-                        touched_vars.append(self.touched_variables[str(var)])
+                for fid in fids:
+                    if index.fluent_names[fid] in self.touched_variables:
+                        touched_vars.append(self.touched_variables[index.fluent_names[fid]])
                 precondition = utils.inorderTraverse(pre, self.problem_z3_variables, step-1, self.problem_constant_numerics)
                 trac.append(z3.Implies(self.auxiliary_actions[step][action.name], z3.Or(precondition, z3.Or(touched_vars))))
             
@@ -589,33 +808,22 @@ class EncoderOMT(Encoder):
                 if str(effect.fluent) in self.touched_variables:
                     trac.append(z3.Implies(self.auxiliary_actions[step][action.name], self.touched_variables[str(effect.fluent)]))
         
-        sentinel = object()
         # Encode frame axioms for boolean fluents
         for fluent in self.all_problem_fluents:
+            fid = index.fluent_ids.get(str(fluent))
             if fluent.type.is_bool_type():
                 # Encode frame axioms only if atoms have SMT variables associated
                 action_eff = []
-                for action in self.ground_problem.actions:
-                    effects_fluents = [effect for effect in action.effects if effect.value.type.is_bool_type()]
-                    
-                    for ele in effects_fluents:
-                        if str(ele.fluent) == str(fluent):
-                            if ele.value.is_true():
-                                action_eff.append(self.auxiliary_actions[step][action.name])
-                                action_eff.append(self.auxiliary_actions[step-1][action.name])
-                            else:
-                                action_eff.append(self.auxiliary_actions[step][action.name])
-                                action_eff.append(self.auxiliary_actions[step-1][action.name])
+                for aid in index.adders.get(fid, []) + index.deleters.get(fid, []):
+                    action_eff.append(self.auxiliary_actions[step][index.action_names[aid]])
+                    action_eff.append(self.auxiliary_actions[step-1][index.action_names[aid]])
                 trac.append(z3.Implies(self.touched_variables[str(fluent)], z3.Or(action_eff)))
 
             elif fluent.type.is_int_type() or fluent.type.is_real_type():
                 action_num = []
-                for action in self.ground_problem.actions:
-                    effects_fluents = [effect for effect in action.effects if effect.value.type.is_int_type() or effect.value.type.is_real_type()]
-                    for ele in effects_fluents:
-                        if str(ele.fluent) == str(fluent):
-                            action_num.append(self.auxiliary_actions[step][action.name])
-                            action_num.append(self.auxiliary_actions[step-1][action.name])                      
+                for aid in index.modifiers.get(fid, []):
+                    action_num.append(self.auxiliary_actions[step][index.action_names[aid]])
+                    action_num.append(self.auxiliary_actions[step-1][index.action_names[aid]])
                 trac.append(z3.Implies(self.touched_variables[str(fluent)], z3.Or(action_num)))
             else:
                 raise Exception("Unknown fluent type {}".format(fluent.type))
@@ -658,9 +866,23 @@ class EncoderOMT(Encoder):
 
         formula['sem'] = self.encodeExecutionSemantics()
 
-        #
         # Encode relaxed suffix
-        #
+
+        formula.update(self.encodeSuffix())
+
+        return formula
+
+    def encodeSuffix(self, asap_step=0):
+        """!
+        Encodes the parts of the formula that depend on the last step:
+        objective, relaxed suffix, ASAP constraints and loop formulas.
+
+        @param asap_step: first step whose ASAP constraints are encoded
+                          (those of earlier steps only involve concrete actions).
+        @return formula: dictionary containing subformulas.
+        """
+
+        formula = defaultdict(list)
 
         # Remove this for now.
         self.var_objective = utils.parseMetric(self)
@@ -671,7 +893,16 @@ class EncoderOMT(Encoder):
 
         # Encode objective function
 
-        formula['objective'] = self.encodeObjective()
+        if self.objective_backend == 'maxsat' and self.action_weights is None:
+            self.action_weights = self.computeActionWeights()
+            if self.action_weights is None:
+                print('Objective is not a sum of constant action costs, using the arithmetic objective')
+                self.objective_backend = 'arith'
+
+        if self.objective_backend == 'maxsat':
+            formula['objective'] = self.encodeSoftObjective()
+        else:
+            formula['objective'] = self.encodeObjective()
 
         # Encode relaxed transition T^R
 
@@ -683,7 +914,7 @@ class EncoderOMT(Encoder):
 
         # Encode ASAP constraints
 
-        formula['asap'] = self.encodeASAP()
+        formula['asap'] = self.encodeASAP(asap_step)
 
         # Encode relaxed  goal state axioms
 
@@ -697,28 +928,96 @@ class EncoderOMT(Encoder):
 
         # Encode loop formula
 
-        formula['lf'] = loopformula.encodeLoopFormulas(self) # This needs to be fixed.
+        self.loop_formulas = loopformula.encodeLoopFormulas(self) # This needs to be fixed.
+
+        formula['lf'] = [] if self.lazy_loops else self.loop_formulas
 
         # Encode additional cost for relaxed actions
 
-        add_objective, add_constraints = self.encodeAdditionalCosts()
+        if self.objective_backend == 'maxsat':
+            formula['objective'] = formula['objective'] + self.encodeSoftAdditionalCosts()
+        else:
+            add_objective, add_constraints = self.encodeAdditionalCosts()
 
-        formula['objective'] = formula['objective'] + add_objective
+            formula['objective'] = formula['objective'] + add_objective
 
-        formula['additional_constraints'] = add_constraints
+            formula['additional_constraints'] = add_constraints
 
         # Perform relaxed actions only if previous steps are filled
 
         formula['oin'] = self.encodeOnlyIfNeeded()
 
         return formula
+
+    def incremental_encoding(self, horizon):
+        """!
+        Extends the OMT encoding built by previous calls to a larger horizon.
+
+        The prefix (initial state, universal and frame axioms, execution
+        semantics and the ASAP constraints between concrete actions) is only
+        encoded for the step layers added since the last call, and can be
+        kept in the solver. The suffix depends on the last step and is
+        rebuilt at each call.
+
+        Not to be mixed with encode on the same encoder.
+
+        @param horizon: horizon for bounded planning formula.
+        @return prefix: dictionary containing the new prefix subformulas.
+        @return suffix: dictionary containing the suffix subformulas.
+        """
+
+        # Steps up to start_step are already encoded
+        start_step = self.incremental_horizon
+        if horizon < start_step:
+            raise Exception("Incremental encoding cannot shrink the horizon ({} < {})".format(horizon, start_step))
+
+        self.horizon = horizon
+        self.incremental_horizon = horizon
+
+        # set the planner name.
+        self.name = "omt"
+
+        # Create variables of the new steps
+        self.createVariables(start_step)
+
+        prefix = defaultdict(list)
+
+        # Encode initial state axioms at the first call
+
+        if start_step == 0:
+            prefix['initial'] = self.encodeInitialState()
+
+        # Encode universal axioms, frame axioms and execution
+        # semantics of the new steps
+
+        prefix['actions'] = self.encodeActions(start_step)
+
+        prefix['frame'] = self.encodeFrame(start_step)
+
+        prefix['sem'] = self.encodeExecutionSemantics(start_step)
+
+        # ASAP constraints of step s involve actions at step s+1,
+        # which belong to the relaxed suffix when s+1 >= horizon
+
+        asap_step = max(horizon-1, 0)
+
+        prefix['asap'] = self.encodeASAP(max(start_step-1, 0), asap_step)
+
+        return prefix, self.encodeSuffix(asap_step)
     
 class EncoderSMTContrastive(EncoderSMT):
     """
     Class that defines method to build SMT encoding.
     """
-    def __init__(self, task, modifier, first_action, second_action, step, axiom=1):
-        super().__init__(task, modifier)
+    def __init__(self, task, modifier, first_action, second_action, step, axiom=1, cache=None, prune=True):
+        # Remove single quotes from inputs
+        if first_action is not None:
+            first_action = first_action.replace('\'', '')
+        if second_action is not None:
+            second_action = second_action.replace('\'', '')
+
+        # Actions of the contrastive question are never pruned
+        super().__init__(task, modifier, cache, prune, [first_action, second_action])
         
         # Get axiom number and check if it can encode a feasible value
         self.axiom_num = axiom
@@ -726,11 +1025,6 @@ class EncoderSMTContrastive(EncoderSMT):
         
         # Get first and second actions from user
         self.first_action, self.second_action = None, None
-        # Remove single quotes from inputs
-        if first_action is not None:
-            first_action = first_action.replace('\'', '')
-        if second_action is not None:
-            second_action = second_action.replace('\'', '')
         # Check if action names exist in the problem
         for action in self.ground_problem.actions:
             if action.name == first_action:
@@ -859,10 +1153,29 @@ class EncoderSMTContrastive(EncoderSMT):
         return formula
 
 class R2EEncoding:
-    def __init__(self, task, dump_models = False) -> None:
+    def __init__(self, task, dump_models = False, cache=None, prune=True) -> None:
         self.task = task
+        self.cache = cache
         self.grounding_results = self._ground()
         self.ground_problem = self.grounding_results.problem
+        self.initial_values = self.ground_problem.initial_values
+
+        # First step at which each action can be executed,
+        # actions not listed here can be executed at any step
+        self.earliest_step = dict()
+
+        # Relaxed planning graph of the ground problem, built when pruning
+        self.relaxed_graph = None
+
+        if prune:
+            # Actions are chained within a step following getActionsList,
+            # so the graph has to follow the same ordering
+            self.relaxed_graph = groundcache.cachedTable(self.grounding, self.cache, 'relaxed_chain_graph:full',
+                                                         lambda: reachability.RelaxedPlanningGraph(self.ground_problem, self.getActionsList()))
+            self.ground_problem, self.initial_values = reachability.pruneUnreachable(self.ground_problem, self.relaxed_graph)
+            for action in self.ground_problem.actions:
+                self.earliest_step[action.name] = self.relaxed_graph.earliestStep(action.name)
+            groundcache.storeTables(self.grounding, self.cache)
 
         self.action_variables          = defaultdict(dict)
         self.z3_problem_variables         = defaultdict(dict)
@@ -877,10 +1190,10 @@ class R2EEncoding:
         self.horizon = 0
         
     def _ground(self):
-        # Ground the task.
-        with Compiler(problem_kind=self.task.kind, compilation_kind=CompilationKind.GROUNDING) as grounder:
-            self.groundername = grounder.name    
-            return grounder.compile(self.task, compilation_kind=CompilationKind.GROUNDING)
+        # Ground the task (or fetch it from the grounding cache).
+        self.grounding = groundcache.groundTask(self.task, self.cache)
+        self.groundername = self.grounding['grounder']
+        return self.grounding['result']
 
     def getAction(self, step, name):
         return self.action_variables[step][name]
@@ -888,13 +1201,13 @@ class R2EEncoding:
     def createVariables(self, start_step, end_step):
 
         # MF: I hate this but the only way to get grounded functions parsing the initial values
-        boolean_fluents = [f for f in self.ground_problem.initial_values if f.type.is_bool_type()]
+        boolean_fluents = [f for f in self.initial_values if f.type.is_bool_type()]
         for step in range(start_step, end_step+1):
             for fluent in boolean_fluents:
                 fluentname = str(fluent)
                 self.z3_problem_variables[step][fluentname] = z3.Bool('{}_${}'.format(fluentname,step))
         
-        numeric_fluents = [f for f in self.ground_problem.initial_values if f.type.is_int_type() or f.type.is_real_type()]
+        numeric_fluents = [f for f in self.initial_values if f.type.is_int_type() or f.type.is_real_type()]
 
         # The grounder does not replace the constants in the problem, therefore we can do that by listing the 
         # predicates that are not modified by any action.
@@ -909,7 +1222,7 @@ class R2EEncoding:
         # Get the values for those constants to replace them in the problem.
         for fluent in constant_fluents:
             # A hacky way to ge the value of the constant.
-            self.z3_problem_constant_numerics[str(fluent)] = float(str(self.ground_problem.initial_values[fluent]))
+            self.z3_problem_constant_numerics[str(fluent)] = float(str(self.initial_values[fluent]))
 
         # Now create z3 variables for the numeric fluents.
         for step in range(start_step, end_step+1):
@@ -918,15 +1231,18 @@ class R2EEncoding:
                     self.z3_problem_variables[step][str(fluent)] = z3.Real('{}_${}'.format(str(fluent),step))
 
         # self.z3_variables
-        variable_numeric_fluents = [f for f in self.ground_problem.initial_values if f.type.is_int_type() or f.type.is_real_type()]
+        variable_numeric_fluents = [f for f in self.initial_values if f.type.is_int_type() or f.type.is_real_type()]
         variable_numeric_fluents = [ele for ele in variable_numeric_fluents if ele not in constant_fluents]
-        variable_boolean_fluents = [f for f in self.ground_problem.initial_values if f.type.is_bool_type()]
+        variable_boolean_fluents = [f for f in self.initial_values if f.type.is_bool_type()]
 
         fluents_used_in_actions = set()
 
         for step in range(start_step, end_step+1):
             for action in self.ground_problem.actions:
-                self.action_variables[step][action.name] = z3.Bool('{}_${}'.format(action.name,step))
+                if self.isExecutable(step, action.name):
+                    self.action_variables[step][action.name] = z3.Bool('{}_${}'.format(action.name,step))
+                else:
+                    self.action_variables[step][action.name] = z3.BoolVal(False)
                 if step == 1:
                     for pre in action.preconditions:
                         precondition = utils.inorderTraverse(pre, self.z3_problem_variables, 0, self.z3_problem_constant_numerics)
@@ -943,24 +1259,24 @@ class R2EEncoding:
                 self.z3_variables[str(var)] = z3.Bool(str(var))
 
         for const in constant_fluents:
-            self.z3_constants[str(const)] = z3.RealVal(float(str(self.ground_problem.initial_values[const])))
+            self.z3_constants[str(const)] = z3.RealVal(float(str(self.initial_values[const])))
       
     def encodeInitialState(self):
 
         initial = []
 
-        for fluent in self.ground_problem.initial_values:
+        for fluent in self.initial_values:
             if str(fluent) in list(self.z3_problem_constant_numerics.keys()):
                 continue
             if fluent.type.is_bool_type():
-                if self.ground_problem.initial_values[fluent].is_true():
+                if self.initial_values[fluent].is_true():
                     initial.append(self.z3_problem_variables[0][str(fluent)])
                 else:
                     initial.append(z3.Not(self.z3_problem_variables[0][str(fluent)]))
             elif fluent.type.is_int_type() or fluent.type.is_real_type():
                 fluent_name = str(fluent)
                 if fluent.node_type == OperatorKind.FLUENT_EXP:
-                   initial.append(self.z3_problem_variables[0][fluent_name] == self.ground_problem.initial_values[fluent])
+                   initial.append(self.z3_problem_variables[0][fluent_name] == self.initial_values[fluent])
                 else:
                     #throw an error
                     raise Exception("Fluent {} is not a fluent expression".format(fluent_name))
@@ -994,6 +1310,17 @@ class R2EEncoding:
         # informative. But for now, we will return a sorted action names.
         return sorted([action for action in self.ground_problem.actions], key=lambda x: x.name)
 
+    def isExecutable(self, step, action):
+        """!
+        Checks whether an action can be executed at a given step
+        according to the relaxed planning graph.
+
+        @param step: plan step.
+        @param action: name of the ground action.
+        @return Truth value.
+        """
+        return step >= self.earliest_step.get(action, 0)
+
     def getActionIndex(self, action):
         actionlist = [a.name for a in self.getActionsList()]
         return actionlist.index(action)
@@ -1015,7 +1342,11 @@ class R2EEncoding:
         for step in range(start_step, end_step):
             for idx, action in enumerate(actions_ordering):
 
-                for pre in action.preconditions:
+                # Preconditions of actions that cannot be executed yet are not needed,
+                # effects are still chained since later actions refer to them.
+                preconditions = action.preconditions if self.isExecutable(step, action.name) else []
+
+                for pre in preconditions:
                     precondition = utils.inorderTraverse(pre, self.z3_problem_variables, step, self.z3_problem_constant_numerics)
                     # Update the precondition with the new variables.
                     vars_to_update = utils.parseZ3FormulaAndReturnReplacementVariables(precondition, self.z3_chain_variables_actions)
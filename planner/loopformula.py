@@ -24,7 +24,6 @@ import unified_planning
 # import translate.pddl as pddl
 from collections import defaultdict
 from z3 import *
-import itertools
 from unified_planning.model.operators import *
 from unified_planning.shortcuts import *
 from unified_planning.model.walkers import *
@@ -49,8 +48,10 @@ def buildDTables(encoder):
 
     table = defaultdict(dict)
 
+    index = encoder.action_index
+
     step = encoder.horizon + 1
-    for action in encoder.ground_problem.actions:
+    for aid, action in enumerate(encoder.ground_problem.actions):
         # preconditions of action
         tpre = []
 
@@ -61,9 +62,10 @@ def buildDTables(encoder):
         teff = []
 
         # Append preconditions
-        for pre in action.preconditions:
+        for pre, fids in zip(action.preconditions, index.pre_fluents[aid]):
+            var_names = [index.fluent_names[fid] for fid in fids]
             if pre.node_type in [OperatorKind.FLUENT_EXP, OperatorKind.NOT]:
-                for var_name in FreeVarsExtractor().get(pre):
+                for var_name in var_names:
                     tpre.append(encoder.touched_variables[str(var_name)])
                     if pre.node_type == OperatorKind.NOT:
                         tmp = [z3.Not(encoder.boolean_variables[step-1][str(var_name)]), encoder.touched_variables[str(var_name)]]
@@ -74,7 +76,7 @@ def buildDTables(encoder):
             else:
                 expr = utils.inorderTraverse(pre, encoder.problem_z3_variables, step-1, encoder.problem_constant_numerics)
                 tmp = [expr]
-                for var_name in FreeVarsExtractor().get(pre):
+                for var_name in var_names:
                     tpre.append(encoder.touched_variables[str(var_name)])
                     tmp.append(encoder.touched_variables[str(var_name)])
                 tpre_rel.append(tuple(tmp))
@@ -135,6 +137,48 @@ def computeSCC(edges):
     return scc_purged
 
 
+def loopSupport(loop, table):
+    """!
+    Builds the external support R(L) of a loop, i.e., the conditions under
+    which an action adding an atom of the loop is applicable without
+    relying on atoms of the loop.
+
+    A precondition of several terms, e.g. tx & (ty v tz), admits the
+    combinations tx & ty v tx & tz: those not involving atoms of the loop
+    are the conjunction, over terms, of their disjuncts outside the loop,
+    which avoids expanding the DNF.
+
+    @param loop: set of touched variables in the loop.
+    @param table: datastructure returned by buildDTables.
+    @return R: list of Z3 conditions.
+    """
+    R = []
+
+    for action in table.keys():
+
+        # variables appears in effect of action at step n
+
+        if len(set(table[action]['eff']) & loop) > 0:
+
+            # now check if variables appears in pre of action at step n+1
+
+            if len(table[action]['pre_rel']) == 1:
+
+                # if list of precondition has length one: we just a simple condition
+                # e.g. x v tx -> tuple(x,tx)
+
+                for cond in table[action]['pre_rel'][0]:
+                    if not cond in loop:
+                        R.append(cond)
+
+            else:
+                terms = []
+                for term in table[action]['pre_rel']:
+                    terms.append(z3.Or([cond for cond in term if not cond in loop]))
+                R.append(z3.And(terms))
+
+    return R
+
 def encodeLoopFormulas(encoder):
     """!
     Builds loop formulas (see paper for description).
@@ -159,7 +203,6 @@ def encodeLoopFormulas(encoder):
     for loop in scc:
 
         L = []
-        R = []
 
         # for each var in loop we check what actions can be added
         for variable in list(loop):
@@ -172,40 +215,20 @@ def encodeLoopFormulas(encoder):
                 raise Exception("Could not find key to build loop formula")
 
         # for each action check if conditions to build R are met
-        for action in table.keys():
-
-            # variables appears in effect of action at step n
-
-            if len(set(table[action]['eff']) & loop) > 0:
-
-                # now check if variables appears in pre of action at step n+1
-
-                # if list of precondition has length one: we just a simple condition
-                # e.g. x v tx -> tuple(x,tx)
-                # no need to check dnf
-                # otherwise check all disjunct of dnf
-
-                if len(table[action]['pre_rel']) == 1:
-
-                    for cond in table[action]['pre_rel'][0]:
-                        if cond in loop:
-                            pass
-                        else:
-                            R.append(cond)
-
-                else:
-                    # if precondition has several terms, e.g. tx & (ty v tz),
-                    # need to check for all possible combinations, i.e., tx & ty v tx & tz
-
-                    dnf = list(itertools.product(*table[action]['pre_rel']))
-
-                    for combo in dnf:
-                        if len(set(combo) & loop) > 0:
-                            pass
-                        else:
-                            R.append(z3.And(combo))
+        R = loopSupport(loop, table)
 
         lf.append(z3.Implies(z3.Or(L), z3.Or(set(R))))
 
 
     return lf
+
+def violatedLoopFormulas(loop_formulas, model):
+    """!
+    Selects the loop formulas violated by a model, i.e., loops of the
+    relaxed suffix whose atoms are touched without external support.
+
+    @param loop_formulas: list of loop formulas.
+    @param model: Z3 model.
+    @return list of violated loop formulas.
+    """
+    return [f for f in loop_formulas if is_false(model.eval(f, model_completion=True))]
@@ -17,6 +17,7 @@
 
 
 from z3 import *
+from . import amo
 
 class Modifier():
     """
@@ -35,20 +36,28 @@ class LinearModifier(Modifier):
 
     """
 
-    def do_encode(self, variables, bound):
+    def __init__(self, amo_encoding='pb'):
+        """!
+        @param amo_encoding: encoding of the at-most-one constraint
+        over the actions of each step (see amo.ENCODINGS).
+        """
+        self.amo_encoding = amo_encoding
+
+    def do_encode(self, variables, bound, start=0):
         """!
         Encodes sequential execution semantics (i.e., one action per step).
 
         @param  variables: Z3 variables.
         @param bound: planning horizon.
+        @param start: first step to encode.
 
         @return c: constraints enforcing sequential execution
         """
         c = []
 
-        for step in range(bound):
-            pbc = [(var,1) for var in variables[step].values()]
-            c.append(z3.PbLe(pbc,1))
+        for step in range(start, bound):
+            # Variables folded to False are dropped by atMostOne
+            c.extend(amo.atMostOne(list(variables[step].values()), 'amo_{}'.format(step), self.amo_encoding))
 
         return c
 
@@ -57,21 +66,39 @@ class ParallelModifier(Modifier):
     Parallel modifier, contains method to implement parallel execution semantics.
     """
 
-    def do_encode(self, variables, mutexes, bound):
+    def __init__(self, amo_encoding='pb'):
+        """!
+        @param amo_encoding: 'pairwise' encodes one clause per mutex pair, any other
+        encoding in amo.ENCODINGS covers the mutex graph with cliques and
+        encodes an at-most-one constraint per clique.
+        """
+        self.amo_encoding = amo_encoding
+
+    def do_encode(self, variables, mutexes, bound, start=0):
         """!
         Encodes parallel execution semantics (i.e., multiple, mutex, actions per step).
 
         @param  variables: Z3 variables.
-        @param mutexes: action mutexes.
+        @param mutexes: MutexGraph of action mutexes.
         @param bound: planning horizon.
+        @param start: first step to encode.
 
         @return c: constraints enforcing parallel execution
         """
         c = []
 
-        for step in range(bound):
-            for pair in mutexes:
-                #MF: TODO: Fix this to match the new variables.
-                c.append(z3.Or(z3.Not(variables[step][pair[0].name]), z3.Not(variables[step][pair[1].name])))
+        if not self.amo_encoding == 'pairwise':
+            cliques = mutexes.cliques()
+            for step in range(start, bound):
+                for k, clique in enumerate(cliques):
+                    literals = [variables[step][action] for action in clique]
+                    c.extend(amo.atMostOne(literals, 'amo_{}_{}'.format(k,step), self.amo_encoding))
+            return c
+
+        for step in range(start, bound):
+            for action_1, action_2 in mutexes.pairs():
+                if z3.is_false(variables[step][action_1]) or z3.is_false(variables[step][action_2]):
+                    continue
+                c.append(z3.Or(z3.Not(variables[step][action_1]), z3.Not(variables[step][action_2])))
 
         return c
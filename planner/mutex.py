@@ -0,0 +1,230 @@
+############################################################################
+##    This file is part of OMTPlan.
+##
+##    OMTPlan is free software: you can redistribute it and/or modify
+##    it under the terms of the GNU General Public License as published by
+##    the Free Software Foundation, either version 3 of the License, or
+##    (at your option) any later version.
+##
+##    OMTPlan is distributed in the hope that it will be useful,
+##    but WITHOUT ANY WARRANTY; without even the implied warranty of
+##    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##    GNU General Public License for more details.
+##
+##    You should have received a copy of the GNU General Public License
+##    along with OMTPlan.  If not, see <https://www.gnu.org/licenses/>.
+############################################################################
+
+import itertools
+import numpy as np
+
+class MutexGraph():
+    """
+    Sparse, undirected graph of mutually exclusive actions.
+
+    Adjacency is stored in compressed sparse row format: the neighbours
+    of the action with ID i are indices[indptr[i]:indptr[i+1]], sorted
+    by ID. Action IDs are positions in the list of action names.
+    """
+
+    def __init__(self, actions, indptr, indices):
+        self.actions = list(actions)
+        self.action_ids = {name: aid for aid, name in enumerate(self.actions)}
+        self.indptr = indptr
+        self.indices = indices
+
+        # Computed on demand by cliques()
+        self.clique_cover = None
+
+    def neighbours(self, action):
+        """!
+        Returns the actions that are mutex with a given action.
+
+        @param action: name of the ground action.
+        @return list of action names.
+        """
+        aid = self.action_ids[action]
+        return [self.actions[other] for other in self.indices[self.indptr[aid]:self.indptr[aid+1]]]
+
+    def areMutex(self, action_1, action_2):
+        """!
+        Checks whether two actions are mutex.
+
+        @param action_1: name of the first ground action.
+        @param action_2: name of the second ground action.
+        @return Truth value.
+        """
+        aid_1 = self.action_ids[action_1]
+        row = self.indices[self.indptr[aid_1]:self.indptr[aid_1+1]]
+        position = np.searchsorted(row, self.action_ids[action_2])
+        return position < len(row) and row[position] == self.action_ids[action_2]
+
+    def pairs(self):
+        """!
+        Iterates over mutex pairs, each unordered pair is returned once.
+
+        @return generator of (action name, action name) tuples.
+        """
+        for aid_1 in range(len(self.actions)):
+            for aid_2 in self.indices[self.indptr[aid_1]:self.indptr[aid_1+1]]:
+                if aid_2 > aid_1:
+                    yield (self.actions[aid_1], self.actions[aid_2])
+
+    def cliques(self):
+        """!
+        Greedily covers the edges of the graph with cliques, so that
+        pairwise mutexes can be replaced by at-most-one constraints.
+        Every mutex pair belongs to (at least) one of the cliques.
+
+        Vertices are visited by decreasing degree. Each clique starts from
+        a vertex and one of its uncovered edges and is extended with common
+        neighbours, preferring those with uncovered edges to the clique.
+
+        @return list of cliques (lists of action names).
+        """
+        if self.clique_cover is not None:
+            return self.clique_cover
+
+        neighbours = [set(self.indices[self.indptr[aid]:self.indptr[aid+1]].tolist()) for aid in range(len(self.actions))]
+        uncovered = [set(adjacent) for adjacent in neighbours]
+
+        cover = []
+        for u in sorted(range(len(self.actions)), key=lambda aid: -len(neighbours[aid])):
+            while len(uncovered[u]) > 0:
+                clique = [u]
+                common = set(neighbours[u])
+                # Prefer uncovered neighbours, then higher degree
+                candidates = sorted(neighbours[u], key=lambda v: (not v in uncovered[u], -len(neighbours[v])))
+                for v in candidates:
+                    if v in common:
+                        clique.append(v)
+                        common &= neighbours[v]
+                for i in range(len(clique)):
+                    for j in range(i+1, len(clique)):
+                        uncovered[clique[i]].discard(clique[j])
+                        uncovered[clique[j]].discard(clique[i])
+                cover.append([self.actions[aid] for aid in clique])
+
+        self.clique_cover = cover
+        return cover
+
+    def __len__(self):
+        # Each pair is stored twice, once per direction
+        return len(self.indices) // 2
+
+class CompleteMutexGraph():
+    """
+    Implicit graph in which all actions are mutually exclusive,
+    as in serial encodings. Nothing is materialized.
+    """
+
+    def __init__(self, actions):
+        self.actions = actions
+
+    def neighbours(self, action):
+        """!
+        Returns the actions that are mutex with a given action.
+
+        @param action: name of the ground action.
+        @return list of action names.
+        """
+        return [other for other in self.actions if not other == action]
+
+    def areMutex(self, action_1, action_2):
+        """!
+        Checks whether two actions are mutex.
+
+        @param action_1: name of the first ground action.
+        @param action_2: name of the second ground action.
+        @return Truth value.
+        """
+        return not action_1 == action_2
+
+    def pairs(self):
+        """!
+        Iterates over mutex pairs, each unordered pair is returned once.
+
+        @return generator of (action name, action name) tuples.
+        """
+        return itertools.combinations(self.actions, 2)
+
+    def cliques(self):
+        """!
+        All actions form a single clique.
+
+        @return list of cliques (lists of action names).
+        """
+        return [list(self.actions)] if len(self.actions) > 1 else []
+
+    def __len__(self):
+        return len(self.actions) * (len(self.actions) - 1) // 2
+
+def _fluentBitsets(pairs, num_fluents, num_actions):
+    """!
+    Builds a packed (fluent x action) incidence matrix.
+
+    @param pairs: iterable of (fluent ID, action ID).
+    @param num_fluents: number of fluents.
+    @param num_actions: number of actions.
+    @return matrix: row f is a bitset of the actions related to fluent f.
+    """
+    matrix = np.zeros((num_fluents, (num_actions + 7) // 8), dtype=np.uint8)
+    pairs = np.array(list(pairs), dtype=np.int64).reshape(-1, 2)
+    if len(pairs) > 0:
+        fids, aids = pairs[:, 0], pairs[:, 1]
+        np.bitwise_or.at(matrix, (fids, aids >> 3), (128 >> (aids & 7)).astype(np.uint8))
+    return matrix
+
+def parallelMutexes(index):
+    """!
+    Computes mutually exclusive actions as per
+
+    ''A Compilation of the Full PDDL+ Language into SMT'', Cashmore et al., ICAPS 2017
+
+    Two actions a1, a2 are mutex if (1) one of them adds or deletes a
+    precondition of the other, (2) one adds a fluent the other deletes,
+    (3) both have numeric effects on the same fluent, (4-5) one has a
+    numeric effect on a precondition of the other. Seen as boolean
+    matrices over actions x fluents, mutexes are
+
+        Pre.(Add+Del+Num)^T + (Add+Del+Num).Pre^T + Add.Del^T + Del.Add^T + Num.Num^T
+
+    Products are computed one action row at a time, as the OR of the
+    packed bitsets (over actions) of the fluents in that row.
+
+    @param index: ActionIndex of the ground problem.
+    @return MutexGraph
+    """
+    num_actions = len(index.action_names)
+    num_fluents = len(index.fluent_names)
+
+    def incidence(relation):
+        return _fluentBitsets([(fid, aid) for aid in range(num_actions) for fid in relation[aid]], num_fluents, num_actions)
+
+    pre = incidence(index.pre)
+    add = incidence(index.add)
+    delete = incidence(index.delete)
+    num = incidence(index.num)
+    writes = add | delete | num
+
+    # Own bit of each action, cleared from its row
+    own_byte = np.arange(num_actions) >> 3
+    own_bit = (128 >> (np.arange(num_actions) & 7)).astype(np.uint8)
+
+    rows = []
+    for aid in range(num_actions):
+        written = list(index.add[aid] | index.delete[aid] | index.num[aid])
+        blocks = [writes[list(index.pre[aid])],
+                  pre[written],
+                  delete[list(index.add[aid])],
+                  add[list(index.delete[aid])],
+                  num[list(index.num[aid])]]
+        row = np.bitwise_or.reduce(np.concatenate(blocks), axis=0) if len(written) + len(index.pre[aid]) > 0 else np.zeros(pre.shape[1], dtype=np.uint8)
+        row[own_byte[aid]] &= ~own_bit[aid]
+        rows.append(np.flatnonzero(np.unpackbits(row, count=num_actions)).astype(np.int32))
+
+    indptr = np.zeros(num_actions + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(row) for row in rows])
+    indices = np.concatenate(rows) if num_actions > 0 else np.zeros(0, dtype=np.int32)
+
+    return MutexGraph(index.action_names, indptr, indices)
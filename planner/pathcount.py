@@ -0,0 +1,192 @@
+############################################################################
+##    This file is part of OMTPlan.
+##
+##    OMTPlan is free software: you can redistribute it and/or modify
+##    it under the terms of the GNU General Public License as published by
+##    the Free Software Foundation, either version 3 of the License, or
+##    (at your option) any later version.
+##
+##    OMTPlan is distributed in the hope that it will be useful,
+##    but WITHOUT ANY WARRANTY; without even the implied warranty of
+##    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##    GNU General Public License for more details.
+##
+##    You should have received a copy of the GNU General Public License
+##    along with OMTPlan.  If not, see <https://www.gnu.org/licenses/>.
+############################################################################
+
+from collections import defaultdict
+
+from unified_planning.model.operators import *
+
+## Counting the plans of a linear (sequential) encoding by dynamic
+## programming over the reachable states.
+##
+## A model of the linear encoding picks at most one action per step, and
+## its state variables follow from the initial state and the actions.
+## Hence its projection on the action variables is a sequence of actions
+## (or empty steps) of length H, and the number of projected models is the
+## number of such sequences that are executable and reach the goal. These
+## are counted step by step, states reached by several sequences sharing
+## a single count.
+
+def _holds(node, state):
+    """!
+    Evaluates a propositional condition in a state.
+
+    @param node: boolean expression.
+    @param state: set of the names of the fluents holding.
+    @return Truth value.
+    """
+    kind = node.node_type
+    if kind == OperatorKind.AND:
+        return all([_holds(arg, state) for arg in node.args])
+    elif kind == OperatorKind.OR:
+        return any([_holds(arg, state) for arg in node.args])
+    elif kind == OperatorKind.NOT:
+        return not _holds(node.args[0], state)
+    elif kind == OperatorKind.IMPLIES:
+        return not _holds(node.args[0], state) or _holds(node.args[1], state)
+    elif kind == OperatorKind.IFF:
+        return _holds(node.args[0], state) == _holds(node.args[1], state)
+    elif kind == OperatorKind.BOOL_CONSTANT:
+        return node.bool_constant_value()
+    elif kind == OperatorKind.FLUENT_EXP and node.type.is_bool_type():
+        return str(node) in state
+    raise Exception("Condition {} is not propositional".format(node))
+
+class PathCounter():
+    """
+    Counts the plans of the linear encoding of a ground problem
+    (see EncoderSMT), optionally constrained by a contrastive axiom
+    (see EncoderSMTContrastive).
+    """
+
+    def __init__(self, encoder):
+        """!
+        @param encoder: encoder (with linear modifier) of the problem.
+        """
+        if encoder.modifier.__class__.__name__ != "LinearModifier":
+            raise Exception("Plans can only be counted for linear encodings")
+
+        self.encoder = encoder
+        problem = encoder.ground_problem
+
+        self.initial = set()
+        for fluent, value in encoder.initial_values.items():
+            if not fluent.type.is_bool_type():
+                raise Exception("Plans can only be counted for propositional problems")
+            if value.is_true():
+                self.initial.add(str(fluent))
+        self.initial = frozenset(self.initial)
+
+        self.goals = problem.goals
+
+        # Per action: name, preconditions, fluents set to true and to false
+        self.actions = []
+        for action in problem.actions:
+            add, delete = set(), set()
+            for effect in action.effects:
+                if effect.is_conditional() or not effect.value.is_bool_constant():
+                    raise Exception("Plans can only be counted for actions with constant propositional effects")
+                if effect.value.bool_constant_value():
+                    add.add(str(effect.fluent))
+                else:
+                    delete.add(str(effect.fluent))
+            if len(add & delete) > 0:
+                # Contradicting effects, the action can never be executed
+                continue
+            self.actions.append((action.name, action.preconditions, frozenset(add), frozenset(delete)))
+
+        # Successors of each state, shared by all steps (and counts)
+        self.successors = dict()
+
+    def _successors(self, state):
+        """!
+        Computes the states reached by executing each applicable action.
+
+        @param state: set of the names of the fluents holding.
+        @return list of (action name, state) pairs.
+        """
+        successors = self.successors.get(state)
+        if successors is None:
+            successors = []
+            for name, preconditions, add, delete in self.actions:
+                if all([_holds(pre, state) for pre in preconditions]):
+                    successors.append((name, (state - delete) | add))
+            self.successors[state] = successors
+        return successors
+
+    def _constraints(self, horizon, contrastive_type):
+        """!
+        Translates the contrastive axiom of the encoder into constraints on
+        action sequences.
+
+        @param horizon: number of steps.
+        @param contrastive_type: fact, foil, or None for no axiom.
+        @return forbidden action (if any), action that has to be executed
+        (if any), and action required at each step (dictionary).
+        """
+        forbidden, needed, required = None, None, dict()
+        if contrastive_type is None:
+            return forbidden, needed, required
+
+        encoder = self.encoder
+        first, second, step = encoder.first_action, encoder.second_action, encoder.step
+        fact = contrastive_type == "fact"
+        if encoder.axiom_num == 1:
+            if fact:
+                forbidden = first
+            else:
+                needed = first
+        elif encoder.axiom_num == 2:
+            if fact:
+                needed = first
+            else:
+                forbidden = first
+        elif encoder.axiom_num == 3:
+            assert step < horizon and step >= 0, "The step number for axiom 3 has to be between 0 and horizon"
+            # At most one action per step: using one excludes the other
+            required[step] = first if fact else second
+        elif encoder.axiom_num == 4:
+            assert step < horizon-1 and step >= 0, "The step number for axiom 4 has to be between 0 and the horizon, last one excluded."
+            required[step] = first if fact else second
+            required[step+1] = second if fact else first
+        return forbidden, needed, required
+
+    def count(self, horizon, contrastive_type=None):
+        """!
+        Counts the action sequences of a given length (with empty steps)
+        that are executable from the initial state and reach the goal.
+
+        @param horizon: number of steps.
+        @param contrastive_type: fact or foil support of the contrastive
+        axiom of the encoder, or None to count all plans.
+        @return number of plans.
+        """
+        forbidden, needed, required = self._constraints(horizon, contrastive_type)
+
+        # Sequences reaching each state, split by whether they executed the
+        # needed action
+        layer = {(self.initial, needed is None): 1}
+        for step in range(horizon):
+            successors = defaultdict(int)
+            for (state, done), count in layer.items():
+                if not step in required:
+                    successors[(state, done)] += count
+                for name, successor in self._successors(state):
+                    if name == forbidden or not self.encoder.isExecutable(step, name):
+                        continue
+                    if step in required and name != required[step]:
+                        continue
+                    successors[(successor, done or name == needed)] += count
+            layer = successors
+
+        return sum([count for (state, done), count in layer.items()
+                    if done and all([_holds(goal, state) for goal in self.goals])])
+
+    def states(self):
+        """!
+        @return number of states expanded so far.
+        """
+        return len(self.successors)
@@ -0,0 +1,125 @@
+############################################################################
+##    This file is part of OMTPlan.
+##
+##    OMTPlan is free software: you can redistribute it and/or modify
+##    it under the terms of the GNU General Public License as published by
+##    the Free Software Foundation, either version 3 of the License, or
+##    (at your option) any later version.
+##
+##    OMTPlan is distributed in the hope that it will be useful,
+##    but WITHOUT ANY WARRANTY; without even the implied warranty of
+##    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##    GNU General Public License for more details.
+##
+##    You should have received a copy of the GNU General Public License
+##    along with OMTPlan.  If not, see <https://www.gnu.org/licenses/>.
+############################################################################
+
+import time
+import multiprocessing
+from multiprocessing.connection import wait
+
+class Portfolio():
+    """
+    Runs checks of candidate horizons concurrently, one worker process
+    per check. Processes are forked from the search, so that each worker
+    inherits the encoder and builds its formula in its own Z3 context.
+
+    Candidates are ordered, and the answer is the first candidate (in
+    that order) whose result is final, once all the previous candidates
+    are known not to be: the answer does not depend on which worker
+    finishes first, so results are deterministic for the same candidates.
+    Workers of candidates following a final result are cancelled.
+    """
+
+    def __init__(self, workers):
+        self.workers = max(1, workers)
+        self.context = multiprocessing.get_context('fork')
+
+        # Whether the last run was stopped by its time limit
+        self.expired = False
+
+    def _run(self, connection, check, candidate):
+        try:
+            result = check(candidate)
+        except Exception as error:
+            result = error
+        connection.send(result)
+        connection.close()
+
+    def run(self, candidates, check, isFinal, report=None, timeout=None):
+        """!
+        Checks candidates until the answer is decided.
+
+        @param candidates: ordered list of candidates (e.g. horizons).
+        @param check: function checking a candidate, run in a worker. Its result must be picklable.
+        @param isFinal: function telling whether a result decides the answer.
+        @param report: function called in the search process with each candidate and result, in completion order.
+        @param timeout: time limit (in seconds) of the whole run, workers still running then are cancelled.
+        @return candidate and result of the answer (None, None if no result is final or the time limit is reached).
+        """
+        results = dict()
+        running = dict()
+        next_index = 0
+        answer = None
+
+        deadline = None if timeout is None else time.time() + timeout
+        self.expired = False
+
+        try:
+            while True:
+                # Answer is decided by the first final result not preceded by pending ones
+                answer = None
+                for index in range(len(candidates)):
+                    if not index in results:
+                        break
+                    if isFinal(results[index]):
+                        answer = index
+                        break
+                if answer is not None or len(results) == len(candidates):
+                    break
+
+                # Candidates after a final result are not needed
+                bound = min([index for index in results if isFinal(results[index])], default=len(candidates))
+                for connection, (index, process) in list(running.items()):
+                    if index > bound:
+                        self._stop(process)
+                        del running[connection]
+
+                while len(running) < self.workers and next_index < bound:
+                    receiver, sender = self.context.Pipe(duplex=False)
+                    process = self.context.Process(target=self._run, args=(sender, check, candidates[next_index]))
+                    process.start()
+                    sender.close()
+                    running[receiver] = (next_index, process)
+                    next_index += 1
+
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    self.expired = True
+                    answer = None
+                    break
+
+                for connection in wait(list(running.keys()), remaining):
+                    index, process = running.pop(connection)
+                    try:
+                        result = connection.recv()
+                    except EOFError:
+                        result = Exception('worker of {} terminated'.format(candidates[index]))
+                    process.join()
+                    if isinstance(result, Exception):
+                        raise result
+                    results[index] = result
+                    if report is not None:
+                        report(candidates[index], result)
+        finally:
+            for connection, (index, process) in running.items():
+                self._stop(process)
+
+        if answer is None:
+            return None, None
+        return candidates[answer], results[answer]
+
+    def _stop(self, process):
+        process.kill()
+        process.join()
@@ -0,0 +1,368 @@
+############################################################################
+##    This file is part of OMTPlan.
+##
+##    OMTPlan is free software: you can redistribute it and/or modify
+##    it under the terms of the GNU General Public License as published by
+##    the Free Software Foundation, either version 3 of the License, or
+##    (at your option) any later version.
+##
+##    OMTPlan is distributed in the hope that it will be useful,
+##    but WITHOUT ANY WARRANTY; without even the implied warranty of
+##    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##    GNU General Public License for more details.
+##
+##    You should have received a copy of the GNU General Public License
+##    along with OMTPlan.  If not, see <https://www.gnu.org/licenses/>.
+############################################################################
+
+from copy import copy
+
+from unified_planning.model.operators import *
+from unified_planning.model.walkers import FreeVarsExtractor
+
+INF = float('inf')
+
+## Interval arithmetic helpers, intervals are (lo, hi) tuples.
+
+def _lo(value):
+    # inf - inf is undefined, be conservative
+    return -INF if value != value else value
+
+def _hi(value):
+    return INF if value != value else value
+
+def _mul(x, y):
+    # Convention used for interval bounds: 0 * inf = 0
+    return 0.0 if x == 0 or y == 0 else x * y
+
+def _add(a, b):
+    return (_lo(a[0] + b[0]), _hi(a[1] + b[1]))
+
+def _sub(a, b):
+    return (_lo(a[0] - b[1]), _hi(a[1] - b[0]))
+
+def _times(a, b):
+    products = [_mul(x, y) for x in a for y in b]
+    return (min(products), max(products))
+
+def _div(a, b):
+    if b[0] <= 0 <= b[1]:
+        return (-INF, INF)
+    return _times(a, (1.0 / b[1], 1.0 / b[0]))
+
+def _hull(a, b):
+    return (min(a[0], b[0]), max(a[1], b[1]))
+
+
+class RelaxedPlanningGraph():
+    """
+    Layered relaxed planning graph of a ground problem.
+
+    Propositional fluents are relaxed by letting them hold both truth
+    values once some action can set them, numeric fluents by the interval
+    of values they can take (as in ''The Metric-FF Planning System'',
+    Hoffmann, JAIR 2003). Layer k over-approximates the set of states
+    reachable in k steps, hence the layer at which an action first becomes
+    applicable is a lower bound on the first step at which it can be executed.
+
+    If an ordering of the actions is given, actions in a layer also see the
+    effects of those preceding them in the ordering, which is the case for
+    encodings that chain several actions within a step (e.g., R2E).
+    """
+
+    def __init__(self, ground_problem, ordering=None):
+        self.ground_problem = ground_problem
+        self.ordering = ordering
+
+        # first layer at which each action is applicable
+        self.action_layer = dict()
+
+        # first layer at which each fluent can differ from its initial value
+        self.fluent_layer = dict()
+
+        # first layer at which the goal can be satisfied (None if never)
+        self.goal_layer = None
+
+        # number of layers needed to reach the fixpoint
+        self.layers = 0
+
+        self._build()
+
+    def _interval(self, node):
+        """!
+        Computes the interval of values a numeric expression can take.
+
+        @param node: numeric expression.
+        @return interval
+        """
+        if node.is_int_constant() or node.is_real_constant():
+            value = float(node.constant_value())
+            return (value, value)
+        elif node.is_fluent_exp():
+            return self.bounds.get(node, (-INF, INF))
+        elif node.node_type in [OperatorKind.PLUS, OperatorKind.MINUS, OperatorKind.TIMES, OperatorKind.DIV]:
+            operation = {OperatorKind.PLUS: _add, OperatorKind.MINUS: _sub,
+                         OperatorKind.TIMES: _times, OperatorKind.DIV: _div}[node.node_type]
+            result = self._interval(node.args[0])
+            for arg in node.args[1:]:
+                result = operation(result, self._interval(arg))
+            return result
+        else:
+            return (-INF, INF)
+
+    def _evaluate(self, node):
+        """!
+        Evaluates a condition in the relaxed state.
+
+        @param node: boolean expression.
+        @return (can be true, can be false)
+        """
+        kind = node.node_type
+        if kind == OperatorKind.AND:
+            values = [self._evaluate(arg) for arg in node.args]
+            return (all([t for t, _ in values]), any([f for _, f in values]))
+        elif kind == OperatorKind.OR:
+            values = [self._evaluate(arg) for arg in node.args]
+            return (any([t for t, _ in values]), all([f for _, f in values]))
+        elif kind == OperatorKind.NOT:
+            t, f = self._evaluate(node.args[0])
+            return (f, t)
+        elif kind == OperatorKind.IMPLIES:
+            t_a, f_a = self._evaluate(node.args[0])
+            t_b, f_b = self._evaluate(node.args[1])
+            return (f_a or t_b, t_a and f_b)
+        elif kind == OperatorKind.BOOL_CONSTANT:
+            value = node.bool_constant_value()
+            return (value, not value)
+        elif kind == OperatorKind.FLUENT_EXP and node.type.is_bool_type():
+            if node in self.positive or node in self.negative:
+                return (node in self.positive, node in self.negative)
+            return (True, True)
+        elif kind in [OperatorKind.LE, OperatorKind.LT, OperatorKind.EQUALS] and (node.args[0].type.is_int_type() or node.args[0].type.is_real_type()):
+            a = self._interval(node.args[0])
+            b = self._interval(node.args[1])
+            if kind == OperatorKind.LE:
+                return (a[0] <= b[1], a[1] > b[0])
+            elif kind == OperatorKind.LT:
+                return (a[0] < b[1], a[1] >= b[0])
+            else:
+                return (a[0] <= b[1] and b[0] <= a[1], not (a[0] == a[1] == b[0] == b[1]))
+        else:
+            # Be conservative on anything we do not know how to relax
+            return (True, True)
+
+    def _applicable(self, action):
+        return all([self._evaluate(pre)[0] for pre in action.preconditions])
+
+    def _applyEffect(self, effect, positive, negative, bounds):
+        """!
+        Applies a relaxed effect evaluated in the current layer,
+        storing its outcome in the next layer.
+        """
+        if effect.is_conditional() and not self._evaluate(effect.condition)[0]:
+            return
+        fluent = effect.fluent
+        if fluent.type.is_bool_type():
+            t, f = self._evaluate(effect.value)
+            if t:
+                positive.add(fluent)
+            if f:
+                negative.add(fluent)
+        else:
+            current = self.bounds.get(fluent, (-INF, INF))
+            value = self._interval(effect.value)
+            if effect.is_increase():
+                value = _add(current, value)
+            elif effect.is_decrease():
+                value = _sub(current, value)
+            bounds[fluent] = _hull(bounds.get(fluent, current), value)
+
+    def _build(self):
+        """
+        Expands the graph until a fixpoint is reached.
+        """
+        self.positive = set()
+        self.negative = set()
+        self.bounds = dict()
+
+        for fluent, value in self.ground_problem.initial_values.items():
+            if fluent.type.is_bool_type():
+                if value.is_true():
+                    self.positive.add(fluent)
+                else:
+                    self.negative.add(fluent)
+            elif value.is_int_constant() or value.is_real_constant():
+                self.bounds[fluent] = (float(value.constant_value()), float(value.constant_value()))
+
+        goals = self.ground_problem.goals
+        actions = self.ordering if self.ordering is not None else self.ground_problem.actions
+        layer = 0
+
+        while True:
+            if self.goal_layer is None and all([self._evaluate(goal)[0] for goal in goals]):
+                self.goal_layer = layer
+
+            previous = (set(self.positive), set(self.negative), dict(self.bounds))
+
+            if self.ordering is None:
+                # All actions of a layer see the state at the beginning of the layer
+                positive, negative, bounds = set(self.positive), set(self.negative), dict(self.bounds)
+            else:
+                # Actions see the effects of the ones preceding them in the same layer
+                positive, negative, bounds = self.positive, self.negative, self.bounds
+
+            new_actions = 0
+            for action in actions:
+                if not action.name in self.action_layer:
+                    if not self._applicable(action):
+                        continue
+                    self.action_layer[action.name] = layer
+                    new_actions = new_actions + 1
+                    # Propositional effects only need to be applied once
+                    for effect in action.effects:
+                        if effect.fluent.type.is_bool_type():
+                            self._applyEffect(effect, positive, negative, bounds)
+                # Numeric ones may keep growing the intervals
+                for effect in action.effects:
+                    if not effect.fluent.type.is_bool_type():
+                        self._applyEffect(effect, positive, negative, bounds)
+
+            grown = [fluent for fluent, interval in bounds.items() if previous[2].get(fluent) != interval]
+            changed = (new_actions > 0 or positive != previous[0] or negative != previous[1])
+
+            if not changed and len(grown) == 0:
+                break
+
+            if not changed:
+                # Only numeric intervals are growing: widen them to
+                # guarantee termination (this keeps the over-approximation).
+                for fluent in grown:
+                    old = previous[2].get(fluent, (-INF, INF))
+                    new = bounds[fluent]
+                    bounds[fluent] = (-INF if new[0] < old[0] else new[0], INF if new[1] > old[1] else new[1])
+
+            for fluent in (positive - previous[0]) | (negative - previous[1]) | set(grown):
+                if not fluent in self.fluent_layer:
+                    self.fluent_layer[fluent] = layer + 1
+
+            self.positive = positive
+            self.negative = negative
+            self.bounds = bounds
+            layer = layer + 1
+
+        self.layers = layer
+
+    def isReachable(self, action):
+        """!
+        Checks if an action can ever be applied.
+
+        @param action: ground action.
+        @return Truth value.
+        """
+        return action.name in self.action_layer
+
+    def earliestStep(self, action):
+        """!
+        Returns a lower bound on the first step at which an action can be executed.
+
+        @param action: name of the ground action.
+        @return step (inf if the action is unreachable).
+        """
+        return self.action_layer.get(action, INF)
+
+    def parallelLowerBound(self):
+        """!
+        Returns a lower bound on the number of steps of any plan, i.e.,
+        the first layer satisfying the goal (h_max with numeric intervals).
+
+        @return number of steps (None if the goal is unreachable).
+        """
+        return self.goal_layer
+
+    def sequentialLowerBound(self):
+        """!
+        Returns a lower bound on the number of actions of any plan.
+
+        On top of the layer bound, every goal literal that does not hold
+        initially needs an action affecting its fluent, hence a sequential
+        plan has at least as many actions as those literals divided by the
+        largest number of them affected by a single reachable action.
+
+        @return number of actions (None if the goal is unreachable).
+        """
+        if self.goal_layer is None:
+            return None
+
+        # Top-level goal literals over propositional fluents
+        literals = []
+        conjuncts = list(self.ground_problem.goals)
+        while len(conjuncts) > 0:
+            node = conjuncts.pop()
+            if node.node_type == OperatorKind.AND:
+                conjuncts.extend(node.args)
+            elif node.node_type == OperatorKind.FLUENT_EXP and node.type.is_bool_type():
+                literals.append((node, True))
+            elif node.node_type == OperatorKind.NOT and node.args[0].node_type == OperatorKind.FLUENT_EXP:
+                literals.append((node.args[0], False))
+
+        initial_values = self.ground_problem.initial_values
+        open_fluents = set([fluent for fluent, value in literals if (fluent in initial_values and initial_values[fluent].is_true()) != value])
+
+        if len(open_fluents) == 0:
+            return self.goal_layer
+
+        most = 0
+        for action in self.ground_problem.actions:
+            if action.name in self.action_layer:
+                most = max(most, len(set([effect.fluent for effect in action.effects]) & open_fluents))
+
+        if most == 0:
+            return None
+
+        return max(self.goal_layer, -(-len(open_fluents) // most))
+
+
+def pruneUnreachable(ground_problem, graph, keep_actions=()):
+    """!
+    Removes actions that are not reachable in the relaxed planning graph
+    and fluents that are not mentioned by any remaining action, the goal
+    or the metric.
+
+    @param ground_problem: ground problem.
+    @param graph: RelaxedPlanningGraph of the ground problem.
+    @param keep_actions: names of actions that must not be removed.
+    @return problem: ground problem with reachable actions only.
+    @return initial_values: initial values of the relevant fluents.
+    """
+
+    actions = [action for action in ground_problem.actions if graph.isReachable(action) or action.name in keep_actions]
+
+    # Shallow copy, we only want a different action list.
+    # Actions are replaced directly since adding them one by one
+    # checks names in quadratic time.
+    problem = copy(ground_problem)
+    problem._actions = actions
+
+    extractor = FreeVarsExtractor()
+    relevant = set()
+    for action in actions:
+        for pre in action.preconditions:
+            relevant.update(extractor.get(pre))
+        for effect in action.effects:
+            relevant.add(effect.fluent)
+            relevant.update(extractor.get(effect.value))
+            relevant.update(extractor.get(effect.condition))
+    for goal in ground_problem.goals:
+        relevant.update(extractor.get(goal))
+    for metric in ground_problem.quality_metrics:
+        if hasattr(metric, 'expression'):
+            relevant.update(extractor.get(metric.expression))
+
+    all_initial_values = ground_problem.initial_values
+    initial_values = {fluent: value for fluent, value in all_initial_values.items() if fluent in relevant}
+
+    print('Relaxed reachability: pruned {}/{} actions and {}/{} fluents'.format(
+        len(ground_problem.actions) - len(actions), len(ground_problem.actions),
+        len(all_initial_values) - len(initial_values), len(all_initial_values)))
+
+    return problem, initial_values
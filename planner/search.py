@@ -18,7 +18,12 @@
 from z3 import *
 from planner import plan
 from planner import encoder
+from planner import modifier
+from planner import portfolio
+from planner import reachability
+from planner import solvers
 import utils
+import time
 import numpy as np
 
 
@@ -27,13 +32,147 @@ class Search():
     Base class defining search schemes.
     """
 
-    def __init__(self, encoder,ub):
+    def __init__(self, encoder, ub, timeout=None, check_timeout=None, memory=None, preset='auto'):
         self.encoder = encoder
         self.found = False
         self.solution = None
         self.solver = None
         self.ub = ub
 
+        # Verdicts of the horizons checked so far
+        self.verdicts = dict()
+
+        # Wall-clock deadline of the whole search (None if unbounded)
+        self.deadline = None if timeout is None else time.time() + timeout
+
+        # Time limit (in seconds) of a single solver check
+        self.check_timeout = check_timeout
+
+        # Memory cap (in MB) shared by all Z3 solvers
+        if memory is not None:
+            set_param('memory_max_size', memory)
+
+        # Largest horizon proven not to admit a plan
+        self.last_unsat = None
+
+        # Why the search stopped before deciding the answer (None if it did not)
+        self.stopped = None
+
+        # Solver preset, selected from the kind of the problem if not given
+        if preset == 'auto':
+            preset = solvers.selectPreset(encoder.ground_problem)
+        self.preset = preset
+        print('Solver preset: {}'.format(self.preset))
+
+    def _check(self, solver, *assumptions):
+        """!
+        Checks a solver within the time limits of the search. The per-check
+        timeout is shortened to the time left before the global deadline.
+
+        @param solver: Z3 solver (or optimizer).
+        @param assumptions: assumption literals of the check.
+        @return verdict (unknown if the check ran out of time or memory, or was not run at all).
+        """
+        limit = self.check_timeout
+        if self.deadline is not None:
+            remaining = self.deadline - time.time()
+            if remaining <= 0:
+                self.stopped = 'time limit'
+                return unknown
+            limit = remaining if limit is None else min(limit, remaining)
+
+        if limit is not None:
+            solver.set('timeout', max(1, int(1000 * limit)))
+
+        res = solver.check(*assumptions)
+        if res == unknown:
+            self.stopped = solver.reason_unknown()
+        return res
+
+    def _remaining(self):
+        """!
+        @return seconds left before the global deadline (None if unbounded).
+        """
+        return None if self.deadline is None else max(0.0, self.deadline - time.time())
+
+    def _reportStop(self, horizon):
+        """!
+        Reports a search stopped by its limits before deciding the answer.
+
+        @param horizon: horizon being checked when the search stopped.
+        """
+        print('Search stopped ({}) at horizon {}, last horizon proven unsat: {}'.format(
+            self.stopped, horizon, 'none' if self.last_unsat is None else self.last_unsat))
+
+    def lowerBound(self):
+        """!
+        Computes a lower bound on the horizon of any plan from the relaxed
+        planning graph of the ground problem (see reachability), so that
+        smaller horizons do not need to be checked.
+
+        @return horizon (None if the goal is unreachable).
+        """
+        graph = self.encoder.relaxed_graph
+
+        if isinstance(self.encoder, encoder.R2EEncoding):
+            # Actions are chained within a step
+            if graph is None:
+                graph = reachability.RelaxedPlanningGraph(self.encoder.ground_problem, self.encoder.getActionsList())
+            bound = graph.parallelLowerBound()
+        else:
+            if graph is None:
+                graph = reachability.RelaxedPlanningGraph(self.encoder.ground_problem)
+            if isinstance(self.encoder.modifier, modifier.LinearModifier):
+                bound = graph.sequentialLowerBound()
+            else:
+                bound = graph.parallelLowerBound()
+
+        if bound is None:
+            print('Plan length lower bound: goal unreachable')
+        else:
+            print('Plan length lower bound: {}'.format(bound))
+
+        return bound
+
+    def _trueActions(self, model, horizon):
+        """!
+        Lists the actions executed in a model, so that plans found in
+        worker processes can be sent back to the search.
+
+        @param model: Z3 model of the planning formula.
+        @param horizon: horizon of the formula.
+        @return list of (step, action name) tuples.
+        """
+        actions = []
+        for step in range(horizon):
+            for name, var in self.encoder.action_variables[step].items():
+                if is_true(model.eval(var, model_completion=True)):
+                    actions.append((step, name))
+        return actions
+
+    def _planFromActions(self, horizon, actions, cost=None):
+        """!
+        Rebuilds the plan found by a worker process at a given horizon.
+
+        @param horizon: horizon of the plan.
+        @param actions: list of (step, action name) tuples executed in the plan.
+        @param cost: cost of the plan, when computed by the worker.
+        @return plan
+        """
+        self.encoder.horizon = horizon
+        self.encoder.createVariables()
+
+        # A model assigning the executed actions only is enough to extract the plan
+        solver = Solver()
+        for step, name in actions:
+            solver.add(self.encoder.action_variables[step][name])
+        solver.check()
+
+        solution = plan.Plan(solver.model(), self.encoder)
+        if cost is not None:
+            solution.cost = cost
+        return solution
+
 
 
 class SearchSMT(Search):
@@ -48,17 +187,20 @@ class SearchSMT(Search):
         Optimal plan is obtained by simple ramp-up strategy
         """
 
-        # Defines initial horizon for ramp-up SMT search
+        print('Start linear search SMT')
 
-        self.horizon = 1
+        # Defines initial horizon for ramp-up SMT search,
+        # smaller horizons cannot admit a plan
 
-        print('Start linear search SMT')
+        bound = self.lowerBound()
+
+        self.horizon = self.ub if bound is None else max(bound, 1)
 
         # Build formula until a plan is found or upper bound is reached
 
         while not self.found and self.horizon < self.ub:
             # Create SMT solver instance
-            self.solver = Solver()
+            self.solver = solvers.makeSolver(self.preset)
 
             # Build planning subformulas
             formula =  self.encoder.encode(self.horizon)
@@ -68,19 +210,25 @@ class SearchSMT(Search):
                 self.solver.add(v)
 
             # Check for satisfiability
-            res = self.solver.check()
+            res = self._check(self.solver)
 
             if res == sat:
                 self.found = True
-            else:
+            elif res == unsat:
                 # Increment horizon until we find a solution
+                self.last_unsat = self.horizon
                 self.horizon = self.horizon + 1
+            else:
+                break
 
 
         if self.found:
             # Extract plan from model
             model = self.solver.model()
             self.solution = plan.Plan(model, self.encoder)
+        elif self.stopped is not None:
+            self.solution = []
+            self._reportStop(self.horizon)
         else:
             self.solution = []
             print('Problem not solvable')
@@ -88,11 +236,309 @@ class SearchSMT(Search):
         return self.solution
 
 
+    def do_incremental_search(self):
+        """
+        Linear search scheme for SMT encodings with unit action costs,
+        using a single solver.
+
+        Each horizon only adds the new step layer to the solver, while the
+        goal is guarded by an assumption literal (one per horizon), so that
+        clauses learned at previous horizons are kept.
+        """
+
+        print('Start incremental search SMT')
+
+        # Defines initial horizon for ramp-up SMT search,
+        # smaller horizons cannot admit a plan
+
+        bound = self.lowerBound()
+
+        self.horizon = self.ub if bound is None else max(bound, 1)
+
+        # Create SMT solver instance (once)
+        self.solver = solvers.makeIncrementalSolver(self.preset)
+
+        while not self.found and self.horizon < self.ub:
+            # Build subformulas of the new steps
+            formula = self.encoder.incremental_encoding(self.horizon)
+
+            # Assert subformulas in solver, goal is assumed
+            for k,v in formula.items():
+                if not k == 'goal':
+                    self.solver.add(v)
+
+            goal = Bool('__goal_{}'.format(self.horizon))
+            self.solver.add(Implies(goal, formula['goal']))
+
+            # Check for satisfiability
+            res = self._check(self.solver, goal)
+
+            if res == sat:
+                self.found = True
+            elif res == unsat:
+                # Increment horizon until we find a solution
+                self.last_unsat = self.horizon
+                self.horizon = self.horizon + 1
+            else:
+                break
+
+        if self.found:
+            # Extract plan from model
+            model = self.solver.model()
+            self.solution = plan.Plan(model, self.encoder)
+        elif self.stopped is not None:
+            self.solution = []
+            self._reportStop(self.horizon)
+        else:
+            self.solution = []
+            print('Problem not solvable')
+
+        return self.solution
+
+
+    def _checkHorizon(self, horizon, incremental=False):
+        """!
+        Checks whether a plan exists at a given horizon. Verdicts are
+        cached, so that each horizon is solved at most once per search.
+
+        @param horizon: horizon to check.
+        @param incremental: extends a single solver, as in do_incremental_search,
+                            instead of encoding the horizon from scratch.
+        @return res: verdict of the solver (the model is kept in self.model when sat).
+        """
+        if horizon in self.verdicts:
+            return self.verdicts[horizon]
+
+        if incremental:
+            if self.solver is None:
+                self.solver = solvers.makeIncrementalSolver(self.preset)
+
+            # Steps beyond those already in the solver are added,
+            # smaller horizons only need their own goal
+            if horizon > self.encoder.incremental_horizon:
+                formula = self.encoder.incremental_encoding(horizon)
+                for k,v in formula.items():
+                    if not k == 'goal':
+                        self.solver.add(v)
+
+            goal = Bool('__goal_{}'.format(horizon))
+            self.solver.add(Implies(goal, self.encoder.encodeGoalState(horizon)))
+            res = self._check(self.solver, goal)
+        else:
+            self.solver = solvers.makeSolver(self.preset)
+            formula = self.encoder.encode(horizon)
+            for k,v in formula.items():
+                self.solver.add(v)
+            res = self._check(self.solver)
+
+        print('Horizon {}: {}'.format(horizon, res))
+
+        # Unknown verdicts are not cached, they stop the search
+        if res == unknown:
+            return res
+
+        self.verdicts[horizon] = res
+        if res == sat:
+            self.model = self.solver.model()
+        else:
+            self.last_unsat = max(horizon, self.last_unsat or 0)
+        return res
+
+
+    def do_exponential_search(self, incremental=False):
+        """!
+        Search scheme for SMT encodings with unit action costs that
+        doubles the horizon until a plan is found, then bisects between
+        the last horizon without a plan and the first one with a plan.
+
+        Plans found are optimal, since a plan at some horizon is also a
+        plan at any larger horizon (steps can be left empty), while far
+        fewer horizons than in the linear ramp-up are checked when plans
+        are long.
+
+        @param incremental: uses a single solver for all checks (see do_incremental_search).
+        @return solution: plan found (empty list if none exists within the bound).
+        """
+
+        print('Start exponential search SMT')
+
+        self.verdicts = dict()
+        self.model = None
+
+        # Largest horizon known not to admit a plan, and
+        # smallest one (with its model) admitting a plan
+        upper = None
+        model = None
+
+        # Horizons below the lower bound cannot admit a plan
+
+        bound = self.lowerBound()
+        horizon = self.ub if bound is None else max(bound, 1)
+        lower = horizon - 1
+
+        # Double the horizon until a plan is found or upper bound is reached
+
+        while horizon < self.ub:
+            res = self._checkHorizon(horizon, incremental)
+            if res == sat:
+                upper, model = horizon, self.model
+                break
+            elif res == unknown:
+                break
+            lower = horizon
+            if horizon == self.ub - 1:
+                break
+            horizon = min(2 * horizon, self.ub - 1)
+
+        # Bisect down to the smallest horizon admitting a plan
+
+        if upper is not None:
+            while upper - lower > 1:
+                horizon = (lower + upper) // 2
+                res = self._checkHorizon(horizon, incremental)
+                if res == sat:
+                    upper, model = horizon, self.model
+                elif res == unsat:
+                    lower = horizon
+                else:
+                    break
+
+        print('Horizons checked: {}'.format(len(self.verdicts)))
+
+        if upper is not None:
+            if self.stopped is not None:
+                self._reportStop(horizon)
+            if upper - lower > 1:
+                # Stopped while bisecting, the plan found is kept
+                print('Plan at horizon {} is not proven optimal'.format(upper))
+            self.found = True
+            self.horizon = upper
+            # Only steps up to the optimal horizon are part of the plan
+            self.encoder.horizon = upper
+            self.solution = plan.Plan(model, self.encoder)
+        elif self.stopped is not None:
+            # A limit is no proof that no plan exists
+            self.solution = []
+            self._reportStop(horizon)
+        else:
+            self.solution = []
+            print('Problem not solvable')
+
+        return self.solution
+
+
+    def _checkHorizonWorker(self, horizon):
+        """!
+        Checks a horizon in a worker process of the portfolio search.
+
+        @param horizon: horizon to check.
+        @return verdict (as a string) and actions of the plan found (None if unsat).
+        """
+        solver = solvers.makeSolver(self.preset)
+        formula = self.encoder.encode(horizon)
+        for k,v in formula.items():
+            solver.add(v)
+        res = self._check(solver)
+        if res == sat:
+            return str(res), self._trueActions(solver.model(), horizon)
+        return str(res), None
+
+
+    def do_portfolio_search(self, workers):
+        """!
+        Search scheme for SMT encodings with unit action costs that checks
+        consecutive horizons concurrently in worker processes.
+
+        The plan returned is the one at the smallest horizon admitting a
+        plan, which is decided once all smaller horizons are unsat; checks
+        of larger horizons are then cancelled. An unknown verdict (limits
+        reached) also decides the search, which then stops without a plan.
+
+        @param workers: number of worker processes.
+        @return solution: plan found (empty list if none exists within the bound).
+        """
+
+        print('Start portfolio search SMT ({} workers)'.format(workers))
+
+        self.verdicts = dict()
+        verdicts = {'sat': sat, 'unsat': unsat, 'unknown': unknown}
+
+        def report(horizon, result):
+            print('Horizon {}: {}'.format(horizon, result[0]))
+            self.verdicts[horizon] = verdicts[result[0]]
+            if result[0] == 'unsat':
+                self.last_unsat = max(horizon, self.last_unsat or 0)
+
+        # Horizons below the lower bound cannot admit a plan
+        bound = self.lowerBound()
+        first = self.ub if bound is None else max(bound, 1)
+
+        pool = portfolio.Portfolio(workers)
+        horizon, result = pool.run(list(range(first, self.ub)), self._checkHorizonWorker, lambda result: result[0] in ['sat', 'unknown'], report, self._remaining())
+
+        if pool.expired or (horizon is not None and result[0] == 'unknown'):
+            self.stopped = 'time limit' if pool.expired else 'unknown'
+            self.solution = []
+            self._reportStop(horizon)
+        elif horizon is not None:
+            self.found = True
+            self.horizon = horizon
+            self.solution = self._planFromActions(horizon, result[1])
+        else:
+            self.solution = []
+            print('Problem not solvable')
+
+        return self.solution
+
+
 class SearchOMT(Search):
     """
     Search class for OMT-based encodings.
     """
 
+    def __init__(self, encoder, ub, adaptive=True, timeout=None, check_timeout=None, memory=None, preset='auto'):
+        super().__init__(encoder, ub, timeout, check_timeout, memory, preset)
+
+        # Adaptive horizon schedule (fixed percentages of ub otherwise)
+        self.adaptive = adaptive
+
+        # Refinement rounds and loop formulas added by lazy loop formulas
+        self.loop_rounds = 0
+        self.loop_formulas = 0
+
+    def _checkLoops(self, solver):
+        """!
+        Checks a solver within the limits of the search. With lazy loop
+        formulas, those violated by the model are added and the solver is
+        checked again, until the model violates none of them.
+
+        @param solver: Z3 optimizer.
+        @return verdict of the solver.
+        """
+        res = self._check(solver)
+
+        if not self.encoder.lazy_loops:
+            return res
+
+        rounds = 0
+        added = 0
+        while res == sat:
+            violated = self.encoder.violatedLoopFormulas(solver.model())
+            if len(violated) == 0:
+                break
+            rounds = rounds + 1
+            added = added + len(violated)
+            solver.add(violated)
+            res = self._check(solver)
+
+        self.loop_rounds = self.loop_rounds + rounds
+        self.loop_formulas = self.loop_formulas + added
+
+        print('Lazy loop formulas: {} rounds, {}/{} formulas added (total: {} rounds, {} formulas)'.format(
+            rounds, added, len(self.encoder.loop_formulas), self.loop_rounds, self.loop_formulas))
+
+        return res
+
     def computeHorizonSchedule(self):
         """
         Computes horizon schedule given upper bound for search.
@@ -110,6 +556,56 @@ class SearchOMT(Search):
 
         return schedule
 
+    def firstHorizon(self):
+        """!
+        Computes the first horizon to try.
+
+        The adaptive schedule starts from the lower bound on the number of
+        steps of any plan.
+
+        @return horizon (None if the goal is unreachable).
+        """
+        if not self.adaptive:
+            return self.computeHorizonSchedule()[0]
+
+        bound = self.lowerBound()
+
+        if bound is None:
+            return None
+
+        return min(max(bound, 1), self.ub)
+
+    def nextHorizon(self, horizon, model):
+        """!
+        Computes the horizon to try after the formula at horizon is unsat,
+        or its model does not satisfy the concrete goal.
+
+        The adaptive schedule grows the horizon by the number of fluents
+        the relaxed suffix of the model had to touch to reach the goal.
+
+        When the formula at horizon is unsat, there is no model to measure
+        and the horizon grows by one step.
+
+        @param horizon: last horizon tried.
+        @param model: model of the formula at horizon (None if unsat).
+        @return horizon (None if the upper bound has been tried).
+        """
+        if not self.adaptive:
+            later = [h for h in self.computeHorizonSchedule() if h > horizon]
+            return later[0] if len(later) > 0 else None
+
+        if horizon >= self.ub:
+            return None
+
+        if model is None:
+            return horizon + 1
+
+        touched = [name for name, var in self.encoder.touched_variables.items() if is_true(model.eval(var, model_completion=True))]
+
+        print('Relaxed suffix touched {} fluents'.format(len(touched)))
+
+        return min(horizon + max(len(touched), 1), self.ub)
+
 
     def do_search(self):
         """
@@ -120,15 +616,21 @@ class SearchOMT(Search):
 
         # Try different horizons
 
-        horizon_schedule = self.computeHorizonSchedule()
+        horizon = self.firstHorizon()
+
+        if horizon is None:
+            self.solution = []
+            print('Problem not solvable')
 
         # Start building formulae
 
-        for horizon in horizon_schedule:
+        while horizon is not None:
             print('Try horizon {}'.format(horizon))
 
+            start = time.time()
+
             # Create OMT solver instance
-            self.solver = Optimize()
+            self.solver = solvers.makeOptimize(self.preset)
 
             # Build planning subformulas
             formula = self.encoder.encode(horizon)
@@ -139,7 +641,7 @@ class SearchOMT(Search):
                 if label == 'objective':
                     # objective function requires different handling
                     # as per Z3 API
-                    objective = self.solver.minimize(sub_formula)
+                    objective = solvers.postObjective(self.solver, sub_formula)
                 elif label ==  'real_goal':
                     # we don't want to assert goal formula at horizon
                     # see construction described in related paper
@@ -147,36 +649,340 @@ class SearchOMT(Search):
                 else:
                     self.solver.add(sub_formula)
 
+            encoded = time.time()
+
             print('Checking formula')
 
-            res = self.solver.check()
+            res = self._checkLoops(self.solver)
+
+            print('Horizon {}: encoding {:.2f}s, solving {:.2f}s'.format(horizon, encoded - start, time.time() - encoded))
 
-            # If formula is unsat, the problem does not admit solution
-            # see Theorem 1 in related paper
+            # An unsat formula only rules out this horizon, as the relaxed
+            # suffix is bounded by it: move on to the next one
 
             if res == unsat:
                 self.solution = []
-                print('Problem not solvable')
+                self.last_unsat = horizon
+                print('Horizon {}: unsat'.format(horizon))
+                horizon = self.nextHorizon(horizon, None)
+                continue
 
-            else:
-                # Check if model satisfied concrete goal
-                model = self.solver.model()
-                opt = model.eval(formula['real_goal'])
+            if res == unknown:
+                self.solution = []
+                self._reportStop(horizon)
+                break
 
-                # if formula is sat and G_n is satisfied, solution is optimal
-                # see Theorem 2 in related paper
+            # Check if model satisfied concrete goal
+            model = self.solver.model()
+            opt = model.eval(formula['real_goal'])
 
-                if opt:
-                    self.solution =  plan.Plan(model, self.encoder, objective)
-                    break
+            # if formula is sat and G_n is satisfied, solution is optimal
+            # see Theorem 2 in related paper
+
+            if opt:
+                self.solution =  plan.Plan(model, self.encoder, objective)
+                break
+
+            horizon = self.nextHorizon(horizon, model)
+
+        return self.solution
+
+
+    def do_incremental_search(self):
+        """
+        Search scheme for OMT encodings with unit, constant or state-dependent action costs,
+        using a single solver.
+
+        The prefix of the formula is extended with the new step layers at
+        each horizon of the schedule and kept in the solver, while the
+        suffix (which depends on the last step) is asserted in a backtracking
+        point and removed before moving to the next horizon.
+        """
+
+        print('Start incremental search OMT')
+
+        # Try different horizons
+
+        horizon = self.firstHorizon()
+
+        if horizon is None:
+            self.solution = []
+            print('Problem not solvable')
+
+        # Create OMT solver instance (once)
+        self.solver = solvers.makeOptimize(self.preset)
+
+        while horizon is not None:
+            print('Try horizon {}'.format(horizon))
+
+            start = time.time()
+
+            # Build subformulas of the new steps and the suffix
+            prefix, suffix = self.encoder.incremental_encoding(horizon)
+
+            for label, sub_formula in prefix.items():
+                self.solver.add(sub_formula)
+
+            self.solver.push()
+
+            for label, sub_formula in suffix.items():
+                if label == 'objective':
+                    objective = solvers.postObjective(self.solver, sub_formula)
+                elif label == 'real_goal':
+                    # goal at horizon is only checked in the model
+                    pass
+                else:
+                    self.solver.add(sub_formula)
+
+            encoded = time.time()
+
+            print('Checking formula')
+
+            res = self._checkLoops(self.solver)
+
+            print('Horizon {}: encoding {:.2f}s, solving {:.2f}s'.format(horizon, encoded - start, time.time() - encoded))
+
+            # An unsat formula only rules out this horizon, as the relaxed
+            # suffix is bounded by it: move on to the next one
+
+            if res == unsat:
+                self.solution = []
+                self.last_unsat = horizon
+                print('Horizon {}: unsat'.format(horizon))
+                horizon = self.nextHorizon(horizon, None)
+                # Remove the suffix before extending the prefix
+                self.solver.pop()
+                continue
+
+            if res == unknown:
+                self.solution = []
+                self._reportStop(horizon)
+                break
+
+            # Check if model satisfied concrete goal
+            model = self.solver.model()
+            opt = model.eval(suffix['real_goal'])
+
+            # if formula is sat and G_n is satisfied, solution is optimal
+            # see Theorem 2 in related paper
+
+            if opt:
+                self.solution = plan.Plan(model, self.encoder, objective)
+                break
+
+            horizon = self.nextHorizon(horizon, model)
+
+            # Remove the suffix before extending the prefix
+            self.solver.pop()
+
+        return self.solution
+
+
+    def _seedPhases(self, model, horizon):
+        """!
+        Suggests the values of the action variables in a model of a previous
+        horizon as initial phases of the solver (when Z3 supports it).
+
+        @param model: model of the formula at the previous horizon.
+        @param horizon: previous horizon.
+        """
+        if not hasattr(self.solver, 'set_initial_value'):
+            return
+        for step in range(horizon):
+            for var in self.encoder.action_variables[step].values():
+                if not is_false(var):
+                    self.solver.set_initial_value(var, model.eval(var, model_completion=True))
+
+
+    def do_anytime_search(self):
+        """
+        Anytime search scheme for OMT encodings with unit, constant or state-dependent action costs.
+
+        Horizons are tried as in do_search. When the model of a horizon does
+        not satisfy the concrete goal, the formula is checked again with the
+        concrete goal asserted, to find the cheapest plan within the horizon.
+        Each plan improving the best known one is reported with its cost, and
+        later horizons only look for models not more expensive than it.
+
+        The optimum of each horizon is a lower bound on the cost of any plan
+        (see related paper), so the best plan is optimal as soon as its cost
+        reaches that bound. If the search is stopped by its limits, the best
+        plan found so far is returned.
+
+        @return solution: best plan found (empty list if none is found).
+        """
+
+        print('Start anytime search OMT')
+
+        self.solution = []
+
+        # Best plan found so far and its cost
+        incumbent = None
+        upper = None
+
+        previous = None
+
+        horizon = self.firstHorizon()
+
+        if horizon is None:
+            print('Problem not solvable')
+
+        while horizon is not None:
+            print('Try horizon {}'.format(horizon))
+
+            start = time.time()
+
+            self.solver = solvers.makeOptimize(self.preset)
+
+            formula = self.encoder.encode(horizon)
+
+            for label, sub_formula in formula.items():
+                if label == 'objective':
+                    objective = solvers.postObjective(self.solver, sub_formula)
+                elif label == 'real_goal':
+                    pass
+                else:
+                    self.solver.add(sub_formula)
+
+            # Only models cheaper than or as cheap as the best plan are of interest
+            if upper is not None:
+                self.solver.add(solvers.objectiveTerm(formula['objective']) <= upper)
+
+            if previous is not None:
+                self._seedPhases(*previous)
+
+            encoded = time.time()
+
+            res = self._checkLoops(self.solver)
+
+            print('Horizon {}: encoding {:.2f}s, solving {:.2f}s'.format(horizon, encoded - start, time.time() - encoded))
+
+            if res == unsat:
+                if incumbent is None:
+                    # Only this horizon is ruled out
+                    self.last_unsat = horizon
+                    print('Horizon {}: unsat'.format(horizon))
+                    horizon = self.nextHorizon(horizon, None)
+                    continue
+                # No plan is cheaper than the best one
+                print('Best plan is optimal')
+                break
+
+            if res == unknown:
+                self._reportStop(horizon)
+                break
+
+            model = self.solver.model()
+
+            if model.eval(formula['real_goal']):
+                self.solution = plan.Plan(model, self.encoder, objective)
+                print('Optimal plan found with cost {}'.format(self.solution.cost))
+                break
+
+            lower = objective.value()
+
+            print('Horizon {}: lower bound on plan cost {}'.format(horizon, lower))
+
+            if upper is not None and is_true(simplify(lower >= upper)):
+                print('Best plan is optimal')
+                break
+
+            # Look for the cheapest plan within the horizon
+            self.solver.push()
+            self.solver.add(formula['real_goal'])
+
+            res = self._checkLoops(self.solver)
+
+            if res == sat:
+                incumbent = plan.Plan(self.solver.model(), self.encoder, objective)
+                upper = incumbent.cost
+                self.solution = incumbent
+                print('Plan found at horizon {} with cost {}'.format(horizon, upper))
+                print(incumbent.plan)
+            elif res == unknown:
+                self._reportStop(horizon)
+                break
+
+            self.solver.pop()
+
+            previous = (model, horizon)
+
+            horizon = self.nextHorizon(horizon, model)
+
+        return self.solution
+
+
+    def _checkHorizonWorker(self, horizon):
+        """!
+        Checks a horizon in a worker process of the portfolio search.
+
+        @param horizon: horizon to check.
+        @return verdict (as a string), actions of the plan and its cost
+                (both None unless the plan satisfies the concrete goal).
+        """
+        solver = solvers.makeOptimize(self.preset)
+        formula = self.encoder.encode(horizon)
+        for label, sub_formula in formula.items():
+            if label == 'objective':
+                objective = solvers.postObjective(solver, sub_formula)
+            elif not label == 'real_goal':
+                solver.add(sub_formula)
+        res = self._checkLoops(solver)
+        if res == sat:
+            model = solver.model()
+            if is_true(model.eval(formula['real_goal'], model_completion=True)):
+                return str(res), self._trueActions(model, horizon), str(objective.value())
+        return str(res), None, None
+
+
+    def do_portfolio_search(self, workers):
+        """!
+        Search scheme for OMT encodings that checks the horizons of the
+        schedule concurrently in worker processes.
+
+        The answer is decided as in do_search, following the schedule
+        order: by the first horizon whose model satisfies the concrete goal
+        (the solution is optimal), once previous horizons are known not to
+        decide it. Checks of later horizons are then cancelled. An unsat
+        formula only rules out its horizon. An unknown verdict (limits
+        reached) stops the search without a plan.
+
+        @param workers: number of worker processes.
+        @return solution: optimal plan found (empty list if none is found).
+        """
+
+        print('Start portfolio search OMT ({} workers)'.format(workers))
+
+        def report(horizon, result):
+            print('Horizon {}: {}{}'.format(horizon, result[0], ', goal reached' if result[1] is not None else ''))
+            if result[0] == 'unsat':
+                self.last_unsat = max(horizon, self.last_unsat or 0)
+
+        def isFinal(result):
+            return result[0] == 'unknown' or result[1] is not None
+
+        pool = portfolio.Portfolio(workers)
+        horizon, result = pool.run(self.computeHorizonSchedule(), self._checkHorizonWorker, isFinal, report, self._remaining())
+
+        if pool.expired or (horizon is not None and result[0] == 'unknown'):
+            self.stopped = 'time limit' if pool.expired else 'unknown'
+            self.solution = []
+            self._reportStop(horizon)
+        elif horizon is not None and result[1] is not None:
+            self.solution = self._planFromActions(horizon, result[1], RealVal(result[2]))
+        else:
+            self.solution = []
+            print('No horizon of the schedule reached the goal')
 
         return self.solution
 
 
 class SearchR2E(Search):
     def do_search(self):
-        self.horizon = 1 
-        solver = Solver()
+        # Smaller horizons cannot admit a plan
+        bound = self.lowerBound()
+        self.horizon = self.ub if bound is None else max(bound, 1)
+        solver = solvers.makeIncrementalSolver(self.preset)
 
         while self.horizon < self.ub :
             
@@ -197,17 +1003,20 @@ class SearchR2E(Search):
             solver.add(formula['goal'])
 
             # Check for satisfiability
-            res = solver.check()
+            res = self._check(solver)
 
             if res == sat:
                 self.found = True
                 self.encoder.horizon = self.horizon
                 break
-            else:
+            elif res == unsat:
                 # Remove the old goal formula
                 solver.pop()
                 # Increment horizon until we find a solution
+                self.last_unsat = self.horizon
                 self.horizon = self.horizon + 1
+            else:
+                break
         
         if self.found:
             # Extract plan from model
@@ -215,6 +1024,9 @@ class SearchR2E(Search):
             self.solution = plan.Plan(model, self.encoder)
             if not self.solution.validate():
                 raise Exception('R2E: Plan found invalid!')
+        elif self.stopped is not None:
+            self.solution = []
+            self._reportStop(self.horizon)
         else:
             self.solution = []
             print('Problem not solvable')
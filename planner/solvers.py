@@ -0,0 +1,162 @@
+############################################################################
+##    This file is part of OMTPlan.
+##
+##    OMTPlan is free software: you can redistribute it and/or modify
+##    it under the terms of the GNU General Public License as published by
+##    the Free Software Foundation, either version 3 of the License, or
+##    (at your option) any later version.
+##
+##    OMTPlan is distributed in the hope that it will be useful,
+##    but WITHOUT ANY WARRANTY; without even the implied warranty of
+##    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+##    GNU General Public License for more details.
+##
+##    You should have received a copy of the GNU General Public License
+##    along with OMTPlan.  If not, see <https://www.gnu.org/licenses/>.
+############################################################################
+
+from z3 import *
+
+## Solver presets: Z3 solvers (and optimizers) tuned for a kind of encoding.
+##
+## Each preset builds an SMT solver and an OMT optimizer. Presets can be
+## chosen by name or selected from the kind of the ground problem.
+##
+## Tactic pipelines are applied from scratch on every check, hence they
+## only suit solvers checked once. Solvers checked many times with few
+## changes in between (incremental searches, model counting) are built
+## with makeIncrementalSolver instead.
+
+# Tactics reducing a propositional formula to SAT. Pseudo-boolean
+# constraints (e.g., at-most-one of the pb encoding) are turned into
+# bit-vectors first, so that bit-blasting handles them as well.
+SAT_TACTICS = ['simplify', 'propagate-values', 'solve-eqs', 'card2bv', 'bit-blast', 'sat']
+
+# Tactics for numeric encodings: eliminating equalities between numeric
+# variables (e.g., frame axioms of constant fluents) before the SMT core.
+ARITH_TACTICS = ['simplify', 'propagate-values', 'solve-eqs', 'elim-uncnstr', 'smt']
+
+# Features of problem kinds requiring arithmetic
+NUMERIC_FEATURES = ['NUMERIC_FLUENTS', 'INT_FLUENTS', 'REAL_FLUENTS']
+
+def default(optimize=False):
+    """!
+    Default Z3 solver and optimizer.
+
+    @param optimize: builds an optimizer instead of a solver.
+    @return Z3 solver or optimizer.
+    """
+    return Optimize() if optimize else Solver()
+
+def sat(optimize=False):
+    """!
+    SAT-oriented tactic pipeline, for propositional encodings. Objectives
+    are arithmetic even for propositional problems, and tactics cannot be
+    attached to optimizers, hence the optimizer is the default one.
+
+    @param optimize: builds an optimizer instead of a solver.
+    @return Z3 solver or optimizer.
+    """
+    if optimize:
+        return Optimize()
+    return Then(*SAT_TACTICS).solver()
+
+def arith(optimize=False):
+    """!
+    Arithmetic-oriented preprocessing for numeric encodings, and the
+    SYMBA optimization engine for their objectives, see
+    ''Symbolic Optimization with SMT Solvers'', Li et al., POPL 2014
+
+    @param optimize: builds an optimizer instead of a solver.
+    @return Z3 solver or optimizer.
+    """
+    if optimize:
+        optimizer = Optimize()
+        optimizer.set('optsmt_engine', 'symba')
+        return optimizer
+    return Then(*ARITH_TACTICS).solver()
+
+PRESETS = {
+    'default': default,
+    'sat': sat,
+    'arith': arith,
+}
+
+def selectPreset(ground_problem):
+    """!
+    Selects the preset matching the kind of a ground problem.
+
+    @param ground_problem: ground problem.
+    @return name of the preset.
+    """
+    features = ground_problem.kind.features
+    if any([feature in features for feature in NUMERIC_FEATURES]):
+        return 'arith'
+    return 'sat'
+
+def makeSolver(preset='default'):
+    """!
+    Builds the SMT solver of a preset.
+
+    @param preset: name of the preset.
+    @return Z3 solver.
+    """
+    if not preset in PRESETS:
+        raise Exception("Unknown solver preset {}".format(preset))
+    return PRESETS[preset]()
+
+def makeIncrementalSolver(preset='default'):
+    """!
+    Builds an incremental SMT solver for a preset: the incremental SAT
+    backend of Z3 (QF_FD, which also handles pseudo-boolean constraints)
+    for the sat preset, the default solver otherwise.
+
+    @param preset: name of the preset.
+    @return Z3 solver.
+    """
+    if not preset in PRESETS:
+        raise Exception("Unknown solver preset {}".format(preset))
+    if preset == 'sat':
+        return SolverFor('QF_FD')
+    return Solver()
+
+def makeOptimize(preset='default'):
+    """!
+    Builds the OMT optimizer of a preset.
+
+    @param preset: name of the preset.
+    @return Z3 optimizer.
+    """
+    if not preset in PRESETS:
+        raise Exception("Unknown solver preset {}".format(preset))
+    return PRESETS[preset](optimize=True)
+
+def postObjective(optimizer, objective):
+    """!
+    Posts the objective of an OMT encoding on an optimizer, either an
+    arithmetic term to minimize or a list of (literal, weight) pairs, in
+    which case the weight is paid when the literal holds (weighted MaxSAT).
+
+    @param optimizer: Z3 optimizer.
+    @param objective: objective of the encoding.
+    @return handle of the objective.
+    """
+    if not isinstance(objective, list):
+        return optimizer.minimize(objective)
+    if len(objective) == 0:
+        return optimizer.minimize(RealVal(0))
+    for literal, weight in objective:
+        handle = optimizer.add_soft(Not(literal), weight, id='cost')
+    return handle
+
+def objectiveTerm(objective):
+    """!
+    Returns the objective of an OMT encoding as an arithmetic term
+    (see postObjective).
+
+    @param objective: objective of the encoding.
+    @return Z3 term.
+    """
+    if not isinstance(objective, list):
+        return objective
+    return Sum([If(literal, RealVal(weight), RealVal(0)) for literal, weight in objective] + [RealVal(0)])
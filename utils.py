@@ -28,7 +28,9 @@ import unified_planning
 
 import itertools
 
-number_solution = 0
+from planner import solvers
+from planner import counting
+from planner import pathcount
 
 def getValFromModel(assignment):
     """!
@@ -348,31 +350,60 @@ def printSMTContrastiveFormula(formula, problem_name, dump_to_dir, _print, contr
         """!
         Prints SMT planning formula in SMT-LIB syntax.
 
+        The dump is built from a plain solver: incremental SAT solvers
+        (see contrastive_base_solver) do not report the assertions of a
+        backtracking point, i.e., the contrastive axiom.
+
         @param formula
         @param problem_name
         @param contrastive_type
         """
 
+        if not _print:
+            return
+
         solver = Solver()
 
         # Assert subformulas in solver
         for name, sub_formula in formula.items():
-            if name=="axiom":
-                if contrastive_type == "fact":
-                    solver.add(sub_formula[0])
-                elif contrastive_type == "foil":
-                    solver.add(sub_formula[1])
-            else:
+            if name != "axiom":
                 solver.add(sub_formula)
+        solver.add(contrastive_axiom(formula, contrastive_type))
+
+        print('Printing SMT formula to {}.smt2'.format(problem_name))
+        with open(os.path.join(dump_to_dir,'{}_{}.smt2').format(problem_name, contrastive_type),'w') as fo:
+            fo.write(solver.to_smt2())
+
+def contrastive_base_solver(formula, preset="default"):
+    """!
+    Builds a solver with the subformulas shared by the fact and foil
+    supports asserted (i.e., all but the contrastive axiom). Axioms are
+    added in a backtracking point of the solver (see contrastive_axiom),
+    so that both supports are handled by the same solver.
+
+    @param formula
+    @param preset: solver preset (see planner.solvers)
+    @return Z3 solver
+    """
+    solver = solvers.makeIncrementalSolver(preset)
+    for name, sub_formula in formula.items():
+        if name != "axiom":
+            solver.add(sub_formula)
+    return solver
 
-        if _print:
-            print('Printing SMT formula to {}.smt2'.format(problem_name))
-            if contrastive_type == "fact":
-                with open(os.path.join(dump_to_dir,'{}_fact.smt2').format(problem_name),'w') as fo:
-                    fo.write(solver.to_smt2())
-            elif contrastive_type == "foil":
-                with open(os.path.join(dump_to_dir,'{}_foil.smt2').format(problem_name),'w') as fo:
-                    fo.write(solver.to_smt2())
+def contrastive_axiom(formula, contrastive_type="fact"):
+    """!
+    Returns the contrastive axiom of the fact or foil support.
+
+    @param formula
+    @param contrastive_type
+    @return list of Z3 formulas
+    """
+    if contrastive_type == "fact":
+        return formula["axiom"][0]
+    elif contrastive_type == "foil":
+        return formula["axiom"][1]
+    raise Exception("Unknown contrastive type {}".format(contrastive_type))
 
 def printOMTFormula(formula,problem_name, dump_to_dir):
         """!
@@ -389,7 +420,7 @@ def printOMTFormula(formula,problem_name, dump_to_dir):
         # Assert subformulas in solver
         for label, sub_formula in formula.items():
             if label == 'objective':
-                solver.minimize(sub_formula)
+                solvers.postObjective(solver, sub_formula)
             else:
                 solver.add(sub_formula)
 
@@ -559,56 +590,90 @@ def get_planning_problems(BASE_DIR):
 
     return planning_problems
 
-def model_counting(formula, initial_variables, contrastive_type="fact"):
+def model_counting(formula, initial_variables, contrastive_type="fact", preset="default", engine="enumerate", solver=None):
     """!
-    Count solutions for formula encoded in input.
+    Count solutions for formula encoded in input, projected on the
+    given variables (see planner.counting).
 
     @param formula
     @param initial_variables
     @param contrastive_type
-    @return int: length of satisfiable solutions found by the solver
+    @param preset: solver preset (see planner.solvers)
+    @param engine: enumerate (blocking clauses) or components (#SAT on the bit-blasted formula)
+    @param solver: solver with the base formula asserted (see contrastive_base_solver), built if not given (enumerate only)
+    @return int: number of assignments to the variables satisfying the formula
     """ 
-    def all_smt(s, initial_terms):
-        def block_term(s, m, t):
-            s.add(t != m.eval(t, model_completion=True))
-        def fix_term(s, m, t):
-            s.add(t == m.eval(t, model_completion=True))
-        def all_smt_rec(terms):
-            global number_solution
-            if sat == s.check():
-                number_solution = number_solution +1
-                m = s.model()
-                yield m
-                for i in range(len(terms)):
-                    s.push()
-                    block_term(s, m, terms[i])
-                    for j in range(i):
-                        fix_term(s, m, terms[j])
-                    yield from all_smt_rec(terms[i:])
-                    s.pop()   
-        yield from all_smt_rec(list(initial_terms))
-    
-    global number_solution
-    number_solution = 0
-    solver = Solver()
+    def report(count):
+        print("Models of {} support found so far: {}".format(contrastive_type, count))
 
-    # Assert subformulas in solver
-    for name, sub_formula in formula.items():
-        if name=="axiom":
-            if contrastive_type == "fact":
-                solver.add(sub_formula[0])
-            elif contrastive_type == "foil":
-                solver.add(sub_formula[1])
-        else:
-            solver.add(sub_formula)
-    
-    support = list(all_smt(solver, initial_variables))
-    print("Size of {} support: ".format(contrastive_type), len(support))
-    return len(support)
+    if engine == "components":
+        # The component counter bit-blasts the formula itself
+        assertions = [sub_formula for name, sub_formula in formula.items() if name != "axiom"]
+        support = counting.countComponents(assertions + [contrastive_axiom(formula, contrastive_type)], initial_variables)
+    else:
+        if solver is None:
+            solver = contrastive_base_solver(formula, preset)
+        solver.push()
+        solver.add(contrastive_axiom(formula, contrastive_type))
+        try:
+            support = counting.countModels(solver, initial_variables, report)
+        finally:
+            solver.pop()
+    print("Size of {} support: ".format(contrastive_type), support)
+    return support
+
+def approximate_model_counting(formula, initial_variables, contrastive_type="fact", preset="default", epsilon=0.8, delta=0.2, solver=None):
+    """!
+    Approximates the number of solutions for formula encoded in input,
+    projected on the given variables (see planner.counting).
+
+    @param formula
+    @param initial_variables
+    @param contrastive_type
+    @param preset: solver preset (see planner.solvers)
+    @param epsilon: tolerance of the estimate
+    @param delta: confidence of the estimate
+    @param solver: solver with the base formula asserted (see contrastive_base_solver), built if not given
+    @return estimate, lower bound and upper bound of the number of assignments
+    """
+    if solver is None:
+        solver = contrastive_base_solver(formula, preset)
+
+    def report(estimate):
+        print("Estimate of {} support: {}".format(contrastive_type, estimate))
+
+    solver.push()
+    solver.add(contrastive_axiom(formula, contrastive_type))
+    try:
+        support = counting.approximateCount(solver, initial_variables, epsilon, delta, report=report)
+    finally:
+        solver.pop()
+    print("Size of {} support: {} (between {:.1f} and {:.1f} with probability {})".format(contrastive_type, support[0], support[1], support[2], 1 - delta))
+    return support
+
+def plan_counting(encoder, horizon, contrastive_type="fact"):
+    """!
+    Count the plans of the (linear, propositional) encoding of a problem
+    satisfying the contrastive axiom, without solving the formula (see
+    planner.pathcount). Gives the same supports as model_counting.
+
+    @param encoder: contrastive encoder
+    @param horizon: horizon of the encoding
+    @param contrastive_type
+    @return int: number of plans
+    """
+    counter = pathcount.PathCounter(encoder)
+    support = counter.count(horizon, contrastive_type)
+    print("Size of {} support: ".format(contrastive_type), support)
+    print("States expanded: ", counter.states())
+    return support
 
 def encoder_action_list(encoder, horizon):
     action_list=[]
     for step in range(horizon):
         for _, action in encoder.action_variables[step].items():
+            # Skip actions folded to False by reachability analysis
+            if z3.is_false(action):
+                continue
             action_list.append(action)
     return action_list
\ No newline at end of file